@@ -0,0 +1,208 @@
+# run_benchmarks.py
+"""
+可复现的性能基准：解析、两种展示策略、写文件、按 id 查找、拼写检查、撤销/重做，
+每项在若干文档规模下各测 repeat 次，记录中位数和最小值。测试文档由 corpus 按固定种子生成。
+
+结果保存为 JSON，并与基线比较；任何一项比基线慢 threshold 以上时以状态码 1 退出。
+
+用法:
+    python benchmarks/run_benchmarks.py                       # 运行并与 benchmarks/baseline.json 比较
+    python benchmarks/run_benchmarks.py --sizes 1000 --repeat 3
+    python benchmarks/run_benchmarks.py --save-baseline       # 把本次结果存为新的基线
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from commands import AppendCommand, EditTextCommand  # noqa: E402
+from corpus import CorpusSpec, write_html  # noqa: E402
+from display import IndentDisplayStrategy, TreeDisplayStrategy  # noqa: E402
+from editor import Editor  # noqa: E402
+from io_manager import HTMLParser, HTMLWriter  # noqa: E402
+from model import HTMLDocument, HTMLElement  # noqa: E402
+from spell_checker import HTMLSpellChecker  # noqa: E402
+
+DEFAULT_SIZES = [1000, 10000]
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+FORMAT_VERSION = 1
+
+def measure(func: Callable[[], object], repeat: int, setup: Optional[Callable[[], None]] = None) -> Dict[str, float]:
+    """
+    运行 func repeat 次（每次之前调用 setup，不计时），返回耗时的中位数与最小值（秒）。
+    与 timeit 一样在计时期间关闭垃圾回收，减少抖动。
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        gc.collect()
+        gc.disable()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                func()
+                timings.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return {"median": statistics.median(timings), "min": min(timings), "repeat": repeat}
+
+
+def bench_size(size: int, repeat: int, workdir: str) -> Dict[str, Dict[str, float]]:
+    """
+    在含 size 个元素的文档上运行全部基准项。
+    """
+    source = os.path.join(workdir, f"bench-{size}.html")
+    write_html(CorpusSpec(node_count=size, seed=size), source)
+    parser = HTMLParser()
+    writer = HTMLWriter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        document = parser.parse(source)
+    ids = [element.id for element in document.iter_elements()]
+    lookups = random.Random(size).choices(ids, k=200)
+    checker = HTMLSpellChecker()
+
+    results = {}
+    results["parse"] = measure(lambda: parser.parse(source), repeat)
+
+    def display(strategy):
+        document.set_display_strategy(strategy)
+        return document.display(True)
+    results["display_tree"] = measure(lambda: display(TreeDisplayStrategy()), repeat)
+    results["display_indent"] = measure(lambda: display(IndentDisplayStrategy(indent_size=2)), repeat)
+    results["write"] = measure(lambda: writer.write(document, os.path.join(workdir, "out.html")), repeat)
+
+    def find_all():
+        for element_id in lookups:
+            document.find_by_id(element_id)
+    results["find_by_id_x200"] = measure(find_all, repeat)
+    results["check_spelling"] = measure(lambda: checker.check_spelling(document), repeat)
+
+    # 撤销/重做：先执行 200 条追加和改文本命令，再全部撤销、全部重做
+    editor = Editor(HTMLDocument())
+    target_ids = random.Random(size + 1).sample([element_id for element_id in ids if element_id.startswith("n")], 100)
+
+    def prepare_history():
+        editor.document = document
+        editor.clear_history()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for element_id in target_ids:
+                editor.execute_command(AppendCommand(document, HTMLElement("span"), element_id, auto_id=True))
+                editor.execute_command(EditTextCommand(document, element_id, "benchmark text"))
+
+    def undo_redo():
+        for _ in range(len(editor.undo_stack)):
+            editor.undo()
+        for _ in range(len(editor.redo_stack)):
+            editor.redo()
+    results["undo_redo_x200"] = measure(undo_redo, repeat, setup=prepare_history)
+    return results
+
+
+def run(sizes: List[int], repeat: int) -> Dict[str, object]:
+    metrics = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            for name, result in bench_size(size, repeat, workdir).items():
+                metrics[f"{name}[{size}]"] = result
+    return {
+        "version": FORMAT_VERSION,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "metrics": metrics,
+    }
+
+
+def compare(results: Dict[str, object], baseline: Dict[str, object],
+            threshold: float) -> List[Tuple[str, float, float, float]]:
+    """
+    返回比基线慢 threshold（比例）以上的项目：(名称, 基线秒数, 本次秒数, 比值)。
+    与 timeit 的建议一致，用各次中的最小值比较，它受机器负载的干扰最小。
+    只比较两边都有的项目。
+    """
+    regressions = []
+    for name, result in results["metrics"].items():
+        base = baseline["metrics"].get(name)
+        if not base or base["min"] <= 0:
+            continue
+        ratio = result["min"] / base["min"]
+        if ratio > 1 + threshold:
+            regressions.append((name, base["min"], result["min"], ratio))
+    return regressions
+
+
+def format_report(results: Dict[str, object], baseline: Optional[Dict[str, object]] = None) -> str:
+    lines = [f"{'benchmark':28s} {'median ms':>11s} {'min ms':>11s} {'base min ms':>12s} {'ratio':>7s}"]
+    for name, result in results["metrics"].items():
+        base = baseline["metrics"].get(name) if baseline else None
+        base_text = f"{base['min'] * 1000:12.3f}" if base else f"{'-':>12s}"
+        ratio_text = f"{result['min'] / base['min']:7.2f}" if base and base["min"] > 0 else f"{'-':>7s}"
+        lines.append(f"{name:28s} {result['median'] * 1000:11.3f} {result['min'] * 1000:11.3f} {base_text} {ratio_text}")
+    return "\n".join(lines)
+
+
+def load_json(path: str) -> Optional[Dict[str, object]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_json(data: Dict[str, object], path: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, indent=2)
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Editor benchmark suite.")
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                            help="document sizes in elements")
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    arg_parser.add_argument("--threshold", type=float, default=0.25,
+                            help="allowed slowdown before failing, e.g. 0.25 = 25%%")
+    arg_parser.add_argument("--output", help="results file (default: results/<timestamp>.json)")
+    arg_parser.add_argument("--save-baseline", action="store_true",
+                            help="store these results as the new baseline instead of comparing")
+    args = arg_parser.parse_args(argv)
+
+    results = run(args.sizes, args.repeat)
+    output = args.output or os.path.join(DEFAULT_RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    save_json(results, output)
+    if args.save_baseline:
+        save_json(results, args.baseline)
+        print(format_report(results))
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    baseline = load_json(args.baseline)
+    print(format_report(results, baseline))
+    print(f"Results saved to {output}")
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+    regressions = compare(results, baseline, args.threshold)
+    for name, base, new, ratio in regressions:
+        print(f"REGRESSION {name}: {base * 1000:.3f} ms -> {new * 1000:.3f} ms ({ratio:.2f}x)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
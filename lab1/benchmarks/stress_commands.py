@@ -0,0 +1,261 @@
+# stress_commands.py
+"""
+随机命令压力测试：通过 Editor.execute_command 驱动大量随机的
+insert/append/edit-id/edit-text/delete/init/undo/redo 操作，定期检查结构不变量：
+
+- 父指针：每个子元素的 parent 指向其父元素，根元素的 document 指向文档；
+- id 唯一：树中的 id 互不相同，且与文档 id 分配器的登记完全一致；
+- 撤销/重做：抽查的命令满足 undo 后回到执行前的树，redo 后回到执行后的树。
+
+每隔 report_every 次操作输出吞吐量（ops/s）、文档大小、撤销栈长度和内存，
+用于发现内存泄漏和随规模变慢的操作。
+
+用法:
+    python benchmarks/stress_commands.py [--ops 1000000] [--nodes 2000] [--seed 0]
+                                         [--check-every 1000] [--report-every 100000] [--tracemalloc]
+"""
+import argparse
+import contextlib
+import functools
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from commands import (AppendCommand, Command, DeleteCommand, EditIdCommand,  # noqa: E402
+                      EditTextCommand, InitCommand, InsertCommand, MoveCommand)
+from corpus import CorpusSpec, VOCABULARY, build_document  # noqa: E402
+from editor import Editor  # noqa: E402
+from model import HTMLDocument, HTMLElement  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 各操作的相对权重；init 会清空文档，因此很少出现
+OPERATION_WEIGHTS = {
+    "append": 25,
+    "insert": 15,
+    "edit-text": 15,
+    "edit-id": 10,
+    "delete": 10,
+    "move": 5,
+    "undo": 12,
+    "redo": 8,
+    "init": 0.001,
+}
+TAGS = ("div", "p", "span", "li", "em")
+REFRESH_EVERY = 1000  # 每隔这么多次操作从文档重新收集候选 id
+
+
+class InvariantError(AssertionError):
+    pass
+
+
+def snapshot(document: HTMLDocument) -> Tuple:
+    """
+    树的结构签名：先序的 (深度, 标签, id, 文本, lang)。
+    """
+    result = []
+    stack = [(document.root, 0)]
+    while stack:
+        element, depth = stack.pop()
+        result.append((depth, element.tag_name, element.id, element.text_content, element.lang))
+        stack.extend((child, depth + 1) for child in reversed(element.children))
+    return tuple(result)
+
+
+def check_structure(document: HTMLDocument):
+    """
+    检查父指针、id 唯一性以及 id 分配器的登记。
+    """
+    root = document.root
+    if root.parent is not None or root.document is not document:
+        raise InvariantError("root element is not attached to its document")
+    ids = Counter()
+    for element in root.iter():
+        ids[element.id] += 1
+        for child in element.children:
+            if child.parent is not element:
+                raise InvariantError(f"parent pointer of '{child.id}' does not point to '{element.id}'")
+    duplicates = [element_id for element_id, count in ids.items() if count > 1]
+    if duplicates:
+        raise InvariantError(f"duplicate ids in tree: {duplicates[:5]}")
+    if ids != Counter(document.id_allocator.taken):
+        missing = set(ids) - set(document.id_allocator.taken)
+        stale = set(document.id_allocator.taken) - set(ids)
+        raise InvariantError(f"id allocator out of sync: missing {sorted(missing)[:5]}, stale {sorted(stale)[:5]}")
+
+
+def memory_kb(use_tracemalloc: bool) -> Optional[int]:
+    if use_tracemalloc:
+        return tracemalloc.get_traced_memory()[0] // 1024
+    if resource is not None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # Linux 下单位为 KB
+    return None
+
+
+class StressRunner:
+    def __init__(self, seed: int = 0, nodes: int = 2000, check_every: int = 1000,
+                 report_every: int = 100000, use_tracemalloc: bool = False,
+                 report: Optional[Callable[[str], None]] = None):
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.check_every = check_every
+        self.report_every = report_every
+        self.use_tracemalloc = use_tracemalloc
+        self.report = report  # 缺省输出到运行开始时的标准输出（命令本身的输出被丢弃）
+        self.editor = Editor(build_document(CorpusSpec(node_count=nodes, seed=seed)))
+        self.candidate_ids: List[str] = []
+        self.operations = list(OPERATION_WEIGHTS)
+        self.weights = list(OPERATION_WEIGHTS.values())
+        self.counts = Counter()
+        self.windows: List[dict] = []  # 每个报告窗口的统计
+        self.refresh_candidates()
+
+    @property
+    def document(self) -> HTMLDocument:
+        return self.editor.document
+
+    def refresh_candidates(self):
+        self.candidate_ids = list(self.document.id_allocator.taken)
+
+    def pick_id(self) -> str:
+        # 候选列表可能已过时，找不到元素的命令同样是合法的操作
+        return self.rng.choice(self.candidate_ids) if self.candidate_ids else "body"
+
+    def new_id(self) -> str:
+        if self.rng.random() < 0.2:
+            return self.pick_id()  # 故意制造冲突，检查冲突时命令被拒绝
+        return f"s{self.rng.randrange(10 ** 9)}"
+
+    def new_text(self) -> str:
+        return " ".join(self.rng.choice(VOCABULARY) for _ in range(self.rng.randint(0, 6)))
+
+    def make_command(self, operation: str) -> Command:
+        document = self.document
+        if operation == "append":
+            element = HTMLElement(self.rng.choice(TAGS), None, self.new_text())
+            return AppendCommand(document, element, self.pick_id(), auto_id=True)
+        if operation == "insert":
+            element = HTMLElement(self.rng.choice(TAGS), self.new_id(), self.new_text())
+            return InsertCommand(document, element, self.pick_id())
+        if operation == "edit-text":
+            return EditTextCommand(document, self.pick_id(), self.new_text())
+        if operation == "edit-id":
+            return EditIdCommand(document, self.pick_id(), self.new_id())
+        if operation == "delete":
+            return DeleteCommand(document, self.pick_id())
+        if operation == "move":
+            return MoveCommand(document, self.pick_id(), self.pick_id(), before=self.rng.random() < 0.5)
+        return InitCommand(document)
+
+    def step(self, checked: bool):
+        operation = self.rng.choices(self.operations, self.weights)[0]
+        self.counts[operation] += 1
+        if operation == "undo":
+            self.editor.undo()
+        elif operation == "redo":
+            self.editor.redo()
+        elif not checked:
+            command = self.make_command(operation)
+            self.editor.execute_command(command)
+            if isinstance(command, (AppendCommand, InsertCommand)):
+                self.candidate_ids.append(command.new_element.id)
+        else:
+            self.check_round_trip(operation)
+
+    def check_round_trip(self, operation: str):
+        """
+        执行一条命令并验证 undo 回到执行前、redo 回到执行后。
+        """
+        before = snapshot(self.document)
+        command = self.make_command(operation)
+        self.editor.execute_command(command)
+        after = snapshot(self.document)
+        self.editor.undo()
+        if snapshot(self.document) != before:
+            raise InvariantError(f"undo of {operation} did not restore the previous tree")
+        self.editor.redo()
+        if snapshot(self.document) != after:
+            raise InvariantError(f"redo of {operation} did not reproduce the tree")
+
+    def run(self, ops: int) -> List[dict]:
+        if self.use_tracemalloc:
+            tracemalloc.start()
+        report = self.report or functools.partial(print, file=sys.stdout)
+        window_start = time.perf_counter()
+        window_ops = 0
+        try:
+            with open(os.devnull, 'w') as null, contextlib.redirect_stdout(null):
+                for index in range(1, ops + 1):
+                    checked = self.check_every > 0 and index % self.check_every == 0
+                    try:
+                        self.step(checked)
+                        if checked:
+                            check_structure(self.document)
+                    except InvariantError as error:
+                        raise InvariantError(f"op {index} (seed {self.seed}): {error}") from None
+                    if index % REFRESH_EVERY == 0:
+                        self.refresh_candidates()
+                    window_ops += 1
+                    if index % self.report_every == 0 or index == ops:
+                        elapsed = time.perf_counter() - window_start
+                        self.record_window(index, window_ops, elapsed, report)
+                        window_start = time.perf_counter()
+                        window_ops = 0
+        finally:
+            if self.use_tracemalloc:
+                tracemalloc.stop()
+        return self.windows
+
+    def record_window(self, index: int, window_ops: int, elapsed: float, report: Callable[[str], None]):
+        window = {
+            "ops": index,
+            "ops_per_s": window_ops / elapsed if elapsed > 0 else float("inf"),
+            "elements": len(self.document.id_allocator.taken),
+            "undo_depth": len(self.editor.undo_stack),
+            "memory_kb": memory_kb(self.use_tracemalloc),
+        }
+        self.windows.append(window)
+        memory = f"{window['memory_kb']} KB" if window["memory_kb"] is not None else "n/a"
+        report(f"{index:>10d} ops  {window['ops_per_s']:>10.0f} ops/s  {window['elements']:>7d} elements  "
+                    f"undo depth {window['undo_depth']:>8d}  memory {memory}")
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Random command stress test with invariant checks.")
+    arg_parser.add_argument("--ops", type=int, default=1_000_000)
+    arg_parser.add_argument("--nodes", type=int, default=2000, help="elements in the generated start document")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--check-every", type=int, default=1000,
+                            help="check invariants and undo/redo round trip every N ops (0 = never)")
+    arg_parser.add_argument("--report-every", type=int, default=100000)
+    arg_parser.add_argument("--tracemalloc", action="store_true",
+                            help="report traced Python memory instead of peak RSS (slower)")
+    args = arg_parser.parse_args(argv)
+
+    runner = StressRunner(args.seed, args.nodes, args.check_every, args.report_every, args.tracemalloc)
+    start = time.perf_counter()
+    try:
+        runner.run(args.ops)
+    except InvariantError as error:
+        print(f"INVARIANT VIOLATION: {error}")
+        return 1
+    elapsed = time.perf_counter() - start
+    print(f"{args.ops} ops in {elapsed:.1f}s ({args.ops / elapsed:.0f} ops/s); "
+          + ", ".join(f"{name} {count}" for name, count in runner.counts.most_common()))
+    first, last = runner.windows[0], runner.windows[-1]
+    if len(runner.windows) > 1 and last["ops_per_s"] < first["ops_per_s"] / 2:
+        print(f"WARNING: throughput fell from {first['ops_per_s']:.0f} to {last['ops_per_s']:.0f} ops/s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,35 @@
+# build_dict.py
+"""
+从 pyspellchecker 的词表编译紧凑词典。
+
+用法:
+    python build_dict.py [--lang en] [--output data/en.dict] [--words extra.txt ...]
+"""
+import argparse
+import time
+from compact_dict import compile_dictionary, default_dictionary_path, load_word_frequency
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Compile a memory-mapped spelling dictionary.")
+    arg_parser.add_argument("--lang", default="en", help="pyspellchecker language code (default: en)")
+    arg_parser.add_argument("--output", help="output file (default: data/<lang>.dict)")
+    arg_parser.add_argument("--words", nargs="*", default=[],
+                            help="extra word list files (one word per line) merged into the dictionary")
+    args = arg_parser.parse_args(argv)
+
+    start = time.perf_counter()
+    word_frequency = load_word_frequency(args.lang)
+    for filepath in args.words:
+        with open(filepath, 'r', encoding='utf-8') as file:
+            for line in file:
+                word = line.strip().lower()
+                if word and not word.startswith('#'):
+                    word_frequency[word] = word_frequency.get(word, 0) + 1
+    output = args.output or default_dictionary_path(args.lang)
+    count = compile_dictionary(word_frequency, output)
+    print(f"Compiled {count} words to '{output}' in {time.perf_counter() - start:.2f}s.")
+
+
+if __name__ == "__main__":
+    main()
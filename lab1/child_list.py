@@ -0,0 +1,212 @@
+# child_list.py
+from typing import Iterator, Optional, Union
+
+LABEL_BITS = 62
+LABEL_UNIVERSE = 1 << LABEL_BITS
+APPEND_GAP = 1 << 32   # 追加到末尾时与前一个元素的标签间隔
+DENSITY = 1.5          # 重排时区间 [base, base + 2^i) 中最多容纳 2^i / DENSITY^i 个元素
+
+
+class ChildList:
+    """
+    子元素序列：双向链表加顺序标签。
+
+    每个元素在自身上记录前后兄弟（_prev_sibling/_next_sibling）、所在的序列（_siblings）
+    和顺序标签（_order，兄弟之间标签越小越靠前），因此插入到某个兄弟之前、删除、
+    判断是否包含、取相邻兄弟和比较先后都是 O(1)（标签耗尽时局部重排，均摊 O(log n)）。
+
+    迭代、len、下标和切片与列表相同；后两者通过按需重建的数组缓存实现。
+    """
+    __slots__ = ("head", "tail", "size", "_array")
+
+    def __init__(self, elements=()):
+        self.head = None
+        self.tail = None
+        self.size = 0
+        self._array: Optional[list] = []  # 数组缓存，None 表示需要重建
+        if elements:
+            for element in elements:
+                self.append(element)
+
+    # ---- 列表接口 ----
+    def __len__(self) -> int:
+        return self.size
+
+    def __bool__(self) -> bool:
+        return self.size > 0
+
+    def __iter__(self) -> Iterator:
+        array = self._array
+        return iter(array if array is not None else self.as_list())
+
+    def __reversed__(self) -> Iterator:
+        array = self._array
+        return reversed(array if array is not None else self.as_list())
+
+    def __contains__(self, element) -> bool:
+        return getattr(element, "_siblings", None) is self
+
+    def __getitem__(self, index: Union[int, slice]):
+        if index == 0 and self.head is not None:
+            return self.head
+        if index == -1 and self.tail is not None:
+            return self.tail
+        return self.as_list()[index]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ChildList):
+            return self.as_list() == other.as_list()
+        if isinstance(other, list):
+            return self.as_list() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"ChildList({self.as_list()!r})"
+
+    def as_list(self) -> list:
+        """
+        按顺序排列的子元素列表（缓存，修改序列后下次访问时重建，调用方不应修改它）。
+        """
+        if self._array is None:
+            array = []
+            node = self.head
+            while node is not None:
+                array.append(node)
+                node = node._next_sibling
+            self._array = array
+        return self._array
+
+    def index(self, element) -> int:
+        if element not in self:
+            raise ValueError(f"{element!r} is not in list")
+        return self.as_list().index(element)
+
+    def append(self, element):
+        if element._siblings is not None:
+            raise ValueError(f"{element!r} already belongs to a child list")
+        # 追加是最常见的操作（解析时逐个追加），单独处理
+        tail = self.tail
+        if tail is None:
+            element._order = APPEND_GAP
+            self.head = element
+        else:
+            label = tail._order + APPEND_GAP
+            if label >= LABEL_UNIVERSE:
+                self._relabel_all()
+                label = tail._order + APPEND_GAP
+            element._order = label
+            tail._next_sibling = element
+        element._prev_sibling = tail
+        element._siblings = self
+        self.tail = element
+        self.size += 1
+        if self._array is not None:
+            self._array.append(element)
+
+    def insert(self, index: int, element):
+        """
+        与 list.insert 相同的语义（需要定位下标，O(n)）；已知后一个兄弟时应使用 insert_before。
+        """
+        array = self.as_list()
+        if index < 0:
+            index = max(0, index + len(array))
+        self.insert_before(element, array[index] if index < len(array) else None)
+
+    def insert_before(self, element, reference=None):
+        """
+        把 element 插到 reference 之前；reference 为 None 时追加到末尾。
+        """
+        if reference is None:
+            self.append(element)
+            return
+        if reference not in self:
+            raise ValueError(f"{reference!r} is not in list")
+        self._link(element, reference._prev_sibling, reference)
+        self._array = None
+
+    def remove(self, element):
+        if element not in self:
+            raise ValueError(f"{element!r} is not in list")
+        previous, following = element._prev_sibling, element._next_sibling
+        if previous is None:
+            self.head = following
+        else:
+            previous._next_sibling = following
+        if following is None:
+            self.tail = previous
+        else:
+            following._prev_sibling = previous
+        element._prev_sibling = element._next_sibling = element._siblings = None
+        self.size -= 1
+        if self._array is not None and element is (self._array[-1] if self._array else None):
+            self._array.pop()
+        else:
+            self._array = None
+
+    # ---- 链表与标签 ----
+    def _link(self, element, previous, following):
+        if element._siblings is not None:
+            raise ValueError(f"{element!r} already belongs to a child list")
+        element._order = self._label_between(previous, following)
+        element._prev_sibling = previous
+        element._next_sibling = following
+        element._siblings = self
+        if previous is None:
+            self.head = element
+        else:
+            previous._next_sibling = element
+        if following is None:
+            self.tail = element
+        else:
+            following._prev_sibling = element
+        self.size += 1
+
+    def _label_between(self, previous, following) -> int:
+        # following 不为 None，追加由 append 处理
+        low = previous._order if previous is not None else -1
+        high = following._order
+        if high - low > 1:
+            return (low + high) // 2
+        self._rebalance(following)
+        low = previous._order if previous is not None else -1
+        return (low + following._order) // 2
+
+    def _rebalance(self, node):
+        """
+        在 node 所在的最小对齐标签区间内均匀重排，使区间密度低于阈值（包括即将插入的元素）。
+        """
+        left = right = node
+        count = 1
+        for bits in range(1, LABEL_BITS + 1):
+            size = 1 << bits
+            base = node._order & ~(size - 1)
+            while left._prev_sibling is not None and left._prev_sibling._order >= base:
+                left = left._prev_sibling
+                count += 1
+            while right._next_sibling is not None and right._next_sibling._order < base + size:
+                right = right._next_sibling
+                count += 1
+            if (count + 1) * DENSITY ** bits <= size:
+                break
+        else:
+            self._relabel_all()
+            return
+        # 在区间内均匀分布，并在左端留出空位，保证 node 之前可以插入
+        step = size // (count + 1)
+        label = base + step
+        current = left
+        while True:
+            current._order = label
+            label += step
+            if current is right:
+                break
+            current = current._next_sibling
+
+    def _relabel_all(self):
+        step = max(2, LABEL_UNIVERSE // (2 * (self.size + 1)))
+        label = step
+        node = self.head
+        while node is not None:
+            node._order = label
+            label += step
+            node = node._next_sibling
@@ -6,12 +6,54 @@ from display import TreeDisplayStrategy, IndentDisplayStrategy
 from spell_checker import HTMLSpellChecker
 from session_manager import SessionManager
 from commands import *
-from io_manager import HTMLParser, HTMLWriter, Directory
+from io_manager import HTMLParser, HTMLWriter
+from memory_budget import format_size, parse_budget
 from typing import Callable, List
+import instrumentation
+from tracing import tracer
+from tree_diff import diff_documents, format_edit_script
+from workspace import DEFAULT_PATTERN, Workspace
 import json
+import os
 import sys
 import shlex
 
+# insert/append 中以此代替 id，表示由编辑器自动分配唯一 id
+AUTO_ID = "-"
+
+
+def parse_destination(args: List[str]):
+    """
+    解析 move/copy 的参数：<id> <parent> 或 <id> --before <siblingId>，
+    返回 (id, 目标 id, 是否插到目标之前)；格式不对时返回 None。
+    """
+    if len(args) == 2:
+        return args[0], args[1], False
+    if len(args) == 3 and args[1] == "--before":
+        return args[0], args[2], True
+    return None
+
+
+def parse_replace(args: List[str]):
+    """
+    解析 replace 的参数：<pattern> <replacement> [--regex] [--scope id]，
+    返回 (模式, 替换串, 是否正则, 范围 id)；格式不对时返回 None。
+    """
+    positional, regex, scope_id = [], False, None
+    remaining = iter(args)
+    for arg in remaining:
+        if arg == "--regex":
+            regex = True
+        elif arg == "--scope":
+            scope_id = next(remaining, None)
+            if scope_id is None:
+                return None
+        else:
+            positional.append(arg)
+    if len(positional) != 2:
+        return None
+    return positional[0], positional[1], regex, scope_id
+
 
 class CLI:
     """
@@ -44,7 +86,9 @@ class CLI:
             "quit": self.handle_exit,
             "help": self.handle_help,
             "load": self.handle_load,
+            "load-dir": self.handle_load_dir,
             "save": self.handle_save,
+            "reload": self.handle_reload,
             "close": self.handle_close,
             "editor-list": self.handle_editor_list,
             "edit": self.handle_edit,
@@ -53,15 +97,28 @@ class CLI:
             "edit-id": self.handle_edit_id,
             "edit-text": self.handle_edit_text,
             "delete": self.handle_delete,
+            "append-html": self.handle_append_html,
+            "insert-html": self.handle_insert_html,
+            "replace": self.handle_replace,
+            "move": self.handle_move,
+            "copy": self.handle_copy,
             "print-tree": self.handle_print_tree,
             "print-indent": self.handle_print_indent,
             "spell-check": self.handle_spell_check,
+            "spell-suggest": self.handle_spell_suggest,
             "init": self.handle_init,
             "undo": self.handle_undo,
             "redo": self.handle_redo,
             "showid": self.handle_showid,
             "dir-tree": self.handle_dir_tree,
-            "dir-indent": self.handle_dir_indent
+            "dir-indent": self.handle_dir_indent,
+            "stats": self.handle_stats,
+            "profile": self.handle_profile,
+            "trace": self.handle_trace,
+            "diff": self.handle_diff,
+            "select": self.handle_select,
+            "search": self.handle_search,
+            "memory-budget": self.handle_memory_budget,
         }
 
         return command_mapping.get(command, self.handle_unknown_command)
@@ -73,7 +130,15 @@ class CLI:
 
         # Pass only arguments to command functions.
         co_argcount = command_func.__code__.co_argcount
-        command_func(args) if co_argcount > 1 else command_func()
+        run = (lambda: command_func(args)) if co_argcount > 1 else command_func
+        for filename in self.session_manager.poll_changes():
+            print(f"Warning: '{filename}' was changed on disk. Use 'reload {filename}' to merge the changes.")
+        if command_func == self.handle_unknown_command:
+            run()
+        else:
+            # 记录每条命令的耗时与触及的节点数，profile on 时在 cProfile 下执行
+            instrumentation.measure(command, run)
+        self.session_manager.enforce_budget()
 
     def handle_exit(self):
 
@@ -83,7 +148,8 @@ class CLI:
         save_data = {
             "file_list": opened_files,
             "active_file": active_files,
-            "showid_list": showids
+            "showid_list": showids,
+            "memory_budget": self.session_manager.memory_budget
         }
         with open("session_data.json", "w", encoding="utf-8") as f:
             json.dump(save_data, f, indent=4)
@@ -97,14 +163,26 @@ class CLI:
         print(self.help_text)
 
     def handle_load(self, args: List[str]):
+        mode = "full"
+        if args and args[0] in ("--stream", "--mmap", "--skeleton"):
+            mode = args[0][2:]
+            args = args[1:]
         if len(args) != 1:
-            print("Invalid load command. Usage: load <filepath>")
+            print("Invalid load command. Usage: load [--stream | --mmap | --skeleton] <filepath>")
             return
         filename =args[0]
 
-        self.session_manager.load(filename, self.parser)
+        self.session_manager.load(filename, self.parser, mode)
         self.editor = self.session_manager.get_active_editor()
 
+    def handle_load_dir(self, args: List[str]):
+        if len(args) not in (1, 3) or (len(args) == 3 and args[1] != "--glob"):
+            print("Invalid load-dir command. Usage: load-dir <path> [--glob <pattern>]")
+            return
+        pattern = args[2] if len(args) == 3 else DEFAULT_PATTERN
+        if self.session_manager.load_dir(args[0], pattern):
+            self.editor = self.session_manager.get_active_editor()
+
     def handle_save(self, args: List[str]):
         if len(args) != 1:
             print("Invalid save command. Usage: save <filepath>")
@@ -113,6 +191,16 @@ class CLI:
 
         self.session_manager.save(filename, self.writer)
 
+    def handle_reload(self, args: List[str]):
+        if len(args) > 1:
+            print("Invalid reload command. Usage: reload [filepath]")
+            return
+        filename = args[0] if args else self.session_manager.get_active_file()
+        if not filename:
+            print("No active editor.")
+            return
+        self.session_manager.reload(filename, self.parser)
+
     def handle_close(self):
 
         self.session_manager.close(self.writer)
@@ -136,8 +224,9 @@ class CLI:
             return
         tag_name, id_value, insert_location, *text_content = args
         text_content = " ".join(text_content) if text_content else ""
-        new_element = HTMLElement(tag_name, id_value, text_content)
-        command = InsertCommand(self.editor.document, new_element, insert_location)
+        auto_id = id_value == AUTO_ID
+        new_element = HTMLElement(tag_name, None if auto_id else id_value, text_content)
+        command = InsertCommand(self.editor.document, new_element, insert_location, auto_id=auto_id)
         self.editor.execute_command(command)
 
     def handle_append(self, args: List[str]):
@@ -148,8 +237,9 @@ class CLI:
             return
         tag_name, id_value, parent_element, *text_content = args
         text_content = " ".join(text_content) if text_content else ""
-        new_element = HTMLElement(tag_name, id_value, text_content)
-        command = AppendCommand(self.editor.document, new_element, parent_element)
+        auto_id = id_value == AUTO_ID
+        new_element = HTMLElement(tag_name, None if auto_id else id_value, text_content)
+        command = AppendCommand(self.editor.document, new_element, parent_element, auto_id=auto_id)
         self.editor.execute_command(command)
 
     def handle_edit_id(self, args: List[str]):
@@ -166,7 +256,7 @@ class CLI:
                 "Invalid edit-text command. Usage: edit-text <elementId> [newTextContent]"
             )
             return
-        element_id, new_text = args
+        element_id, *new_text = args
         new_text = " ".join(new_text) if new_text else ""
         command = EditTextCommand(self.editor.document, element_id, new_text)
         self.editor.execute_command(command)
@@ -179,6 +269,53 @@ class CLI:
         command = DeleteCommand(self.editor.document, element_id)
         self.editor.execute_command(command)
 
+    def handle_append_html(self, args: List[str]):
+        self.insert_fragment("append-html", "parentId", args, before=False)
+
+    def handle_insert_html(self, args: List[str]):
+        self.insert_fragment("insert-html", "insertLocation", args, before=True)
+
+    def insert_fragment(self, command: str, target_name: str, args: List[str], before: bool):
+        if len(args) < 2 or (args[1] == "--file" and len(args) != 3):
+            print(f"Invalid {command} command. Usage: {command} <{target_name}> <html> | "
+                  f"{command} <{target_name}> --file <path>")
+            return
+        target_id, *source = args
+        document = self.editor.document
+        if source[0] == "--file":
+            elements = self.parser.load_fragment(source[1], document)
+            if elements is None:
+                return
+        else:
+            elements = self.parser.parse_fragment(" ".join(source), document)
+        if not elements:
+            print("The fragment contains no elements.")
+            return
+        self.editor.execute_command(InsertFragmentCommand(document, elements, target_id, before=before))
+
+    def handle_replace(self, args: List[str]):
+        parsed = parse_replace(args)
+        if parsed is None:
+            print("Invalid replace command. Usage: replace <pattern> <replacement> [--regex] [--scope id]")
+            return
+        pattern, replacement, regex, scope_id = parsed
+        command = ReplaceCommand(self.editor.document, pattern, replacement, regex=regex, scope_id=scope_id)
+        self.editor.execute_command(command)
+
+    def handle_move(self, args: List[str]):
+        parsed = parse_destination(args)
+        if parsed is None:
+            print("Invalid move command. Usage: move <id> <parentId> | move <id> --before <siblingId>")
+            return
+        self.editor.execute_command(MoveCommand(self.editor.document, *parsed))
+
+    def handle_copy(self, args: List[str]):
+        parsed = parse_destination(args)
+        if parsed is None:
+            print("Invalid copy command. Usage: copy <id> <parentId> | copy <id> --before <siblingId>")
+            return
+        self.editor.execute_command(CopyCommand(self.editor.document, *parsed))
+
     def handle_print_tree(self):
         # set tree
         self.editor.document.set_display_strategy(self.tree_display)
@@ -204,6 +341,21 @@ class CLI:
             for error in errors:
                 print(error)
 
+    def handle_spell_suggest(self, args: List[str]):
+        limit = 5
+        if args:
+            try:
+                limit = int(args[0])
+            except ValueError:
+                print("Invalid limit value. Using default (5).")
+        results = self.spell_checker.suggest_all(self.editor.document, limit)
+        if not results:
+            print("No spelling errors found.")
+        else:
+            print("Spelling Suggestions:")
+            for element_id, word, suggestions in results:
+                print(f"({element_id!r}, {word!r}): {', '.join(suggestions) if suggestions else '(no suggestions)'}")
+
     def handle_init(self):
         command = InitCommand(self.editor.document)
         self.editor.execute_command(command)
@@ -228,26 +380,138 @@ class CLI:
         else:
             print("Invalid value for showid. Use 'true' or 'false'.")
 
-    def handle_dir_tree(self):
-        file_list = self.session_manager.get_opened_files()
-        active_file = self.session_manager.get_active_file()
-        directory = Directory(file_list=file_list, active_file=active_file)
+    def handle_dir_tree(self, args: List[str]):
+        directory = self.session_manager.directory
+        if args:
+            # dir-tree --disk [path] [--depth N]：显示磁盘上的工作区，目录按需展开
+            if args[0] != "--disk":
+                print("Invalid dir-tree command. Usage: dir-tree [--disk [path] [--depth N]]")
+                return
+            path, max_depth = ".", 3
+            rest = args[1:]
+            if rest and rest[0] != "--depth":
+                path, rest = rest[0], rest[1:]
+            if rest:
+                if len(rest) != 2 or rest[0] != "--depth" or not rest[1].isdigit():
+                    print("Invalid dir-tree command. Usage: dir-tree [--disk [path] [--depth N]]")
+                    return
+                max_depth = int(rest[1])
+            if not os.path.isdir(path):
+                print(f"Directory '{path}' does not exist.")
+                return
+            directory = Workspace(path, max_depth=max_depth, active_file=self.session_manager.get_active_file())
         directory.set_display_strategy(self.tree_display)
         print(directory.display())
 
     def handle_dir_indent(self, args: List[str]):
         if args:
             try:
-                self.indent_display.indent_size = int(args[1])
+                self.indent_display.indent_size = int(args[0])
             except ValueError:
                 print("Invalid indent value. Using default (2).")
 
-        file_list = self.session_manager.get_opened_files()
-        active_file = self.session_manager.get_active_file()
-        directory = Directory(file_list=file_list, active_file=active_file)
+        directory = self.session_manager.directory
         directory.set_display_strategy(self.indent_display)
         print(directory.display())
 
+    def handle_search(self, args: List[str]):
+        if not args:
+            print("Invalid search command. Usage: search <terms>")
+            return
+        hits = self.session_manager.search(" ".join(args))
+        if not hits:
+            print("No matches.")
+        for filename, element_id, snippet, score in hits:
+            print(f"{filename}  #{element_id}  ({score:.2f})  {snippet}")
+        spilled = self.session_manager.spilled_files()
+        if spilled:
+            print(f"Not searched ({len(spilled)} file(s) moved to disk, use `edit <file>` to load them back): "
+                  + ", ".join(spilled))
+
+    def handle_memory_budget(self, args: List[str]):
+        if len(args) > 1:
+            print("Invalid memory-budget command. Usage: memory-budget [<MB> | off]")
+            return
+        if args:
+            try:
+                self.session_manager.memory_budget = parse_budget(args[0])
+            except ValueError:
+                print("Invalid memory-budget command. Usage: memory-budget [<MB> | off]")
+                return
+        budget = self.session_manager.memory_budget
+        resident = format_size(self.session_manager.resident_size())
+        if budget is None:
+            print(f"Memory budget: off. Editors in memory use about {resident}.")
+        else:
+            print(f"Memory budget: {format_size(budget)}. Editors in memory use about {resident}.")
+
+    def handle_select(self, args: List[str]):
+        if not args:
+            print("Invalid select command. Usage: select <selector>")
+            return
+        try:
+            elements = self.editor.document.select(" ".join(args))
+        except ValueError as error:
+            print(error)
+            return
+        for element in elements:
+            text = element.text_content if len(element.text_content) <= 60 else element.text_content[:57] + "..."
+            print(f"{element.tag_name}#{element.id}" + (f"  {text}" if text else ""))
+        print(f"{len(elements)} element(s) matched.")
+
+    def handle_diff(self, args: List[str]):
+        if self.editor is None:
+            print("No active editor.")
+            return
+        active_file = self.session_manager.get_active_file()
+        target = args[0] if args else active_file
+        if target != active_file and target in self.session_manager.editors:
+            # 与另一个已打开的编辑器比较，两边的子树哈希都已缓存
+            other = self.session_manager.get_editor(target).document
+        else:
+            other = self.parser.parse(target)
+            if other is None:
+                return
+        ops = diff_documents(other, self.editor.document)
+        if not ops:
+            print(f"No differences from '{target}'.")
+            return
+        print(f"--- {target}")
+        print(f"+++ {active_file} (in memory)")
+        print(format_edit_script(ops))
+
+    def handle_stats(self, args: List[str]):
+        if args and args[0] == "reset":
+            instrumentation.stats.reset()
+            print("Statistics cleared.")
+            return
+        print(instrumentation.stats.format_table())
+
+    def handle_profile(self, args: List[str]):
+        if not args or args[0] not in ("on", "off"):
+            print("Invalid profile command. Usage: profile <on|off> [outputDir]")
+            return
+        if args[0] == "on":
+            instrumentation.profiler.enable(args[1] if len(args) > 1 else None)
+            print(f"Profiling enabled. Stats are written to '{instrumentation.profiler.output_dir}/<command>.pstats'.")
+        else:
+            instrumentation.profiler.disable()
+            print("Profiling disabled.")
+
+    def handle_trace(self, args: List[str]):
+        if not args or args[0] not in ("on", "off"):
+            print("Invalid trace command. Usage: trace <on|off> [outputFile]")
+            return
+        if args[0] == "on":
+            tracer.enable(args[1] if len(args) > 1 else "trace.json")
+            print(f"Tracing enabled. Events are written to '{tracer.output_path}' on 'trace off' or exit.")
+        elif not tracer.enabled:
+            print("Tracing is not enabled.")
+        else:
+            count = len(tracer.events)
+            path = tracer.disable()
+            print(f"Trace with {count} events written to '{path}'. Open it in https://ui.perfetto.dev.")
+
     def handle_unknown_command(self, args: List[str]):
         print("Unknown command. Type 'help' for a list of commands.")
 
@@ -257,9 +521,15 @@ Type `help` to view this list anytime.
 Command-line Help:
 
 Available Commands:
-1. load <filename>
+1. load [--stream | --mmap | --skeleton] <filename>
    - Load an HTML file into the editor. If the file does not exist, a new file will be created.
    - <filename>: Path to the HTML file to load.
+   - --stream: Parse the file in chunks without reading it into memory at once (for very large files).
+     <filename> may then be a named pipe, or `-` to read from standard input until end of file.
+   - --mmap: Like --stream, but long texts stay in a read-only memory map of the file and are decoded
+     only when used (for large, mostly read-only files). Do not modify the file in place while it is open.
+   - --skeleton: Like --mmap, but only the top two levels under <body> are built at load time; deeper
+     content is parsed the first time a command, display or search reaches it.
 
 2. save <filename>
    - Save the current active file to the specified filename.
@@ -272,22 +542,24 @@ Available Commands:
 4. editor-list
    - Display all open files in the session.
    - `*` indicates modified files, and `>` marks the active file.
+   - With a memory budget set, each file is also shown as `resident` (in memory) or `on disk`
+     (moved out by the budget), with its approximate size.
 
 5. edit <filename>
    - Switch the active editor to the specified file.
-   - <filename>: The name of an already open file.
+   - <filename>: The name of an already open file. A file moved to disk is loaded back with its undo history.
 
 6. insert <tag> <id> <pos> [text]
    - Insert a new HTML element into the document at the specified position.
    - <tag>: The HTML tag (e.g., div, span).
-   - <id>: A unique ID for the new element.
+   - <id>: A unique ID for the new element, or `-` to generate one (e.g. div-3).
    - <pos>: Where to insert (e.g., after an existing element ID).
    - [text]: Optional content for the new element.
 
 7. append <tag> <id> <parent> [text]
    - Append a new HTML element as a child of a parent element.
    - <tag>: The HTML tag (e.g., div, p).
-   - <id>: A unique ID for the new element.
+   - <id>: A unique ID for the new element, or `-` to generate one (e.g. p-17).
    - <parent>: ID of the parent element.
    - [text]: Optional content for the new element.
 
@@ -328,14 +600,75 @@ Available Commands:
     - Toggle whether element IDs are displayed in output.
     - <true|false>: Set to `true` to show IDs or `false` to hide them.
 
-18. dir-tree
+18. dir-tree [--disk [path] [--depth N]]
     - Display a tree structure of all open files in the session, highlighting the active file.
+    - --disk: show the HTML files on disk under [path] (default `.`) instead; directories are read only
+      as they are displayed, down to N levels (default 3). Deeper directories are shown as `name/ ...`.
 
 19. dir-indent [size]
     - Display open files with indentation for better visualization.
     - [size]: Optional indentation size (default is 2).
 
-20. exit / quit
+20. spell-suggest [limit]
+    - Run a spell check and list ranked suggestions for every spelling error.
+    - [limit]: Optional maximum number of suggestions per word (default is 5).
+
+21. stats [reset]
+    - Show p50/p95/max wall time, CPU time and nodes touched per command (and for load/parse/write internals).
+    - reset: Clear the collected statistics.
+
+22. profile <on|off> [dir]
+    - Run each command under cProfile and dump cumulative stats to `<dir>/<command>.pstats` (default dir: profiles).
+
+23. trace <on|off> [file]
+    - Record spans for parsing, element construction, spell checking, rendering and file writing,
+      and write them as trace-event JSON (default file: trace.json) viewable in Perfetto.
+
+24. diff [file]
+    - Show the edit script that turns `file` into the active document. `file` may be another open editor;
+      by default the active file is re-read from disk. Identical subtrees are skipped by their hashes.
+
+25. select <selector>
+    - List elements matching a CSS selector in document order. Supported: tag, *, #id,
+      descendant (`div p`) and child (`ul > li`) combinators, `:contains(text)` and comma-separated lists.
+
+26. search <terms>
+    - Find elements whose text contains all terms in any open file, ranked by relevance (file, id, snippet).
+
+27. append-html <parent> <html> | append-html <parent> --file <path>
+    - Parse an HTML fragment and append all of its elements to <parent> as one step (one undo entry).
+    - Ids from the fragment are kept when free, otherwise a unique id is derived from them.
+
+28. insert-html <pos> <html> | insert-html <pos> --file <path>
+    - Like append-html, but inserts the fragment before the element with id <pos>.
+
+29. replace <pattern> <replacement> [--regex] [--scope <id>]
+    - Replace text in every element of the document (or only inside <id>) in one step (one undo entry).
+    - --regex: treat <pattern> as a Python regular expression; <replacement> may use \\1 or \\g<name>.
+    - Prints the number of matches, changed elements and the time taken.
+
+30. move <id> <parent> | move <id> --before <sibling>
+    - Move an element with its whole subtree to the end of <parent>, or before <sibling>. Undone as one step.
+
+31. copy <id> <parent> | copy <id> --before <sibling>
+    - Copy an element with its subtree; every copied element gets a new id derived from the original
+      (e.g. intro-1). Undone as one step.
+
+32. load-dir <path> [--glob <pattern>]
+    - Open every file under <path> whose name matches <pattern> (default `*.html`), parsing them in
+      parallel. Version-control, virtualenv and node_modules directories are skipped.
+
+33. reload [filename]
+    - Re-read a file (default: the active one) that was changed on disk by another program and apply
+      only the differences to the open document, as one undoable step.
+    - Other commands warn when an open file changes on disk; `save` asks before overwriting such a file.
+
+34. memory-budget [<MB> | off]
+    - Show or set the approximate memory budget for open documents and their undo history.
+    - When it is exceeded, the least recently used inactive editors are moved to a temporary file
+      and loaded back when used again. `search` skips files that are on disk. Default: off.
+
+35. exit / quit
     - Save the current session state and exit the program.
     - Session data will be saved to `session_data.json`.
 
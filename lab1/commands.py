@@ -1,9 +1,10 @@
 # commands.py
+import re
+import time
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Callable, List, Optional, Tuple
 
 from model import HTMLDocument, HTMLElement
-import copy
 
 class Command(ABC):
     """
@@ -23,44 +24,65 @@ class InitCommand(Command):
     """
     def __init__(self, document: HTMLDocument):
         self.document = document
-        self.previous_state = None  # 用于保存之前的状态以便撤销
+        self.previous_root: Optional[HTMLElement] = None  # 被替换下来的旧树，撤销时原样放回
+        self.new_root: Optional[HTMLElement] = None
 
     def execute(self):
-        self.previous_state = copy.deepcopy(self.document)
-        self.document.root = HTMLElement(tag_name="html", id_value="root")
-        head = HTMLElement(tag_name="head")
-        title = HTMLElement(tag_name="title")
-        head.add_child(title)
-        body = HTMLElement(tag_name="body")
-        self.document.root.add_child(head)
-        self.document.root.add_child(body)
+        # 旧树整体摘下后不会再被修改，无需深拷贝；撤销之前命令时引用的元素也仍然有效
+        self.previous_root = self.document.root
+        if self.new_root is None:
+            self.new_root = HTMLElement(tag_name="html", id_value="root")
+            head = HTMLElement(tag_name="head")
+            title = HTMLElement(tag_name="title")
+            head.add_child(title)
+            body = HTMLElement(tag_name="body")
+            self.new_root.add_child(head)
+            self.new_root.add_child(body)
+        self.document.root = self.new_root
         print("Initialized editor with an empty HTML template.")
 
     def undo(self):
-        if self.previous_state:
-            self.document.root = self.previous_state.root
+        if self.previous_root:
+            self.document.root = self.previous_root
             print("Undo Init: Restored the document to its previous state.")
         else:
             print("Undo Init: No previous state to restore.")
 
+
+def claim_new_id(document: HTMLDocument, element: HTMLElement, allocate: bool) -> bool:
+    """
+    为即将加入文档的新元素确定 id：allocate 时由文档的分配器生成，
+    否则检查是否与已有 id 冲突。
+    """
+    allocator = document.id_allocator
+    if allocate:
+        element.id = allocator.allocate(element.tag_name)
+    elif allocator.is_taken(element.id):
+        print(f"Id '{element.id}' already exists.")
+        return False
+    return True
+
+
 class InsertCommand(Command):
     """
     插入元素命令。
     """
-    def __init__(self, document: HTMLDocument, new_element: HTMLElement, insert_before_id: str):
+    def __init__(self, document: HTMLDocument, new_element: HTMLElement, insert_before_id: str,
+                 auto_id: bool = False):
         self.document = document
         self.new_element = new_element
         self.insert_before_id = insert_before_id
+        self.auto_id = auto_id  # 为 True 时由文档分配 id，重做时沿用第一次分配的结果
         self.parent: Optional[HTMLElement] = None
-        self.index: Optional[int] = None
 
     def execute(self):
         target = self.document.find_by_id(self.insert_before_id)
         if target and target.parent:
+            if not claim_new_id(self.document, self.new_element, self.auto_id):
+                return
+            self.auto_id = False
             self.parent = target.parent
-            self.index = self.parent.children.index(target)
-            self.parent.children.insert(self.index, self.new_element)
-            self.new_element.parent = self.parent
+            self.parent.insert_before(self.new_element, target)
             print(f"Inserted <{self.new_element.tag_name}> with id '{self.new_element.id}' before '{self.insert_before_id}'.")
         else:
             print(f"Insert location '{self.insert_before_id}' not found.")
@@ -74,15 +96,20 @@ class AppendCommand(Command):
     """
     在某元素内添加子元素命令。
     """
-    def __init__(self, document: HTMLDocument, new_element: HTMLElement, parent_id: str):
+    def __init__(self, document: HTMLDocument, new_element: HTMLElement, parent_id: str,
+                 auto_id: bool = False):
         self.document = document
         self.new_element = new_element
         self.parent_id = parent_id
+        self.auto_id = auto_id  # 为 True 时由文档分配 id，重做时沿用第一次分配的结果
         self.parent: Optional[HTMLElement] = None
 
     def execute(self):
         parent = self.document.find_by_id(self.parent_id)
         if parent:
+            if not claim_new_id(self.document, self.new_element, self.auto_id):
+                return
+            self.auto_id = False
             parent.add_child(self.new_element)
             self.parent = parent
             print(f"Appended <{self.new_element.tag_name}> with id '{self.new_element.id}' to '{self.parent_id}'.")
@@ -107,7 +134,10 @@ class EditIdCommand(Command):
 
     def execute(self):
         self.element = self.document.find_by_id(self.element_id)
-        if self.element:
+        if self.element and self.new_id != self.element.id and self.document.id_allocator.is_taken(self.new_id):
+            print(f"Id '{self.new_id}' already exists.")
+            self.element = None
+        elif self.element:
             self.old_id = self.element.id
             self.element.id = self.new_id
             print(f"Changed id of <{self.element.tag_name}> from '{self.old_id}' to '{self.new_id}'.")
@@ -153,20 +183,334 @@ class DeleteCommand(Command):
         self.element_id = element_id
         self.element: Optional[HTMLElement] = None
         self.parent: Optional[HTMLElement] = None
-        self.index: Optional[int] = None
+        self.next_sibling: Optional[HTMLElement] = None  # 撤销时插回到它之前，None 表示原来是最后一个
+        self.deleted = False
 
     def execute(self):
         self.element = self.document.find_by_id(self.element_id)
         if self.element and self.element.parent:
             self.parent = self.element.parent
-            self.index = self.parent.children.index(self.element)
+            self.next_sibling = self.element.next_sibling
             self.parent.remove_child(self.element)
+            self.deleted = True
             print(f"Deleted <{self.element.tag_name}> with id '{self.element.id}'.")
         else:
             print(f"Element with id '{self.element_id}' not found or has no parent.")
 
     def undo(self):
-        if self.parent and self.element and self.index is not None:
-            self.parent.children.insert(self.index, self.element)
-            self.element.parent = self.parent
-            print(f"Undo Delete: Restored <{self.element.tag_name}> with id '{self.element.id}' to '{self.parent.id}'.")
\ No newline at end of file
+        if self.parent and self.element and self.deleted:
+            reference = self.next_sibling if self.next_sibling in self.parent.children else None
+            self.parent.insert_before(self.element, reference)
+            self.deleted = False
+            print(f"Undo Delete: Restored <{self.element.tag_name}> with id '{self.element.id}' to '{self.parent.id}'.")
+
+def find_destination(document: HTMLDocument, target_id: str, before: bool):
+    """
+    move/copy 的目标位置：before 时为 target 的父元素及 target 本身（插到它之前），
+    否则为 target 及 None（追加到末尾）。找不到时输出提示并返回 None。
+    """
+    target = document.find_by_id(target_id)
+    if target is None or (before and target.parent is None):
+        print(f"{'Insert location' if before else 'Parent element'} '{target_id}' not found.")
+        return None
+    return (target.parent, target) if before else (target, None)
+
+
+class MoveCommand(Command):
+    """
+    移动元素（连同子树）的命令。只重新链接，不重建子树，作为一条撤销记录。
+    """
+    def __init__(self, document: HTMLDocument, element_id: str, target_id: str, before: bool = False):
+        self.document = document
+        self.element_id = element_id
+        self.target_id = target_id
+        self.before = before  # True 表示移到 target 之前，否则移为 target 的最后一个子元素
+        self.element: Optional[HTMLElement] = None
+        self.old_parent: Optional[HTMLElement] = None
+        self.old_next_sibling: Optional[HTMLElement] = None
+        self.moved = False
+
+    def execute(self):
+        element = self.document.find_by_id(self.element_id)
+        if element is None or element.parent is None:
+            print(f"Element with id '{self.element_id}' not found or has no parent.")
+            return
+        destination = find_destination(self.document, self.target_id, self.before)
+        if destination is None:
+            return
+        parent, reference = destination
+        if element.contains(parent):
+            print(f"Cannot move '{self.element_id}' into itself or its descendant.")
+            return
+        if reference is element:
+            reference = element.next_sibling  # 移到自己之前即原地不动
+        self.element = element
+        self.old_parent = element.parent
+        self.old_next_sibling = element.next_sibling
+        parent.move_child(element, reference)
+        self.moved = True
+        print(f"Moved <{element.tag_name}> with id '{element.id}' {'before' if self.before else 'into'} '{self.target_id}'.")
+
+    def undo(self):
+        if self.moved and self.element.parent is not None:
+            reference = self.old_next_sibling if self.old_next_sibling in self.old_parent.children else None
+            self.old_parent.move_child(self.element, reference)
+            self.moved = False
+            print(f"Undo Move: Returned <{self.element.tag_name}> with id '{self.element.id}' to '{self.old_parent.id}'.")
+
+
+class CopyCommand(Command):
+    """
+    复制元素（连同子树）的命令。副本中的每个元素都获得新 id（以原 id 为前缀），作为一条撤销记录；
+    重做时沿用第一次生成的副本。
+    """
+    def __init__(self, document: HTMLDocument, element_id: str, target_id: str, before: bool = False):
+        self.document = document
+        self.element_id = element_id
+        self.target_id = target_id
+        self.before = before
+        self.copy: Optional[HTMLElement] = None
+        self.parent: Optional[HTMLElement] = None
+
+    def execute(self):
+        source = self.document.find_by_id(self.element_id)
+        if source is None:
+            print(f"Element with id '{self.element_id}' not found.")
+            return
+        destination = find_destination(self.document, self.target_id, self.before)
+        if destination is None:
+            return
+        self.parent, reference = destination
+        if self.copy is None:
+            # 分配器的计数器只增不减，连续分配的 id 互不相同
+            allocator = self.document.id_allocator
+            self.copy = source.clone(lambda element: allocator.allocate(element.id))
+        self.parent.insert_before(self.copy, reference)
+        print(f"Copied <{source.tag_name}> with id '{self.element_id}' to '{self.copy.id}' "
+              f"{'before' if self.before else 'into'} '{self.target_id}'.")
+
+    def undo(self):
+        if self.parent and self.copy in self.parent.children:
+            self.parent.remove_child(self.copy)
+            print(f"Undo Copy: Removed <{self.copy.tag_name}> with id '{self.copy.id}'.")
+
+
+class InsertFragmentCommand(Command):
+    """
+    把解析好的 HTML 片段（若干棵子树）整体插入文档的命令，作为一条撤销记录。
+    每棵子树挂入时一次性完成 id 登记、索引更新和拼写检查。
+    """
+    def __init__(self, document: HTMLDocument, elements: List[HTMLElement], target_id: str,
+                 before: bool = False):
+        self.document = document
+        self.elements = elements
+        self.target_id = target_id
+        self.before = before  # True 表示插到 target 之前，否则追加为 target 的子元素
+        self.parent: Optional[HTMLElement] = None
+
+    def execute(self):
+        destination = find_destination(self.document, self.target_id, self.before)
+        if destination is None:
+            return
+        self.parent, reference = destination
+        for element in self.elements:
+            self.parent.insert_before(element, reference)
+        count = sum(1 for element in self.elements for _ in element.iter())
+        print(f"Inserted {count} element(s) {'before' if self.before else 'into'} '{self.target_id}'.")
+
+    def undo(self):
+        if self.parent is None:
+            return
+        for element in reversed(self.elements):
+            if element in self.parent.children:
+                self.parent.remove_child(element)
+        print(f"Undo Insert HTML: Removed {len(self.elements)} fragment root(s) from '{self.parent.id}'.")
+
+
+class ReplaceCommand(Command):
+    """
+    在整个文档（或 scope 元素的子树）的文本中查找并替换，一次遍历完成，作为一条撤销记录。
+    只记录被修改元素的原文本；重做时只对这些元素重新替换。
+    """
+    def __init__(self, document: HTMLDocument, pattern: str, replacement: str,
+                 regex: bool = False, scope_id: Optional[str] = None):
+        self.document = document
+        self.pattern = pattern
+        self.replacement = replacement
+        self.regex = regex  # False 时按普通文本匹配
+        self.scope_id = scope_id
+        self.changes: Optional[List[Tuple[HTMLElement, str]]] = None  # (元素, 原文本)
+        self.applied = False
+
+    def compile(self) -> Optional[Callable[[str], Tuple[str, int]]]:
+        """
+        返回 文本 -> (替换后的文本, 替换次数) 的函数；模式无效时输出提示并返回 None。
+        """
+        if not self.pattern:
+            print("Replace pattern must not be empty.")
+            return None
+        if not self.regex:
+            pattern, replacement = self.pattern, self.replacement
+
+            def substitute(text: str) -> Tuple[str, int]:
+                # 大多数文本不含模式，先用 in 快速排除
+                if pattern not in text:
+                    return text, 0
+                return text.replace(pattern, replacement), text.count(pattern)
+            return substitute
+        try:
+            compiled = re.compile(self.pattern)
+        except re.error as error:
+            print(f"Invalid regular expression '{self.pattern}': {error}.")
+            return None
+        return lambda text: compiled.subn(self.replacement, text)
+
+    def execute(self):
+        substitute = self.compile()
+        if substitute is None:
+            return
+        start = time.perf_counter()
+        if self.changes is None:
+            scope = self.document.find_by_id(self.scope_id) if self.scope_id else self.document.root
+            if scope is None:
+                print(f"Element with id '{self.scope_id}' not found.")
+                return
+            elements = (element for element in scope.iter() if element.text_content)
+            self.changes = []
+        else:
+            # 重做：只需处理第一次执行时修改过的元素
+            elements = [element for element, _ in self.changes]
+        changes, count = [], 0
+        try:
+            for element in elements:
+                old_text = element.text_content
+                new_text, matches = substitute(old_text)
+                if matches and new_text != old_text:
+                    element.text_content = new_text
+                    changes.append((element, old_text))
+                    count += matches
+        except re.error as error:
+            # 替换串中引用了不存在的分组等，撤销已做的修改
+            for element, old_text in reversed(changes):
+                element.text_content = old_text
+            self.changes = None
+            print(f"Invalid replacement '{self.replacement}': {error}.")
+            return
+        self.changes = changes
+        self.applied = True
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"Replaced {count} match(es) in {len(changes)} element(s) in {elapsed:.1f} ms.")
+
+    def undo(self):
+        if self.applied:
+            for element, old_text in reversed(self.changes):
+                element.text_content = old_text
+            self.applied = False
+            print(f"Undo Replace: Restored text of {len(self.changes)} element(s).")
+
+
+class ReloadCommand(Command):
+    """
+    把磁盘上的新版本合并进正在编辑的文档：按 tree_diff 的编辑脚本就地修改，
+    未变化的子树（及其缓存的哈希、索引项）原样保留，作为一条撤销记录。
+    执行时把每一步记为可正反执行的操作：
+      ("remove", 元素, 父元素, 后一个兄弟)
+      ("add", 元素, 父元素, 后一个兄弟)
+      ("set", 元素, 属性名, 旧值, 新值)
+      ("root", 旧根元素, 新根元素)
+    """
+    def __init__(self, document: HTMLDocument, ops: List[tuple], new_document: HTMLDocument):
+        self.document = document
+        self.ops = ops
+        # 磁盘上的版本只保留根元素，用于校验合并结果和整体替换；不引用 new_document 本身，
+        # 执行后连根元素也不再保留（整体替换时它已记入 steps）
+        self.new_root: Optional[HTMLElement] = new_document.root
+        self.steps: Optional[List[tuple]] = None
+
+    def execute(self):
+        if self.steps is None:
+            self.steps = []
+            try:
+                self.apply_script()
+                merged = self.document.content_hash() == self.new_root.subtree_hash().hex()
+            except (KeyError, ValueError):
+                merged = False
+            if not merged:
+                # 编辑脚本无法原样回放（如两个元素互换 id、id 重复），退回为整体替换
+                self.rollback()
+                self.steps = [("root", self.document.root, self.new_root)]
+                self.forward(self.steps[0])
+            self.new_root = None
+        else:
+            for step in self.steps:
+                self.forward(step)
+        print(f"Applied {len(self.ops)} change(s) from disk.")
+
+    def undo(self):
+        if self.steps:
+            self.rollback()
+            print("Undo Reload: Restored the document to its state before reloading.")
+
+    def rollback(self):
+        for step in reversed(self.steps):
+            self.backward(step)
+
+    def apply_script(self):
+        """
+        回放编辑脚本，执行的每一步记入 self.steps。元素按 id 建一次索引，每一步 O(1) 定位，
+        不必逐步遍历文档查找。
+        """
+        elements = {}
+        for element in self.document.iter_elements():
+            elements.setdefault(element.id, element)
+
+        def record(step):
+            self.forward(step)
+            self.steps.append(step)
+
+        for name, *args in self.ops:
+            if name == "delete":
+                element = elements[args[0]]
+                record(("remove", element, element.parent, element.next_sibling))
+            elif name == "edit-id":
+                element = elements.pop(args[0])
+                record(("set", element, "id", args[0], args[1]))
+                elements[args[1]] = element
+            elif name in ("edit-text", "edit-lang"):
+                element = elements[args[0]]
+                attribute = "text_content" if name == "edit-text" else "lang"
+                value = args[1] if name == "edit-text" else args[1] or None
+                record(("set", element, attribute, getattr(element, attribute), value))
+            else:
+                tag, element_id, anchor_id, text = args
+                element = HTMLElement(tag, element_id, text)
+                anchor = elements[anchor_id]
+                if name == "insert":
+                    record(("add", element, anchor.parent, anchor))
+                else:
+                    record(("add", element, anchor, None))
+                elements[element_id] = element
+
+    def forward(self, step: tuple):
+        kind, element, *data = step
+        if kind == "remove":
+            data[0].remove_child(element)
+        elif kind == "add":
+            parent, reference = data
+            parent.insert_before(element, reference)
+        elif kind == "set":
+            setattr(element, data[0], data[2])
+        else:
+            self.document.root = data[0]
+
+    def backward(self, step: tuple):
+        kind, element, *data = step
+        if kind == "remove":
+            parent, reference = data
+            parent.insert_before(element, reference)
+        elif kind == "add":
+            data[0].remove_child(element)
+        elif kind == "set":
+            setattr(element, data[0], data[1])
+        else:
+            self.document.root = element
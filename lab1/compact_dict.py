@@ -0,0 +1,293 @@
+# compact_dict.py
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import string
+import struct
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# 文件布局（小端）：
+#   头部    MAGIC, 版本, 词数, 最长词长度
+#   偏移表  (词数 + 1) 个 uint32，指向字符串池
+#   词频表  词数 个 uint32
+#   字符串池 按 UTF-8 字节序排序后首尾相接的所有词
+MAGIC = b"HDIC"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sIII")
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+_open_dictionaries: Dict[str, 'CompactDictionary'] = {}  # 同一进程内按路径共享
+
+
+def should_check(word: str, longest_word_length: int) -> bool:
+    """
+    与 pyspellchecker 相同的过滤规则：跳过单个标点、数字和超长的词。
+    """
+    if len(word) == 1 and word in string.punctuation:
+        return False
+    if len(word) > longest_word_length + 3:
+        return False
+    if word.lower() == "nan":
+        return True
+    try:
+        float(word)
+        return False
+    except ValueError:
+        return True
+
+
+class Dictionary:
+    """
+    词典接口：子类提供 __contains__、frequency、items 和 longest_word_length。
+    """
+    longest_word_length = 0
+
+    def __contains__(self, word: str) -> bool:
+        raise NotImplementedError()
+
+    def frequency(self, word: str) -> int:
+        raise NotImplementedError()
+
+    def items(self) -> Iterator[Tuple[str, int]]:
+        raise NotImplementedError()
+
+    def fingerprint(self) -> str:
+        """
+        词典内容（词和词频）的指纹：内容相同的词典指纹相同，持久化的建议索引据此判断是否过期。
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for word, frequency in sorted(self.items()):
+            digest.update(f"{word}\0{frequency}\n".encode('utf-8'))
+        return digest.hexdigest()
+
+    def known(self, words: Iterable[str]) -> Set[str]:
+        """
+        返回 words 中在词典里的词（小写）。
+        """
+        return {w.lower() for w in words if should_check(w, self.longest_word_length) and w in self}
+
+    def unknown(self, words: Iterable[str]) -> Set[str]:
+        """
+        返回 words 中不在词典里的词（小写），接口与 SpellChecker.unknown 一致。
+        """
+        return {w.lower() for w in words if should_check(w, self.longest_word_length) and w not in self}
+
+    def is_misspelled(self, word: str) -> bool:
+        """
+        判断单个词是否拼写错误。
+        """
+        return should_check(word, self.longest_word_length) and word not in self
+
+
+class CompactDictionary(Dictionary):
+    """
+    只读、内存映射的编译词典。词按字节序排序存放在字符串池中，查询时二分查找，
+    多个进程映射同一文件时共享操作系统的页缓存。
+    """
+    CACHE_SIZE = 4096
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        with open(filepath, 'rb') as file:
+            self._buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, longest = HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._buffer.close()
+            raise ValueError(f"'{filepath}' is not a compiled dictionary (version {FORMAT_VERSION}).")
+        self.count = count
+        self.longest_word_length = longest
+        view = memoryview(self._buffer)
+        offsets_start = HEADER.size
+        frequencies_start = offsets_start + 4 * (count + 1)
+        self._pool_start = frequencies_start + 4 * count
+        self._offsets = view[offsets_start:frequencies_start].cast('I')
+        self._frequencies = view[frequencies_start:self._pool_start].cast('I')
+        self._cache: Dict[str, int] = {}  # 最近查询过的词 -> 词频（0 表示不存在）
+
+    def _word_at(self, index: int) -> bytes:
+        start = self._pool_start + self._offsets[index]
+        end = self._pool_start + self._offsets[index + 1]
+        return self._buffer[start:end]
+
+    def _find(self, key: bytes) -> int:
+        """
+        二分查找，返回词的下标；不存在时返回 -1。
+        """
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            current = self._word_at(middle)
+            if current < key:
+                low = middle + 1
+            elif current > key:
+                high = middle
+            else:
+                return middle
+        return -1
+
+    def frequency(self, word: str) -> int:
+        """
+        返回词频，不在词典中时返回 0。
+        """
+        word = word.lower()
+        cached = self._cache.get(word)
+        if cached is not None:
+            return cached
+        index = self._find(word.encode('utf-8'))
+        result = self._frequencies[index] if index >= 0 else 0
+        if len(self._cache) >= self.CACHE_SIZE:
+            self._cache.clear()
+        self._cache[word] = result
+        return result
+
+    def __contains__(self, word: str) -> bool:
+        return self.frequency(word) > 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(self.count):
+            yield self._word_at(index).decode('utf-8')
+
+    def items(self) -> Iterator[Tuple[str, int]]:
+        for index in range(self.count):
+            yield self._word_at(index).decode('utf-8'), self._frequencies[index]
+
+    def fingerprint(self) -> str:
+        # 文件内容即按字节序排好的词和词频，直接对映射求哈希，不必逐词解码
+        return hashlib.blake2b(self._buffer, digest_size=16).hexdigest()
+
+    def close(self):
+        self._offsets.release()
+        self._frequencies.release()
+        self._buffer.close()
+
+
+class LayeredDictionary(Dictionary):
+    """
+    在基础词典之上叠加项目自定义词表。自定义词表中的词总是被视为正确。
+    """
+    def __init__(self, base: Dictionary, user_word_lists: Optional[List[str]] = None):
+        self.base = base
+        self.longest_word_length = base.longest_word_length
+        self.user_words: Set[str] = set()
+        for filepath in user_word_lists or []:
+            self.load_word_list(filepath)
+
+    def load_word_list(self, filepath: str):
+        """
+        读取一个词表文件：每行一个词，# 开头的行为注释。
+        """
+        with open(filepath, 'r', encoding='utf-8') as file:
+            for line in file:
+                word = line.strip()
+                if word and not word.startswith('#'):
+                    self.add_word(word)
+
+    def add_word(self, word: str):
+        word = word.lower()
+        self.user_words.add(word)
+        if len(word) > self.longest_word_length:
+            self.longest_word_length = len(word)
+
+    def frequency(self, word: str) -> int:
+        frequency = self.base.frequency(word)
+        if frequency == 0 and word.lower() in self.user_words:
+            return 1
+        return frequency
+
+    def __contains__(self, word: str) -> bool:
+        return word.lower() in self.user_words or word in self.base
+
+    def __len__(self) -> int:
+        return len(self.base) + sum(1 for word in self.user_words if word not in self.base)
+
+    def fingerprint(self) -> str:
+        digest = hashlib.blake2b(self.base.fingerprint().encode('ascii'), digest_size=16)
+        for word in sorted(word for word in self.user_words if word not in self.base):
+            digest.update(f"{word}\n".encode('utf-8'))
+        return digest.hexdigest()
+
+    def items(self) -> Iterator[Tuple[str, int]]:
+        yield from self.base.items()
+        for word in self.user_words:
+            if word not in self.base:
+                yield word, 1
+
+
+def compile_dictionary(word_frequency: Dict[str, int], output_path: str) -> int:
+    """
+    将 词 -> 词频 的映射编译为紧凑词典文件，返回写入的词数。
+    """
+    merged: Dict[bytes, int] = {}
+    for word, frequency in word_frequency.items():
+        key = word.lower().encode('utf-8')
+        merged[key] = merged.get(key, 0) + int(frequency)
+    keys = sorted(merged)
+
+    offsets = [0]
+    for key in keys:
+        offsets.append(offsets[-1] + len(key))
+    frequencies = [min(merged[key], 0xFFFFFFFF) for key in keys]
+    longest = max((len(key.decode('utf-8')) for key in keys), default=0)
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(keys), longest))
+        file.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        file.write(struct.pack(f"<{len(frequencies)}I", *frequencies))
+        file.write(b"".join(keys))
+    os.replace(temp_path, output_path)
+    return len(keys)
+
+
+def load_word_frequency(language: str = "en") -> Dict[str, int]:
+    """
+    直接读取 pyspellchecker 自带的词频表，不必构造 SpellChecker。
+    """
+    import spellchecker
+    filepath = os.path.join(os.path.dirname(spellchecker.__file__), "resources", f"{language}.json.gz")
+    if not os.path.exists(filepath):
+        raise ValueError(f"No pyspellchecker word list for language '{language}'.")
+    with gzip.open(filepath, 'rt', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def default_dictionary_path(language: str = "en") -> str:
+    return os.path.join(DATA_DIR, f"{language}.dict")
+
+
+def open_dictionary(filepath: str) -> CompactDictionary:
+    """
+    打开（并在进程内复用）一个已编译的词典。
+    """
+    filepath = os.path.abspath(filepath)
+    dictionary = _open_dictionaries.get(filepath)
+    if dictionary is None:
+        dictionary = CompactDictionary(filepath)
+        _open_dictionaries[filepath] = dictionary
+    return dictionary
+
+
+def get_dictionary(language: str = "en") -> CompactDictionary:
+    """
+    获取某语言的默认编译词典；首次使用且文件不存在时从 pyspellchecker 词表编译。
+    """
+    filepath = default_dictionary_path(language)
+    if os.path.abspath(filepath) not in _open_dictionaries and not os.path.exists(filepath):
+        compile_dictionary(load_word_frequency(language), filepath)
+    return open_dictionary(filepath)
+
+
+def release_dictionary(language: str = "en"):
+    """
+    从进程内缓存中移除某语言的默认词典。映射在没有其他引用后由垃圾回收释放。
+    """
+    _open_dictionaries.pop(os.path.abspath(default_dictionary_path(language)), None)
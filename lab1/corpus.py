@@ -0,0 +1,196 @@
+# corpus.py
+"""
+确定性的合成 HTML 语料生成器，用于基准测试和压力测试。
+
+同一组参数和种子总是生成完全相同的文档。生成过程是流式的，内存占用只与树深有关，
+可以直接写出数 GB 的文件。
+
+用法:
+    python corpus.py out.html [--nodes 100000] [--depth 8] [--fan-out 6] [--text-length 8]
+                              [--misspelling-rate 0.02] [--duplicate-id-rate 0.0] [--seed 0]
+"""
+import argparse
+import io
+import random
+import time
+from collections import deque
+from typing import IO, Iterator, List, NamedTuple, Tuple, Union
+from model import HTMLDocument, HTMLElement
+
+OPEN = "open"
+CLOSE = "close"
+
+TITLE = "Synthetic corpus"
+TAGS = ("div", "p", "span", "section", "ul", "li", "h2", "a", "em", "strong")
+
+VOCABULARY = (
+    "the be to of and a in that have it for not on with he as you do at this but his by from they we "
+    "say her she or an will my one all would there their what so up out if about who get which go me "
+    "when make can like time no just him know take people into year your good some could them see other "
+    "than then now look only come its over think also back after use two how our work first well way even "
+    "new want because any these give day most us editor document paragraph section header footer content "
+    "item list update market history window number system program question government company world school "
+    "country problem service power family student important example different following"
+).split()
+
+WRITE_CHUNK = 1 << 20  # 累积约 1 MB 再写入磁盘
+DUPLICATE_POOL = 1024  # 重复 id 从最近生成的这么多个 id 中选取
+
+
+class CorpusSpec(NamedTuple):
+    node_count: int = 1000          # body 内的元素个数
+    max_depth: int = 8              # body 以下的最大嵌套深度
+    fan_out: int = 6                # 每个元素的最大子元素数（body 不受限）
+    text_length: int = 8            # 每个元素文本的平均单词数，0 表示不带文本
+    misspelling_rate: float = 0.02  # 单词被改写为拼写错误的概率
+    duplicate_id_rate: float = 0.0  # 元素复用已有 id 的概率
+    seed: int = 0
+
+
+def misspell(word: str, rng: random.Random) -> str:
+    """
+    对单词做一次随机的删除、重复、交换或替换字母。
+    """
+    if len(word) < 2:
+        return word + rng.choice("qxz")
+    position = rng.randrange(len(word) - 1)
+    operation = rng.randrange(4)
+    if operation == 0:
+        return word[:position] + word[position + 1:]
+    if operation == 1:
+        return word[:position] + word[position] + word[position:]
+    if operation == 2:
+        return word[:position] + word[position + 1] + word[position] + word[position + 2:]
+    return word[:position] + rng.choice("qxzjkv") + word[position + 1:]
+
+
+def make_text(spec: CorpusSpec, rng: random.Random) -> str:
+    if spec.text_length <= 0:
+        return ""
+    count = rng.randint(1, 2 * spec.text_length - 1)
+    text = []
+    for _ in range(count):
+        word = rng.choice(VOCABULARY)
+        if spec.misspelling_rate and rng.random() < spec.misspelling_rate:
+            word = misspell(word, rng)
+        text.append(word)
+    return " ".join(text)
+
+
+def iter_nodes(spec: CorpusSpec) -> Iterator[Tuple]:
+    """
+    按文档顺序产生 body 内的事件：(OPEN, depth, tag, id, text) 与 (CLOSE, depth, tag)，
+    depth 从 1 开始。恰好产生 spec.node_count 个 OPEN 事件。
+    """
+    rng = random.Random(spec.seed)
+    recent_ids = deque(maxlen=DUPLICATE_POOL)
+    # 栈中每项为 [tag, 计划的子元素数, 已生成的子元素数]
+    stack: List[list] = []
+    remaining = spec.node_count
+    serial = 0
+    while remaining or stack:
+        if stack:
+            tag, planned, emitted = stack[-1]
+            if not remaining or emitted >= planned:
+                stack.pop()
+                yield (CLOSE, len(stack) + 1, tag)
+                continue
+            stack[-1][2] += 1
+        depth = len(stack) + 1
+        serial += 1
+        tag = rng.choice(TAGS)
+        if recent_ids and spec.duplicate_id_rate and rng.random() < spec.duplicate_id_rate:
+            element_id = rng.choice(recent_ids)
+        else:
+            element_id = f"n{serial}"
+            recent_ids.append(element_id)
+        planned = rng.randint(0, spec.fan_out) if depth < spec.max_depth else 0
+        text = make_text(spec, rng)
+        remaining -= 1
+        yield (OPEN, depth, tag, element_id, text)
+        stack.append([tag, planned, 0])
+
+
+def write_html(spec: CorpusSpec, output: Union[str, IO[str]]) -> int:
+    """
+    把生成的文档流式写入文件（路径或已打开的文本文件），返回写入的字符数。
+    """
+    if isinstance(output, str):
+        with open(output, 'w', encoding='utf-8') as file:
+            return write_html(spec, file)
+    written = 0
+    buffer: List[str] = [f'<html>\n  <head>\n    <title>{TITLE}</title>\n  </head>\n  <body>\n']
+    buffered = len(buffer[0])
+    for event in iter_nodes(spec):
+        indent = "  " * (event[1] + 1)
+        if event[0] == OPEN:
+            _, _, tag, element_id, text = event
+            line = f'{indent}<{tag} id="{element_id}">{text}\n'
+        else:
+            line = f'{indent}</{event[2]}>\n'
+        buffer.append(line)
+        buffered += len(line)
+        if buffered >= WRITE_CHUNK:
+            output.write("".join(buffer))
+            written += buffered
+            buffer.clear()
+            buffered = 0
+    buffer.append('  </body>\n</html>\n')
+    buffered += len(buffer[-1])
+    output.write("".join(buffer))
+    return written + buffered
+
+
+def generate_html(spec: CorpusSpec) -> str:
+    """
+    生成较小的文档并以字符串返回。
+    """
+    output = io.StringIO()
+    write_html(spec, output)
+    return output.getvalue()
+
+
+def build_document(spec: CorpusSpec) -> HTMLDocument:
+    """
+    不经过 HTML 解析，直接构建同样结构的 HTMLDocument。
+    重复的 id 与解析器的处理一致：以原 id 为前缀重新分配。
+    """
+    document = HTMLDocument()
+    document.title.text_content = TITLE
+    allocator = document.id_allocator
+    stack = [document.body]
+    for event in iter_nodes(spec):
+        if event[0] == OPEN:
+            _, _, tag, element_id, text = event
+            element = HTMLElement(tag, allocator.claim(element_id), text)
+            stack[-1].add_child(element)
+            stack.append(element)
+        else:
+            stack.pop()
+    return document
+
+
+def main(argv=None):
+    defaults = CorpusSpec()
+    arg_parser = argparse.ArgumentParser(description="Generate a deterministic synthetic HTML corpus.")
+    arg_parser.add_argument("output", help="output HTML file")
+    arg_parser.add_argument("--nodes", type=int, default=defaults.node_count)
+    arg_parser.add_argument("--depth", type=int, default=defaults.max_depth)
+    arg_parser.add_argument("--fan-out", type=int, default=defaults.fan_out)
+    arg_parser.add_argument("--text-length", type=int, default=defaults.text_length,
+                            help="average number of words per element text")
+    arg_parser.add_argument("--misspelling-rate", type=float, default=defaults.misspelling_rate)
+    arg_parser.add_argument("--duplicate-id-rate", type=float, default=defaults.duplicate_id_rate)
+    arg_parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = arg_parser.parse_args(argv)
+
+    spec = CorpusSpec(args.nodes, args.depth, args.fan_out, args.text_length,
+                      args.misspelling_rate, args.duplicate_id_rate, args.seed)
+    start = time.perf_counter()
+    size = write_html(spec, args.output)
+    print(f"Wrote {spec.node_count} elements ({size / (1024 * 1024):.1f} MB) to '{args.output}' "
+          f"in {time.perf_counter() - start:.2f}s.")
+
+
+if __name__ == "__main__":
+    main()
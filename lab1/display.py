@@ -4,6 +4,8 @@ import io
 from io_manager import FNode
 from contextlib import redirect_stdout
 from typing import Protocol
+from instrumentation import NodeCounter
+from tracing import traced
 
 class DisplayStrategy(Protocol):
     """
@@ -16,11 +18,13 @@ class TreeDisplayStrategy(DisplayStrategy):
     """
     树形展示逻辑，适用于任意实现 TreeNode 接口的对象。
     """
+    @traced("render.tree", "render")
     def display(self, tree: TreeNode, show_id: bool=True) -> str:
         res = self._generate_node(tree.root, "", is_last=True,show_id=show_id)
         return res
 
     def _generate_node(self, node: TreeNode, prefix: str, is_last: bool, show_id: bool) -> str:
+        NodeCounter.count += 1
         result = []
         connector = "└── " if is_last else "├── "
         text_connector = "    " if is_last else "│   "
@@ -64,6 +68,7 @@ class IndentDisplayStrategy(DisplayStrategy):
     def __init__(self, indent_size: int = 2):
         self.indent_size = indent_size
 
+    @traced("render.indent", "render")
     def display(self, tree, show_id: bool=True):
         #print("start to show indent form")
         res =  self.serialize_element(tree.root, 0, show_id)
@@ -71,6 +76,7 @@ class IndentDisplayStrategy(DisplayStrategy):
         #print("finish to show indent form")
 
     def serialize_element(self, node, level: int, show_id: bool) -> str:
+        NodeCounter.count += 1
         indent = ' ' * (self.indent_size * level)
 
         display_name = ''
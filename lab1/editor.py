@@ -1,5 +1,5 @@
 # editor.py
-from typing import List
+from typing import List, Optional
 from commands import Command
 
 class Editor:
@@ -10,9 +10,22 @@ class Editor:
         self.document = document
         self.undo_stack: List[Command] = []
         self.redo_stack: List[Command] = []
-        self.is_modified = False
+        self.saved_hash = document.content_hash()  # 最近一次加载或保存时的文档内容哈希
         self.show_id = True  # 默认显示 id
 
+    @property
+    def is_modified(self) -> bool:
+        """
+        文档内容是否与最近一次加载或保存时不同。编辑后再撤销回原样视为未修改。
+        """
+        return self.document.content_hash() != self.saved_hash
+
+    def mark_saved(self, content_hash: Optional[str] = None):
+        """
+        记录当前内容为已保存状态。
+        """
+        self.saved_hash = content_hash or self.document.content_hash()
+
     def execute_command(self, command: Command):
         """
         执行命令，并将其推入 Undo 栈，清空 Redo 栈。
@@ -20,7 +33,6 @@ class Editor:
         command.execute()
         self.undo_stack.append(command)
         self.redo_stack.clear()
-        self.is_modified = True
 
     def undo(self):
         """
@@ -30,7 +42,6 @@ class Editor:
             command = self.undo_stack.pop()
             command.undo()
             self.redo_stack.append(command)
-            self.is_modified = True
         else:
             print("Nothing to undo.")
 
@@ -42,7 +53,6 @@ class Editor:
             command = self.redo_stack.pop()
             command.execute()
             self.undo_stack.append(command)
-            self.is_modified = True
         else:
             print("Nothing to redo.")
 
@@ -51,5 +61,4 @@ class Editor:
         清除 Undo 和 Redo 栈。
         """
         self.undo_stack.clear()
-        self.redo_stack.clear()
-        self.is_modified = False
\ No newline at end of file
+        self.redo_stack.clear()
\ No newline at end of file
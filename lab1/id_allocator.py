@@ -0,0 +1,54 @@
+# id_allocator.py
+from typing import Dict
+
+
+class IdAllocator:
+    """
+    文档内的 id 分配器。记录已被占用的 id（引用计数），并为每个前缀维护递增计数器，
+    以 O(1) 均摊时间生成形如 "p-17"、"text-2031" 的唯一 id。
+    """
+    def __init__(self):
+        self.taken: Dict[str, int] = {}     # id -> 使用该 id 的元素个数
+        self.counters: Dict[str, int] = {}  # 前缀 -> 上次分配的序号
+
+    def is_taken(self, id_value: str) -> bool:
+        return id_value in self.taken
+
+    def acquire(self, id_value: str):
+        """
+        登记一个已进入文档的 id。
+        """
+        self.taken[id_value] = self.taken.get(id_value, 0) + 1
+
+    def release(self, id_value: str):
+        """
+        注销一个离开文档的 id。
+        """
+        count = self.taken.get(id_value, 0)
+        if count <= 1:
+            self.taken.pop(id_value, None)
+        else:
+            self.taken[id_value] = count - 1
+
+    def allocate(self, prefix: str) -> str:
+        """
+        生成一个当前未被占用的新 id。计数器只增不减，
+        因此连续调用即使尚未登记也不会得到相同的 id。
+        """
+        number = self.counters.get(prefix, 0)
+        while True:
+            number += 1
+            candidate = f"{prefix}-{number}"
+            if candidate not in self.taken:
+                break
+        self.counters[prefix] = number
+        return candidate
+
+    def claim(self, preferred: str) -> str:
+        """
+        preferred 未被占用时直接使用，否则以它为前缀分配新 id。
+        """
+        return preferred if preferred not in self.taken else self.allocate(preferred)
+
+    def clear(self):
+        self.taken.clear()
@@ -0,0 +1,162 @@
+# instrumentation.py
+import cProfile
+import functools
+import math
+import os
+import pstats
+import re
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional
+
+
+class NodeCounter:
+    """
+    全局的节点访问计数。遍历、查找、解析、渲染等处每访问一个节点加一，
+    执行命令前后相减即为该命令触及的节点数。
+    只在 measure / timed 执行期间计数（enabled），平时遍历和查找在每次调用时检查一次开关，不逐节点计数。
+    """
+    count = 0
+    enabled = False
+
+
+class Sample(NamedTuple):
+    wall: float  # 秒
+    cpu: float   # 秒
+    nodes: int
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """
+    最近秩法求百分位数，sorted_values 须已排序且非空。
+    """
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class CommandStats:
+    """
+    按名称（命令名或被计时的函数名）记录耗时样本，每个名称保留最近 max_samples 个。
+    """
+    def __init__(self, max_samples: int = 1000):
+        self.max_samples = max_samples
+        self.samples: Dict[str, Deque[Sample]] = {}
+        self.counts: Dict[str, int] = {}
+
+    def record(self, name: str, wall: float, cpu: float, nodes: int = 0):
+        if name not in self.samples:
+            self.samples[name] = deque(maxlen=self.max_samples)
+            self.counts[name] = 0
+        self.samples[name].append(Sample(wall, cpu, nodes))
+        self.counts[name] += 1
+
+    def reset(self):
+        self.samples.clear()
+        self.counts.clear()
+
+    def summary(self, name: str) -> Dict[str, float]:
+        samples = self.samples[name]
+        walls = sorted(sample.wall for sample in samples)
+        cpus = sorted(sample.cpu for sample in samples)
+        return {
+            "count": self.counts[name],
+            "p50": percentile(walls, 0.50),
+            "p95": percentile(walls, 0.95),
+            "max": walls[-1],
+            "cpu_p50": percentile(cpus, 0.50),
+            "nodes_avg": sum(sample.nodes for sample in samples) / len(samples),
+        }
+
+    def format_table(self) -> str:
+        if not self.samples:
+            return "No statistics recorded."
+        header = f"{'name':24s} {'count':>6s} {'p50 ms':>9s} {'p95 ms':>9s} {'max ms':>9s} {'cpu p50':>9s} {'nodes':>9s}"
+        lines = [header, "-" * len(header)]
+        rows = sorted(self.samples, key=lambda name: -self.summary(name)["p95"])
+        for name in rows:
+            summary = self.summary(name)
+            lines.append(
+                f"{name:24s} {summary['count']:6d} {summary['p50'] * 1000:9.3f} {summary['p95'] * 1000:9.3f} "
+                f"{summary['max'] * 1000:9.3f} {summary['cpu_p50'] * 1000:9.3f} {summary['nodes_avg']:9.0f}")
+        return "\n".join(lines)
+
+
+class Profiler:
+    """
+    开启后用 cProfile 包裹命令执行，并按命令名把累积的 pstats 写入 output_dir。
+    """
+    def __init__(self, output_dir: str = "profiles"):
+        self.enabled = False
+        self.output_dir = output_dir
+        self.stats: Dict[str, pstats.Stats] = {}
+
+    def enable(self, output_dir: Optional[str] = None):
+        if output_dir:
+            self.output_dir = output_dir
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        self.stats.clear()
+
+    def dump_path(self, name: str) -> str:
+        safe_name = re.sub(r"[^\w.-]", "_", name)
+        return os.path.join(self.output_dir, f"{safe_name}.pstats")
+
+    def run(self, name: str, func: Callable[[], None]):
+        profile = cProfile.Profile()
+        try:
+            profile.runcall(func)
+        finally:
+            if name in self.stats:
+                self.stats[name].add(profile)
+            else:
+                self.stats[name] = pstats.Stats(profile)
+            self.stats[name].dump_stats(self.dump_path(name))
+
+
+# 进程内共享的统计与分析器
+stats = CommandStats()
+profiler = Profiler()
+
+
+def measure(name: str, func: Callable[[], None], command_stats: Optional[CommandStats] = None):
+    """
+    执行 func 并记录墙钟时间、CPU 时间与触及的节点数；分析器开启时在 cProfile 下执行。
+    """
+    command_stats = command_stats or stats
+    counting, NodeCounter.enabled = NodeCounter.enabled, True
+    nodes_before = NodeCounter.count
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        if profiler.enabled:
+            profiler.run(name, func)
+        else:
+            func()
+    finally:
+        NodeCounter.enabled = counting
+        command_stats.record(name, time.perf_counter() - wall_start, time.process_time() - cpu_start,
+                             NodeCounter.count - nodes_before)
+
+
+def timed(name: str):
+    """
+    装饰器：记录被装饰函数每次调用的耗时，名称出现在 stats 命令的输出中。
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            counting, NodeCounter.enabled = NodeCounter.enabled, True
+            nodes_before = NodeCounter.count
+            wall_start = time.perf_counter()
+            cpu_start = time.process_time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                NodeCounter.enabled = counting
+                stats.record(name, time.perf_counter() - wall_start, time.process_time() - cpu_start,
+                             NodeCounter.count - nodes_before)
+        return wrapper
+    return decorator
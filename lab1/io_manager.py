@@ -1,11 +1,30 @@
 # io_manager.py
 from bs4 import BeautifulSoup, NavigableString
-from model import HTMLDocument, HTMLElement
+from html import unescape
+from html.parser import HTMLParser as Tokenizer
+from child_list import ChildList
+from model import HTMLDocument, HTMLElement, MappedSource, TextRef, node_digest
 from model import TreeNode
-from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+from instrumentation import NodeCounter, timed
+from tracing import traced, tracer
+from typing import Dict, List, Optional, Set, TextIO, Tuple, Union, TYPE_CHECKING
 if TYPE_CHECKING:
     from display import DisplayStrategy
+import hashlib
+import mmap
 import os
+import sys
+
+# 这四个标签有且仅有一个，缺省 id 为标签名
+SPECIAL_TAGS = ("html", "head", "title", "body")
+# 没有结束标签的空元素（与 BeautifulSoup 的 html.parser 一致，遇到开始标签即关闭）
+VOID_TAGS = frozenset(("area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link",
+                       "menuitem", "meta", "param", "source", "track", "wbr"))
+CHUNK_SIZE = 1 << 16  # 流式解析每次读入的字符数
+STDIN = "-"  # 作为文件名时表示从标准输入读取
+MIN_REF_BYTES = 64  # 短于此的文本直接保存为字符串：TextRef 对象本身也要占几十字节
+OUTLINE_DEPTH = 2  # 骨架解析建立的层数（<body> 的子元素为第 1 层），更深的子树按需展开
+RAW_TEXT_TAGS = ("script", "style")  # 内容不按标签解析，不能单独解析其内容，骨架中直接建立
 
 class HTMLParser:
     """
@@ -16,14 +35,21 @@ class HTMLParser:
     def get_direct_text(self, tag) -> str:
         return "".join(child.strip() for child in tag.contents if isinstance(child, NavigableString))
 
+    @timed("HTMLParser.parse")
+    @traced("HTMLParser.parse", "parse")
     def parse(self, filepath: str) -> HTMLDocument:
         if not os.path.exists(filepath):
             print(f"File '{filepath}' does not exist.")
             return None
-        with open(filepath, 'r', encoding='utf-8') as file:
-            content = file.read()
-        soup = BeautifulSoup(content, 'html.parser')
+        with tracer.span("read_file", "io"):
+            with open(filepath, 'r', encoding='utf-8') as file:
+                content = file.read()
+        with tracer.span("BeautifulSoup", "parse", bytes=len(content)):
+            soup = BeautifulSoup(content, 'html.parser')
         document = HTMLDocument()
+        html = soup.find('html')
+        if html and html.get('lang'):
+            document.root.lang = html.get('lang')
 
         # 解析 <head>
         head = soup.find('head')
@@ -31,69 +57,680 @@ class HTMLParser:
             for child in head.children:
                 if child.name:
                     tag = child.name
-                    id_attr = child.get('id', tag)
-                    text = self.get_direct_text(child)
-                    element = HTMLElement(tag, id_attr, text)
                     # 对title进行特殊处理 原来存在的init模板中的删了重新加
                     if tag == 'title': 
                         title_element = document.head.find_by_id("title")
                         document.head.remove_child(title_element)
+                    id_attr = self.get_unique_id(child, document)
+                    text = self.get_direct_text(child)
+                    element = HTMLElement(tag, id_attr, text, child.get('lang'))
                     document.head.add_child(element)
 
         # 解析 <body>
         body = soup.find('body')
         if body:
+            document.body.lang = body.get('lang')
             for child in body.children:
                 if isinstance(child, str):
                     # 文本节点
                     text = child.strip()
                     if text:
-                        text_element = HTMLElement("text", "text", text)   # TODO Text ID 的唯一性
+                        text_id = document.id_allocator.allocate("text")
+                        text_element = HTMLElement("text", text_id, text)
                         document.body.add_child(text_element)
                 elif child.name:
-                    element = self.parse_element(child)
-                    document.body.add_child(element)
+                    self.parse_element(child, document.body)
+
+        return document
+
+    @timed("HTMLParser.parse_stream")
+    @traced("HTMLParser.parse_stream", "parse")
+    def parse_stream(self, source: Union[str, TextIO], chunk_size: int = CHUNK_SIZE) -> Optional[HTMLDocument]:
+        """
+        流式解析：source 为文件路径（可以是命名管道）、"-"（标准输入）或已打开的文本流，
+        每次读入 chunk_size 个字符交给 StreamTreeBuilder，结果与 parse 相同。
+        适合不能整体读入内存的大文件和管道输入。
+        """
+        if isinstance(source, str) and source != STDIN:
+            if not os.path.exists(source):
+                print(f"File '{source}' does not exist.")
+                return None
+            with open(source, 'r', encoding='utf-8') as file:
+                return self.parse_stream(file, chunk_size)
+        stream = sys.stdin if source == STDIN else source
+        document = HTMLDocument()
+        builder = StreamTreeBuilder(document)
+        total = 0
+        while True:
+            with tracer.span("read_chunk", "io"):
+                chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            total += len(chunk)
+            builder.feed(chunk)
+        with tracer.span("finish", "parse", chars=total):
+            builder.close()
+        return document
 
+    @timed("HTMLParser.parse_mapped")
+    @traced("HTMLParser.parse_mapped", "parse")
+    def parse_mapped(self, filepath: str, chunk_size: int = CHUNK_SIZE) -> Optional[HTMLDocument]:
+        """
+        只读映射（mmap）文件后流式解析，较长的文本保存为指向映射的 TextRef，访问时才解码，
+        修改后换成字符串。结果与 parse 相同，适合体积大、以阅读为主的文档。
+        文件在打开期间不应被其他程序原地改写（HTMLWriter 覆盖它时会先写临时文件再替换）；
+        会话发现文件被修改时把映射的内容复制到内存（HTMLDocument.release_mapping）。
+        无法映射的文件（空文件、管道）退回 parse_stream。
+        """
+        if not os.path.exists(filepath):
+            print(f"File '{filepath}' does not exist.")
+            return None
+        with open(filepath, 'rb') as file:
+            try:
+                source = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                return self.parse_stream(filepath, chunk_size)
+            stat = os.fstat(file.fileno())
+        document = HTMLDocument()
+        document.mapped_file = os.path.realpath(filepath)
+        document.mapped_source = MappedSource(source, (stat.st_dev, stat.st_ino))
+        builder = MappedTreeBuilder(document, document.mapped_source)
+        for start in range(0, len(source), chunk_size):
+            builder.feed(source[start:start + chunk_size].decode('latin-1'))
+        with tracer.span("finish", "parse", bytes=len(source)):
+            builder.close()
         return document
 
-    def parse_element(self, bs_element) -> HTMLElement:
+    @timed("HTMLParser.parse_skeleton")
+    @traced("HTMLParser.parse_skeleton", "parse")
+    def parse_skeleton(self, filepath: str, outline_depth: int = OUTLINE_DEPTH,
+                       chunk_size: int = CHUNK_SIZE) -> Optional[HTMLDocument]:
+        """
+        骨架解析：与 parse_mapped 相同地映射文件，但只建立 <body> 下 outline_depth 层的元素，
+        更深的子树记为字节范围，在命令、显示或检索第一次访问时才展开（见 SkeletonElement）。
+        展开后的结果（包括 id）与 parse 相同。适合只操作大文档靠上部分的场景。
+        """
+        if not os.path.exists(filepath):
+            print(f"File '{filepath}' does not exist.")
+            return None
+        with open(filepath, 'rb') as file:
+            try:
+                source = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                return self.parse_stream(filepath, chunk_size)
+            stat = os.fstat(file.fileno())
+        document = HTMLDocument()
+        document.mapped_file = os.path.realpath(filepath)
+        document.mapped_source = MappedSource(source, (stat.st_dev, stat.st_ino))
+        builder = SkeletonTreeBuilder(document, document.mapped_source, outline_depth)
+        for start in range(0, len(source), chunk_size):
+            builder.feed(source[start:start + chunk_size].decode('latin-1'))
+        with tracer.span("finish", "parse", bytes=len(source)):
+            builder.close()
+        return document
+
+    def get_unique_id(self, bs_element, document: HTMLDocument) -> str:
+        """
+        确定元素的 id：html/head/title/body 缺省为标签名；其他元素缺省时按标签名分配，
+        与文档中已有 id 重复时以原 id 为前缀重新分配。
+        """
         tag = bs_element.name
-        id_attr = bs_element.get('id', tag)
-        text = self.get_direct_text(bs_element)
-        element = HTMLElement(tag, id_attr, text)
+        id_attr = bs_element.get('id')
+        if not id_attr:
+            return tag if tag in SPECIAL_TAGS else document.id_allocator.allocate(tag)
+        return document.id_allocator.claim(id_attr)
+
+    def parse_element(self, bs_element, parent: HTMLElement) -> HTMLElement:
+        """
+        自顶向下构建：先把元素挂到父元素上再解析其子元素，
+        这样后续 id 的冲突检查能看到已解析的部分。
+        """
+        NodeCounter.count += 1
+        with tracer.span("parse_element", "parse"):
+            document = parent.get_document()
+            tag = bs_element.name
+            id_attr = self.get_unique_id(bs_element, document) if document else bs_element.get('id', tag)
+            text = self.get_direct_text(bs_element)
+            element = HTMLElement(tag, id_attr, text, bs_element.get('lang'))
+            parent.add_child(element)
         for child in bs_element.children:
             if child.name:
-                child_element = self.parse_element(child)
-                element.add_child(child_element)
+                self.parse_element(child, element)
         return element
 
+    @timed("HTMLParser.parse_fragment")
+    @traced("HTMLParser.parse_fragment", "parse")
+    def parse_fragment(self, content: str, document: HTMLDocument) -> List[HTMLElement]:
+        """
+        把 HTML 片段解析为若干棵不属于任何文档的子树（顶层文本成为 text 元素），
+        id 按 document 中已有的 id 去重，片段内部也互不重复。
+        构建时不做拼写检查和索引登记，挂入文档时再对整棵子树一次完成。
+        """
+        with tracer.span("BeautifulSoup", "parse", bytes=len(content)):
+            soup = BeautifulSoup(content, 'html.parser')
+        allocator = document.id_allocator
+        pending = set()  # 片段中已使用、但尚未登记到文档的 id
+
+        def fragment_id(preferred: Optional[str], tag: str) -> str:
+            candidate = allocator.claim(preferred) if preferred else allocator.allocate(tag)
+            while candidate in pending:
+                candidate = allocator.allocate(preferred or tag)
+            pending.add(candidate)
+            return candidate
+
+        roots = []
+        stack = []  # (bs 节点, 父元素)，父元素为 None 表示顶层
+        for child in reversed(list(soup.children)):
+            stack.append((child, None))
+        while stack:
+            bs_element, parent = stack.pop()
+            if bs_element.name is None:
+                # 只有顶层文本单独成为元素（跳过注释等），元素内的文本已归入其 text_content
+                if parent is None and type(bs_element) is NavigableString and bs_element.strip():
+                    roots.append(HTMLElement("text", fragment_id(None, "text"), bs_element.strip()))
+                continue
+            NodeCounter.count += 1
+            element = HTMLElement(bs_element.name, fragment_id(bs_element.get('id'), bs_element.name),
+                                  self.get_direct_text(bs_element), bs_element.get('lang'))
+            if parent is None:
+                roots.append(element)
+            else:
+                parent.children.append(element)
+                element.parent = parent
+            for child in reversed(list(bs_element.children)):
+                if child.name:
+                    stack.append((child, element))
+        return roots
+
+    def load_fragment(self, filepath: str, document: HTMLDocument) -> Optional[List[HTMLElement]]:
+        """
+        读取文件中的 HTML 片段，文件不存在时返回 None。
+        """
+        if not os.path.exists(filepath):
+            print(f"File '{filepath}' does not exist.")
+            return None
+        with open(filepath, 'r', encoding='utf-8') as file:
+            return self.parse_fragment(file.read(), document)
+
+class StreamTreeBuilder(Tokenizer):
+    """
+    流式解析的建树器：由标准库的增量分词器逐块喂入文本，在回调中直接构建 HTMLElement，
+    不保留原始文本和 soup，峰值内存只取决于树本身。
+
+    结果与 HTMLParser.parse 相同：只解析 <head> 的直接子元素和 <body> 的整棵子树，
+    元素文本为其直接文本（含注释）逐段去除首尾空白后拼接，<body> 下的顶层文本成为 text 元素。
+    元素在开始标签时创建（按文档顺序分配 id），挂在尚未加入文档的父元素下；
+    <body> 的子元素在结束标签处连同整棵子树一次加入文档，
+    因此监听者在解析过程中就能逐个看到已完成的顶层元素。
+    """
+    def __init__(self, document: HTMLDocument):
+        super(StreamTreeBuilder, self).__init__(convert_charrefs=True)
+        self.document = document
+        self.section: Optional[str] = None  # 当前所在的 "head" 或 "body"
+        self.seen: Set[str] = set()  # 已解析过的 head/body，只取第一个
+        # 打开的元素：(标签名, 元素)，元素为 None 表示 head/body 本身或被忽略的标签
+        self.stack: List[Tuple[str, Optional[HTMLElement]]] = []
+        self.texts: List[List[str]] = []  # 与 stack 对应：各元素已去除首尾空白的文本段
+        self.run: List[str] = []  # 当前正在累积的文本段（分词器可能把一段文本拆成多次回调）
+        self.pending: Set[str] = set()  # 尚未加入文档的子树中已使用的 id
+
+    def element_id(self, tag: str, preferred: Optional[str]) -> str:
+        if not preferred and tag in SPECIAL_TAGS:
+            return tag
+        allocator = self.document.id_allocator
+        candidate = allocator.claim(preferred) if preferred else allocator.allocate(tag)
+        while candidate in self.pending:
+            candidate = allocator.allocate(preferred or tag)
+        self.pending.add(candidate)
+        return candidate
+
+    def take_text(self) -> Union[str, TextRef, None]:
+        """
+        取出当前文本段（去除首尾空白）。
+        """
+        if not self.run:
+            return None
+        text = "".join(self.run).strip()
+        self.run.clear()
+        return text
+
+    def flush_text(self):
+        """
+        结束当前文本段。
+        """
+        text = self.take_text()
+        if text:
+            self.add_text(text)
+
+    def add_text(self, text: Union[str, TextRef]):
+        """
+        <body> 顶层的文本成为 text 元素，其余归入所在元素的文本。
+        """
+        if not self.stack:
+            return
+        if self.section == "body" and len(self.stack) == 1:
+            self.document.body.add_child(HTMLElement("text", self.document.id_allocator.allocate("text"), text))
+        else:
+            self.texts[-1].append(text)
+
+    def handle_starttag(self, tag: str, attrs):
+        attributes = dict(attrs)
+        if tag == "html" and not self.stack and attributes.get("lang"):
+            self.document.root.lang = attributes["lang"]
+        if tag == "body" and self.section == "head":
+            # 省略了 </head>：先结束 <head>
+            self.flush_text()
+            while self.stack:
+                self.close_top()
+        if self.section is None:
+            if tag in ("head", "body") and tag not in self.seen:
+                self.seen.add(tag)
+                self.section = tag
+                self.run.clear()
+                self.stack.append((tag, None))
+                self.texts.append([])
+                if tag == "body":
+                    self.document.body.lang = attributes.get("lang")
+            return
+        self.flush_text()
+        parent = self.stack[-1][1]
+        if self.section == "head" and (len(self.stack) > 1 or tag in ("head", "body")):
+            element = None  # <head> 只取直接子元素
+        else:
+            NodeCounter.count += 1
+            if self.section == "head" and tag == "title":
+                self.document.head.remove_child(self.document.head.find_by_id("title"))
+            element = HTMLElement(tag, self.element_id(tag, attributes.get("id")), "", attributes.get("lang"))
+            if parent is not None:
+                parent.children.append(element)
+                element.parent = parent
+        self.stack.append((tag, element))
+        self.texts.append([])
+        if tag in VOID_TAGS:
+            self.close_top()
+
+    def handle_startendtag(self, tag: str, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str):
+        # 与 BeautifulSoup 相同：关闭最近的同名元素及其内部未关闭的元素，没有同名元素时忽略（但仍结束当前文本段）
+        self.flush_text()
+        if not any(name == tag for name, _ in self.stack):
+            return
+        while self.stack:
+            name = self.stack[-1][0]
+            self.close_top()
+            if name == tag:
+                break
+
+    def close_top(self):
+        tag, element = self.stack.pop()
+        parts = self.texts.pop()
+        if not self.stack:
+            self.section = None
+            return
+        if element is None:
+            return
+        element._text_content = parts[0] if len(parts) == 1 else "".join(map(str, parts))
+        if len(self.stack) == 1:
+            self.attach(element)
+
+    def attach(self, element: HTMLElement):
+        """
+        head/body 的直接子元素：连同子树一次加入文档（登记 id、拼写检查、通知监听者）。
+        """
+        container = self.document.head if self.section == "head" else self.document.body
+        container.add_child(element)
+        self.pending.clear()
+
+    def handle_data(self, data: str):
+        if self.section is not None:
+            self.run.append(data)
+
+    def handle_comment(self, data: str):
+        # BeautifulSoup 把注释当作字符串，parse 会把它们计入文本
+        if self.section is not None:
+            self.flush_text()
+            text = data.strip()
+            if text:
+                self.add_text(text)
+
+    def close(self):
+        super(StreamTreeBuilder, self).close()
+        self.flush_text()
+        while self.stack:
+            self.close_top()
+
+
+def from_latin1(value: str) -> str:
+    """
+    把按 latin-1 解码的 UTF-8 文本还原；含有字符引用展开出的非 latin-1 字符时原样返回。
+    """
+    try:
+        return value.encode('latin-1').decode('utf-8')
+    except UnicodeError:
+        return value
+
+
+class MappedTreeBuilder(StreamTreeBuilder):
+    """
+    parse_mapped 的建树器。输入是映射文件按 latin-1 解码的文本（字符与字节一一对应，
+    标签结构不变），由分词器报告的位置得到每段文本在文件中的字节范围：
+    足够长、不含字符引用和回车的文本段保存为 TextRef，其余按 UTF-8 解码为字符串。
+    """
+    def __init__(self, document: HTMLDocument, source: MappedSource):
+        super(MappedTreeBuilder, self).__init__(document)
+        self.source = source
+        self.line, self.line_start = 1, 0  # 把分词器的 (行, 列) 换算成字节偏移的游标，位置只增不减
+        self.run_start = 0
+        self.run_raw = False  # 当前文本段在 <script>/<style> 内，不展开字符引用
+
+    def byte_offset(self) -> int:
+        line, column = self.getpos()
+        while self.line < line:
+            self.line_start = self.source.buffer.find(b"\n", self.line_start) + 1
+            self.line += 1
+        return self.line_start + column
+
+    def handle_starttag(self, tag: str, attrs):
+        super(MappedTreeBuilder, self).handle_starttag(
+            tag, [(name, from_latin1(value) if value else value) for name, value in attrs])
+
+    def handle_data(self, data: str):
+        if self.section is not None and not self.run:
+            self.run_start = self.byte_offset()
+            self.run_raw = self.cdata_elem is not None
+        super(MappedTreeBuilder, self).handle_data(data)
+
+    def handle_comment(self, data: str):
+        super(MappedTreeBuilder, self).handle_comment(from_latin1(data))
+
+    def take_text(self) -> Union[str, TextRef, None]:
+        # 文本段结束于下一个标记（或输入末尾）的开始位置
+        if not self.run:
+            return None
+        self.run.clear()
+        start = self.run_start
+        raw = self.source.buffer[start:self.byte_offset()]
+        text = raw.decode('utf-8')
+        verbatim = "\r" not in text and (self.run_raw or "&" not in text)
+        if "\r" in text:
+            text = text.replace("\r\n", "\n").replace("\r", "\n")  # 与文本模式读取一致
+        if not self.run_raw and "&" in text:
+            text = unescape(text)
+        stripped = text.strip()
+        if not verbatim or len(raw) < MIN_REF_BYTES or not stripped:
+            return stripped
+        lead = len(text) - len(text.lstrip())
+        trail = len(text) - lead - len(stripped)
+        lead_bytes = len(text[:lead].encode('utf-8'))
+        trail_bytes = len(text[len(text) - trail:].encode('utf-8'))
+        length = len(raw) - lead_bytes - trail_bytes
+        if length < MIN_REF_BYTES:
+            return stripped
+        return TextRef(self.source, start + lead_bytes, length)
+
+
+class Region:
+    """
+    骨架中一棵尚未展开的子树：元素内容在源文件中的字节范围 [start, end)，
+    内部各元素按文档顺序确定好的 id，以及元素原来的 id 与 lang（用于展开后对应哈希）。
+    checksum 是骨架解析结束这段范围时的 digest，展开前据此确认源文件中的字节未被改写。
+    """
+    __slots__ = ("source", "start", "end", "ids", "id", "lang", "checksum")
+
+    def __init__(self, source: MappedSource, start: int, id_value: str, lang: Optional[str]):
+        self.source = source
+        self.start = start
+        self.end = start
+        self.ids: List[str] = []
+        self.id = id_value
+        self.lang = lang
+        self.checksum: Optional[bytes] = None
+
+    def digest(self, tag_name: str) -> bytes:
+        """
+        展开前的子树哈希，由源文本和内部 id 计算（与展开后的 Merkle 哈希不同，见 HTMLElement._hash_alias）。
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"region\0{tag_name}\0{self.id}\0{self.lang or ''}\0".encode('utf-8'))
+        digest.update(self.source.buffer[self.start:self.end])
+        digest.update("\0".join(self.ids).encode('utf-8'))
+        return digest.digest()
+
+
+class SkeletonElement(HTMLElement):
+    """
+    骨架解析中内容尚未展开的元素。第一次访问子元素或文本时才解析源文件中对应的字节范围
+    （RegionTreeBuilder），结果与完整解析相同；id 已在骨架解析时确定并登记，
+    查找不在其中的 id 时无需展开。
+    """
+    def __init__(self, tag_name: str, id_value: str, lang: Optional[str], region: Region):
+        self._children = None
+        self._text = ""
+        self.source_lost = False  # 展开时发现源文件已被改写，子树内容无法读取（见 discard_region）
+        super(SkeletonElement, self).__init__(tag_name, id_value, "", lang)
+        self._region = region
+
+    def materialize(self):
+        region = self._region
+        if region is None:
+            return
+        self._region = None  # 先清除：构建过程中访问 children 不再触发展开
+        checksum = region.digest(self.tag_name)
+        if region.checksum is not None and checksum != region.checksum:
+            self.discard_region(region)
+            return
+        with tracer.span("materialize", "parse", bytes=region.end - region.start):
+            builder = RegionTreeBuilder(self, region)
+            for start in range(region.start, region.end, CHUNK_SIZE):
+                builder.feed(region.source.buffer[start:min(start + CHUNK_SIZE, region.end)].decode('latin-1'))
+            builder.close()
+            self.check_spelling(self)
+        # 内容未变时沿用展开前的哈希，祖先和编辑器记录的哈希因此仍然有效
+        original = node_digest(self.tag_name, region.id, region.lang, self.text_content,
+                               [child.subtree_hash() for child in self._children])
+        self._hash_alias = (original, checksum)
+
+    def discard_region(self, region: Region):
+        """
+        源文件在映射期间被原地改写，这段字节已不是骨架解析时的内容：不去解析别的文件的字节
+        （标签数与登记的 id 对不上），子树记为空并注销其中的 id。重新加载文件可得到磁盘上的版本。
+        """
+        self.source_lost = True
+        document = self.get_document()
+        if document is not None:
+            for id_value in region.ids:
+                document.id_allocator.release(id_value)
+        self.invalidate_hash()
+        print(f"Warning: the content of '{self.id}' could not be read because its file was rewritten "
+              f"on disk. Reload the file to get the version on disk.")
+
+    @property
+    def children(self) -> ChildList:
+        if self._region is not None:
+            self.materialize()
+        return self._children
+
+    @children.setter
+    def children(self, value: ChildList):
+        self._children = value
+
+    @property
+    def _text_content(self) -> Union[str, TextRef]:
+        if self._region is not None:
+            self.materialize()
+        return self._text
+
+    @_text_content.setter
+    def _text_content(self, value: Union[str, TextRef]):
+        self._text = value
+
+
+class SkeletonTreeBuilder(MappedTreeBuilder):
+    """
+    parse_skeleton 的建树器：只建立 <body> 下 outline_depth 层以内的元素，
+    第 outline_depth 层的元素成为 SkeletonElement，记下内容的字节范围。
+    更深的标签仍经过分词器（以确定子树的边界），并按文档顺序分配 id，但不建立元素、不解码文本。
+    """
+    def __init__(self, document: HTMLDocument, source: MappedSource, outline_depth: int = OUTLINE_DEPTH):
+        super(SkeletonTreeBuilder, self).__init__(document, source)
+        self.outline_depth = outline_depth
+        self.region: Optional[Region] = None  # 正在跳过的子树
+
+    def handle_starttag(self, tag: str, attrs):
+        if self.region is not None:
+            self.flush_text()
+            self.region.ids.append(self.element_id(tag, from_latin1(dict(attrs).get("id") or "")))
+            self.stack.append((tag, None))
+            self.texts.append([])
+            if tag in VOID_TAGS:
+                self.close_top()
+            return
+        if (self.section != "body" or len(self.stack) != self.outline_depth
+                or tag in VOID_TAGS or tag in RAW_TEXT_TAGS):
+            super(SkeletonTreeBuilder, self).handle_starttag(tag, attrs)
+            return
+        self.flush_text()
+        NodeCounter.count += 1
+        attributes = {name: from_latin1(value) if value else value for name, value in attrs}
+        id_value = self.element_id(tag, attributes.get("id"))
+        self.region = Region(self.source, self.byte_offset() + len(self.get_starttag_text()),
+                             id_value, attributes.get("lang"))
+        element = SkeletonElement(tag, id_value, attributes.get("lang"), self.region)
+        parent = self.stack[-1][1]
+        if parent is not None:
+            parent.children.append(element)
+            element.parent = parent
+        self.stack.append((tag, element))
+        self.texts.append([])
+
+    def close_top(self):
+        element = self.stack[-1][1]
+        if self.region is not None and element is not None and element._region is self.region:
+            # 子树结束于关闭它的标记（自身或祖先的结束标签、输入末尾）之前；<tag/> 的内容为空
+            self.region.end = max(self.region.start, self.byte_offset())
+            self.region.checksum = self.region.digest(element.tag_name)
+            element._hash = self.region.checksum
+            self.region = None
+        super(SkeletonTreeBuilder, self).close_top()
+
+    def take_text(self) -> Union[str, TextRef, None]:
+        if self.region is not None:
+            self.run.clear()
+            return None
+        return super(SkeletonTreeBuilder, self).take_text()
+
+    def handle_comment(self, data: str):
+        if self.region is not None:
+            self.run.clear()
+            return
+        super(SkeletonTreeBuilder, self).handle_comment(data)
+
+    def attach(self, element: HTMLElement):
+        """
+        与 StreamTreeBuilder.attach 相同，但不遍历未展开的子树：其中的 id 直接登记，
+        拼写检查推迟到展开时。此时文档还没有监听者，无需通知。
+        """
+        container = self.document.head if self.section == "head" else self.document.body
+        container.children.append(element)
+        element.parent = container
+        container.invalidate_hash()
+        allocator = self.document.id_allocator
+        stack = [element]
+        while stack:
+            node = stack.pop()
+            allocator.acquire(node.id)
+            if node._region is not None:
+                for id_value in node._region.ids:
+                    allocator.acquire(id_value)
+            else:
+                stack.extend(node.children)
+        container.check_spelling(element)
+        self.pending.clear()
+
+
+class RegionTreeBuilder(MappedTreeBuilder):
+    """
+    展开 SkeletonElement：解析其内容的字节范围，子元素直接挂到该元素下，
+    id 依次取自骨架解析时确定的列表。
+    """
+    def __init__(self, element: SkeletonElement, region: Region):
+        super(RegionTreeBuilder, self).__init__(element.get_document(), region.source)
+        self.line_start = region.start  # 分词器的位置从范围开头算起
+        self.section = "region"
+        self.stack.append((element.tag_name, element))
+        self.texts.append([])
+        self.ids = iter(region.ids)
+
+    def element_id(self, tag: str, preferred: Optional[str]) -> str:
+        return next(self.ids)
+
+    def close_top(self):
+        if len(self.stack) == 1:
+            # 展开的元素本身：只设置文本
+            tag, element = self.stack.pop()
+            parts = self.texts.pop()
+            element._text_content = parts[0] if len(parts) == 1 else "".join(map(str, parts))
+            self.section = None
+            return
+        super(RegionTreeBuilder, self).close_top()
+
+    def attach(self, element: HTMLElement):
+        pass  # 子元素在开始标签处已挂到展开的元素下
+
+
 class HTMLWriter:
     """
     负责将 HTMLDocument 对象序列化为 HTML 字符串并写入文件。
     """
+    @timed("HTMLWriter.write")
+    @traced("HTMLWriter.write", "io")
     def write(self, document: HTMLDocument, filepath: str):
-        with open(filepath, 'w', encoding='utf-8') as file:
-            from display import IndentDisplayStrategy
-            disp = IndentDisplayStrategy(indent_size=2)
-            document.set_display_strategy(disp)
-            html_str = document.display(show_id=True)
-            file.write(html_str)
+        from display import IndentDisplayStrategy
+        disp = IndentDisplayStrategy(indent_size=2)
+        document.set_display_strategy(disp)
+        html_str = document.display(show_id=True)
+        # 文本仍引用着源文件的映射时不能原地截断重写，写到临时文件再替换，映射保留旧文件的内容
+        replace = document.mapped_file is not None and document.mapped_file == os.path.realpath(filepath)
+        target = document.mapped_file + ".tmp" if replace else filepath
+        with open(target, 'w', encoding='utf-8') as file:
+            with tracer.span("write_file", "io", file=filepath, bytes=len(html_str)):
+                file.write(html_str)
+        if replace:
+            os.replace(target, document.mapped_file)
         print(f"File written to: {filepath}")
 
 
 
 class FNode(TreeNode):
     def __init__(self, file_name) -> None:
+        self.children_by_name: Dict[str, 'FNode'] = {}  # 按名字索引子节点，按加入顺序排列
         super(FNode, self).__init__()
         self.file_name = file_name
-        # self.children: List['FNode'] = []
         # self.parent: Optional['FNode'] = None
+        self.is_file: bool = False  # 是否对应一个打开的文件（同名目录也可以同时存在）
         self.is_active: bool = False
 
+    @property
+    def children(self) -> List['FNode']:
+        # 子节点只存在 children_by_name 中，增删都是 O(1)；展示时按加入顺序取出
+        return list(self.children_by_name.values())
+
+    @children.setter
+    def children(self, value: List['FNode']):
+        self.children_by_name = {child.file_name: child for child in value}
+
     def add_child(self, child: 'FNode') -> None:
-        self.children.append(child)
+        self.children_by_name[child.file_name] = child
         child.parent=self
 
+    def remove_child(self, child: 'FNode') -> None:
+        del self.children_by_name[child.file_name]
+        child.parent = None
+
     def set_active(self) -> None:
         self.is_active = True
     
@@ -101,38 +738,64 @@ class FNode(TreeNode):
         return self.file_name if not self.is_active else self.file_name + "*"
 
 class Directory:
-    def __init__(self, file_list: List[str], active_file: str) -> None:
-        tree = {}
-        for file in file_list:
-            parts = file.split("/")
-            current = tree
-            for part in parts:
-                if part not in current:
-                    current[part] = {}
-                current = current[part]
+    """
+    打开文件的目录树（路径前缀树）。随文件的打开、关闭增量维护，并记录活动文件对应的节点，
+    展示时无需重建。
+    """
+    def __init__(self, file_list: List[str], active_file: Optional[str]) -> None:
         self.root = FNode('.')
-        for subtree in tree.items():
-            child_node = self.build_tree(subtree)
-            self.root.add_child(child_node)
-        # set active file
-        if active_file:
-            parts = active_file.split('/')
-            current = self.root
-            for part in parts:
-                for subtree in current.children:
-                    if subtree.file_name == part:
-                        current=subtree
-                        break
-            current.set_active()
-
-    def build_tree(self, file_tree: Tuple[str, dict]) -> FNode:
-        file_name, subtree = file_tree
-        file = FNode(file_name)
-        for child in subtree.items():
-            child_node = self.build_tree(child)
-            file.add_child(child_node)
-        return file
-    
+        self.active: Optional[FNode] = None
+        self.display_strategy = None
+        for file in file_list:
+            self.add_file(file)
+        self.set_active(active_file)
+
+    @staticmethod
+    def split(path: str) -> List[str]:
+        # 忽略绝对路径开头和重复的 "/" 产生的空名字
+        return [part for part in path.split("/") if part]
+
+    def find(self, path: str) -> Optional[FNode]:
+        current = self.root
+        for part in self.split(path):
+            current = current.children_by_name.get(part)
+            if current is None:
+                return None
+        return current
+
+    def add_file(self, path: str) -> FNode:
+        current = self.root
+        for part in self.split(path):
+            child = current.children_by_name.get(part)
+            if child is None:
+                child = FNode(part)
+                current.add_child(child)
+            current = child
+        current.is_file = True
+        return current
+
+    def remove_file(self, path: str) -> None:
+        """
+        移除文件，并删除因此变空的上级目录。
+        """
+        node = self.find(path)
+        if node is None or not node.is_file:
+            return
+        node.is_file = False
+        if node is self.active:
+            self.set_active(None)
+        while node is not self.root and not node.children_by_name and not node.is_file:
+            parent = node.parent
+            parent.remove_child(node)
+            node = parent
+
+    def set_active(self, path: Optional[str]) -> None:
+        if self.active is not None:
+            self.active.is_active = False
+        self.active = self.find(path) if path else None
+        if self.active is not None:
+            self.active.set_active()
+
     def set_display_strategy(self, strategy: "DisplayStrategy") -> None:
         """
         设定输出策略
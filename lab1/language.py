@@ -0,0 +1,191 @@
+# language.py
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+from compact_dict import Dictionary, LayeredDictionary, get_dictionary, release_dictionary
+from tokenizer import words
+
+DEFAULT_LANGUAGE = "en"
+
+# 各语言的高频功能词，用于廉价的语言判断
+STOPWORDS: Dict[str, frozenset] = {
+    "en": frozenset("the and is are was of to in that it for with this on be you not have as by at from".split()),
+    "es": frozenset("el la los las de que y en un una es por con para del se no su al como lo más pero".split()),
+    "de": frozenset("der die das und ist nicht ein eine zu den mit von auf sich des dem im für auch ich wir".split()),
+}
+
+# 各语言特有的字母
+SCRIPT_HINTS: Dict[str, frozenset] = {
+    "es": frozenset("ñ¿¡áíóú"),
+    "de": frozenset("ßäöü"),
+}
+
+MIN_EVIDENCE = 2  # 证据不足时退回默认语言
+
+
+def normalize_language(tag: Optional[str]) -> Optional[str]:
+    """
+    将 lang 属性（如 "en-US"、"DE"）规范为主语言代码，不支持的语言返回 None。
+    """
+    if not tag:
+        return None
+    primary = tag.strip().lower().replace("_", "-").split("-")[0]
+    return primary if primary in STOPWORDS else None
+
+
+def detect_language(text: str, default: Optional[str] = DEFAULT_LANGUAGE,
+                    tokens: Optional[List[str]] = None) -> Optional[str]:
+    """
+    根据功能词和特有字母判断文本语言，证据不足时返回 default。
+    tokens 为 words(text) 的结果，调用方已经分过词时传入以免重复分词。
+    """
+    scores = dict.fromkeys(STOPWORDS, 0)
+    for word in words(text) if tokens is None else tokens:
+        lowered = word.lower()
+        for language, stopwords in STOPWORDS.items():
+            if lowered in stopwords:
+                scores[language] += 1
+    letters = set(text.lower())
+    for language, hints in SCRIPT_HINTS.items():
+        scores[language] += 2 * len(letters & hints)
+    best = max(scores, key=scores.get)
+    if scores[best] < MIN_EVIDENCE:
+        return default
+    if default in scores and scores[default] == scores[best]:
+        return default
+    return best
+
+
+class DictionaryPool:
+    """
+    按语言惰性加载词典，最多同时保留 capacity 种语言，超出时淘汰最久未使用的。
+    各语言的拼写建议索引也存放在池中，随该语言的词典一起淘汰。
+    """
+    def __init__(self, capacity: int = 2, user_word_lists: Optional[List[str]] = None,
+                 loader: Callable[[str], Dictionary] = get_dictionary):
+        if capacity < 1:
+            raise ValueError("Dictionary pool capacity must be at least 1.")
+        self.capacity = capacity
+        self.user_word_lists = user_word_lists or []
+        self.loader = loader
+        self.pinned: Dict[str, Optional[Dictionary]] = {}  # 常驻的语言，不参与淘汰；None 表示尚未加载
+        self.dictionaries: "OrderedDict[str, Dictionary]" = OrderedDict()
+        self.suggestion_indexes: Dict[str, object] = {}  # 语言 -> 由该语言词典构建的建议索引
+
+    def pin(self, language: str, dictionary: Optional[Dictionary] = None):
+        """
+        为某语言指定固定使用的词典；不指定时第一次使用该语言才加载，之后常驻。
+        """
+        self.pinned[language] = dictionary
+
+    def get(self, language: str) -> Dictionary:
+        """
+        获取某语言的词典，必要时加载并淘汰最久未使用的语言。
+        """
+        if language in self.pinned:
+            if self.pinned[language] is None:
+                self.pinned[language] = self._load(language)
+            return self.pinned[language]
+        dictionary = self.dictionaries.get(language)
+        if dictionary is not None:
+            self.dictionaries.move_to_end(language)
+            return dictionary
+        dictionary = self._load(language)
+        self.dictionaries[language] = dictionary
+        while len(self.dictionaries) > self.capacity:
+            evicted, _ = self.dictionaries.popitem(last=False)
+            self.suggestion_indexes.pop(evicted, None)
+            if self.loader is get_dictionary:
+                release_dictionary(evicted)
+        return dictionary
+
+    def suggestion_index(self, language: str, build: Callable[[str, Dictionary], object]):
+        """
+        获取某语言的建议索引，没有时由 build(语言, 词典) 读取或构建；同时按使用顺序刷新该语言的词典。
+        """
+        dictionary = self.get(language)
+        index = self.suggestion_indexes.get(language)
+        if index is None:
+            index = self.suggestion_indexes[language] = build(language, dictionary)
+        return index
+
+    def _load(self, language: str) -> Dictionary:
+        dictionary = self.loader(language)
+        if self.user_word_lists:
+            dictionary = LayeredDictionary(dictionary, self.user_word_lists)
+        return dictionary
+
+    def loaded_languages(self) -> List[str]:
+        pinned = [language for language, dictionary in self.pinned.items() if dictionary is not None]
+        return pinned + list(self.dictionaries)
+
+
+class SpellingContext:
+    """
+    拼写检查共用的设置：按语言加载的词典池（含用户词表）和没有 lang 属性时的默认语言。
+    文档树中的拼写标记（HTMLElement.check_spelling）和 spell-check 命令都经由它判断，两者结果一致。
+    语言的规则：最近的 lang 属性；没有时按元素文本判断，证据不足时取默认语言。
+    """
+    def __init__(self, pool: Optional[DictionaryPool] = None, default_language: str = DEFAULT_LANGUAGE):
+        self.pool = pool or DictionaryPool()
+        self.default_language = default_language
+        self.pool.pin(default_language)  # 默认语言的词典常驻，第一次使用时加载
+
+    def inherited_language(self, element) -> Tuple[str, bool]:
+        """
+        element 从自身或祖先的 lang 属性得到的 (语言, 是否来自 lang 属性)；都没有时为默认语言。
+        检查整棵子树时只在子树根上调用一次，向下由 child_language 传递。
+        """
+        node = element
+        while node is not None:
+            language = normalize_language(node.lang)
+            if language:
+                return language, True
+            node = node.parent
+        return self.default_language, False
+
+    @staticmethod
+    def child_language(element, language: str, explicit: bool) -> Tuple[str, bool]:
+        """
+        由父元素传下来的语言得到 element 的语言：自身的 lang 属性优先。
+        """
+        own = normalize_language(element.lang)
+        return (own, True) if own else (language, explicit)
+
+    def misspelled_words(self, text: str, language: str, explicit: bool) -> List[str]:
+        """
+        text 中拼写错误的词。语言不是来自 lang 属性时先按文本判断，与拼写检查共用一次分词。
+        """
+        return self.misspellings(text, language, explicit)[1]
+
+    def misspellings(self, text: str, language: str, explicit: bool) -> Tuple[str, List[str]]:
+        """
+        同 misspelled_words，另外返回判断所用的语言，以便按该语言给出建议。
+        """
+        tokens = words(text)
+        if not tokens:
+            return language, []
+        if not explicit:
+            language = detect_language(text, language, tokens)
+        dictionary = self.pool.get(language)
+        return language, [word for word in tokens if dictionary.is_misspelled(word)]
+
+
+_spelling_context: Optional[SpellingContext] = None
+
+
+def get_spelling_context() -> SpellingContext:
+    """
+    进程内共享的拼写设置，文档树的拼写标记使用它；默认构造的 HTMLSpellChecker 也使用它。
+    """
+    global _spelling_context
+    if _spelling_context is None:
+        _spelling_context = SpellingContext()
+    return _spelling_context
+
+
+def set_spelling_context(context: SpellingContext):
+    """
+    替换共享的拼写设置（例如改用带用户词表的检查器的设置），之后加入文档的元素按它标记。
+    """
+    global _spelling_context
+    _spelling_context = context
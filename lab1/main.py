@@ -17,6 +17,7 @@ def main():
             file_list = data.get("file_list", [])
             active_file = data.get("active_file", "")
             showid_list = data.get("showid_list", [])
+            session_manager.memory_budget = data.get("memory_budget")
         if len(file_list):
             print("Saved session detected. Importing...")
         for i in range(len(file_list)):
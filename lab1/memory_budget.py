@@ -0,0 +1,188 @@
+# memory_budget.py
+"""
+会话内存预算：估算每个编辑器占用的内存，超出预算时把最久未用的编辑器（文档和撤销历史）换出到磁盘。
+"""
+import gzip
+import io
+import math
+import os
+import pickle
+from typing import Dict, List, Optional, Tuple, Union
+from editor import Editor
+from model import DocumentListener, HTMLDocument, HTMLElement, TextRef, build_tree, flatten_tree, preorder
+
+NODE_BYTES = 400  # 一个元素（含子元素链表、缓存的哈希和 id 登记）大约占用的内存
+REGION_ID_BYTES = 64  # 骨架解析中未展开的子树只登记了 id
+HISTORY_ENTRY_BYTES = 1024  # 一条撤销/重做记录（不含它引用的、已从文档删除的子树）
+MiB = 1 << 20
+
+
+def format_size(size: int) -> str:
+    return f"{size / MiB:.1f} MB"
+
+
+def estimate_subtree(element: HTMLElement) -> int:
+    """
+    估算 element 子树占用的内存：每个元素 NODE_BYTES 加上文本长度。不展开骨架解析中未展开的子树。
+    """
+    total = 0
+    stack = [element]
+    while stack:
+        node = stack.pop()
+        total += NODE_BYTES
+        if node._region is not None:
+            total += len(node._region.ids) * REGION_ID_BYTES
+            continue
+        text = node._text_content
+        total += text.length if isinstance(text, TextRef) else len(text)
+        stack.extend(node.children)
+    return total
+
+
+class DocumentSize(DocumentListener):
+    """
+    文档占用内存的估算值，随文档变更增量维护，不必每次重新遍历整棵树。
+    展开骨架子树不经过监听者，因此展开后的文档会被低估，直到整棵树被替换时重新估算。
+    """
+    def __init__(self):
+        self.bytes = 0
+
+    def on_reset(self, document: HTMLDocument):
+        self.bytes = estimate_subtree(document.root)
+
+    def on_attach(self, element: HTMLElement):
+        self.bytes += estimate_subtree(element)
+
+    def on_detach(self, element: HTMLElement):
+        self.bytes = max(0, self.bytes - estimate_subtree(element))
+
+    def on_text_change(self, element: HTMLElement, old_text: str):
+        self.bytes = max(0, self.bytes + len(element.text_content) - len(old_text))
+
+
+def editor_size(editor: Editor, document_size: DocumentSize) -> int:
+    """
+    编辑器的估算大小：文档加上撤销和重做历史。
+    """
+    return document_size.bytes + (len(editor.undo_stack) + len(editor.redo_stack)) * HISTORY_ENTRY_BYTES
+
+
+def rebuild_document(root: HTMLElement, counters: dict, owns_root: bool = True,
+                     source_rewritten: bool = False) -> HTMLDocument:
+    document = HTMLDocument.__new__(HTMLDocument)
+    owner = root.document
+    document.adopt(root, counters)
+    document.source_rewritten = source_rewritten  # 重新加载时仍需整体替换（见 SessionManager.reload）
+    if not owns_root:
+        # 换出前根元素已归另一个文档所有（如整体替换后仍被引用的旧文档）：不夺走根元素，
+        # 否则通知、检索和 id 登记会落到这个旧文档上
+        root.document = owner
+    return document
+
+
+class SpillPickler(pickle.Pickler):
+    """
+    换出编辑器用的序列化。元素不沿父子和兄弟链接递归保存，而是按所在的整棵树压平进 trees，
+    对象图中只留下先序编号；这样文档和各条历史命令引用的同一个元素恢复后仍是同一个对象，
+    已删除、只被历史引用的子树也一并保存。文档只保存根元素和 id 计数器，监听者等运行时状态不保存。
+    骨架中展开过的元素还保存 _hash_alias，恢复后哈希与换出前相同，编辑器记录的保存时哈希仍然有效。
+    """
+    def __init__(self, file):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.trees: List[List[tuple]] = []
+        self.indexes: Dict[int, int] = {}  # id(元素) -> 在全部树中的先序编号
+        self.aliases: Dict[int, Tuple[bytes, bytes]] = {}  # 先序编号 -> 元素的 _hash_alias
+
+    def persistent_id(self, obj):
+        if not isinstance(obj, HTMLElement):
+            return None
+        index = self.indexes.get(id(obj))
+        if index is None:
+            root = obj
+            while root.parent is not None:
+                root = root.parent
+            self.trees.append(flatten_tree(root))  # 先压平：骨架中未展开的子树在这里展开
+            for _, element in preorder(root):
+                if element._hash_alias is not None:
+                    self.aliases[len(self.indexes)] = element._hash_alias
+                self.indexes[id(element)] = len(self.indexes)
+            index = self.indexes[id(obj)]
+        return index
+
+    def reducer_override(self, obj):
+        if isinstance(obj, HTMLDocument):
+            return rebuild_document, (obj.root, dict(obj.id_allocator.counters), obj.root.document is obj,
+                                      obj.source_rewritten)
+        return NotImplemented
+
+
+class SpillUnpickler(pickle.Unpickler):
+    def __init__(self, file, elements: List[HTMLElement]):
+        super().__init__(file)
+        self.elements = elements
+
+    def persistent_load(self, pid: int) -> HTMLElement:
+        return self.elements[pid]
+
+
+def spill_editor(editor: Editor, path: str):
+    """
+    把编辑器（文档和撤销/重做历史）写入 path：gzip 压缩的两段 pickle，先是压平的树及哈希别名，再是编辑器本身。
+    无法序列化时删除写了一半的文件并抛出异常，编辑器保持不变。
+    """
+    buffer = io.BytesIO()
+    pickler = SpillPickler(buffer)
+    pickler.dump(editor)
+    try:
+        with gzip.open(path, "wb", compresslevel=1) as file:
+            pickle.dump((pickler.trees, pickler.aliases), file, pickle.HIGHEST_PROTOCOL)
+            file.write(buffer.getbuffer())
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+
+def restore_editor(path: str) -> Editor:
+    """
+    读回 spill_editor 写入的编辑器。文档没有监听者，映射文件中的文本已解码为字符串。
+    """
+    with gzip.open(path, "rb") as file:
+        elements: List[HTMLElement] = []
+        trees, aliases = pickle.load(file)
+        for nodes in trees:
+            elements.extend(build_tree(nodes))
+        for index, alias in aliases.items():
+            elements[index]._hash_alias = alias
+        return SpillUnpickler(file, elements).load()
+
+
+class SpilledEditor:
+    """
+    已换出到磁盘的编辑器，只保留编辑器列表和会话保存所需的信息。
+    """
+    def __init__(self, path: str, size: int, is_modified: bool, show_id: bool):
+        self.path = path
+        self.size = size  # 换出前的估算大小
+        self.is_modified = is_modified
+        self.show_id = show_id
+
+    def discard(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+OpenEditor = Union[Editor, SpilledEditor]
+
+
+def parse_budget(value: str) -> Optional[int]:
+    """
+    解析以 MB 为单位的预算；"off" 表示不限制。无效时抛出 ValueError。
+    """
+    if value.lower() == "off":
+        return None
+    megabytes = float(value)
+    if not (math.isfinite(megabytes) and megabytes > 0):
+        raise ValueError(f"Memory budget must be positive: {value}")
+    return int(megabytes * MiB)
+
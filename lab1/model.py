@@ -1,6 +1,12 @@
 # model.py
-from typing import List, Optional
-from spellchecker import SpellChecker
+import hashlib
+import os
+from typing import Callable, Iterator, List, Optional, Tuple, Union
+from child_list import ChildList
+from id_allocator import IdAllocator
+from instrumentation import NodeCounter
+from language import get_spelling_context, normalize_language
+from tracing import tracer
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from display import DisplayStrategy
@@ -31,18 +37,174 @@ class TreeNode:
         raise NotImplementedError()
 
 
+class MappedSource:
+    """
+    映射文件的字节，由同一文档的全部 TextRef 和骨架中未展开的子树（包括撤销历史中已删除的子树）共用。
+    源文件在映射期间被其他程序原地改写时，release 把映射的内容复制到内存并关闭映射：
+    之后的读取不再随文件变化，文件被截短时也不会在访问映射末尾时出错（SIGBUS）。
+    原地改写时映射中加载时的内容已经丢失，复制到的是改写后的字节；文件被替换（改名覆盖）时映射保留旧文件，内容不变。
+    """
+    __slots__ = ("buffer", "file_id")
+
+    def __init__(self, buffer, file_id: Optional[Tuple[int, int]] = None):
+        self.buffer = buffer  # mmap.mmap，release 之后为 bytes
+        self.file_id = file_id  # 映射的文件的 (st_dev, st_ino)
+
+    def rewritten_in_place(self, path: str) -> bool:
+        """
+        path 现在是否仍是被映射的那个文件（即修改是原地改写，而非替换）。
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return (stat.st_dev, stat.st_ino) == self.file_id
+
+    def release(self):
+        buffer = self.buffer
+        if isinstance(buffer, bytes):
+            return
+        try:
+            size = min(len(buffer), buffer.size())  # 只复制文件现有长度以内的部分
+        except OSError:
+            size = 0
+        self.buffer = buffer[:size]
+        buffer.close()
+
+
+class TextRef:
+    """
+    未解码的文本：指向只读映射（mmap）的源文件中的一段 UTF-8 字节，访问时才解码。
+    大文档中多数文本从不修改，这样不必为每段文本常驻一个字符串；
+    元素的文本被修改后换成普通字符串。
+    """
+    __slots__ = ("source", "offset", "length")
+
+    def __init__(self, source: MappedSource, offset: int, length: int):
+        self.source = source
+        self.offset = offset
+        self.length = length
+
+    def __str__(self) -> str:
+        # 源文件被原地改写后，这一范围可能截断在多字节字符中间
+        return self.source.buffer[self.offset:self.offset + self.length].decode('utf-8', 'replace')
+
+
+def node_digest(tag_name: str, id_value: str, lang: Optional[str], text: str, child_hashes: List[bytes]) -> bytes:
+    """
+    Merkle 哈希的一个节点：由标签、id、lang、文本与各子元素的子树哈希计算。
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{tag_name}\0{id_value}\0{lang or ''}\0{text}\0{len(child_hashes)}\0".encode('utf-8'))
+    for child_hash in child_hashes:
+        digest.update(child_hash)
+    return digest.digest()
+
+
 class HTMLElement(TreeNode):
     """
     表示 HTML 元素的类，包含标签名、id、文本内容和子元素。
     """
-    def __init__(self, tag_name: str, id_value: Optional[str] = None, text_content: str = ""):
+    # 骨架解析中尚未展开的子树的源文本范围（见 io_manager.SkeletonElement），普通元素为 None
+    _region = None
+    # (展开时按原内容计算的哈希, 展开前的哈希)：内容恢复原样时沿用展开前的哈希
+    _hash_alias: Optional[Tuple[bytes, bytes]] = None
+
+    def __init__(self, tag_name: str, id_value: Optional[str] = None, text_content: Union[str, TextRef] = "",
+                 lang: Optional[str] = None):
         super(HTMLElement, self).__init__()
+        self._hash: Optional[bytes] = None  # 子树哈希的缓存，内容变化时沿祖先链失效
         self.tag_name = tag_name
-        self.id = id_value if id_value else tag_name  # 默认 id 为标签名
-        self.text_content = text_content
-        # self.children: List['HTMLElement'] = []
-        # self.parent: Optional['HTMLElement'] = None
+        self._id = id_value if id_value else tag_name  # 默认 id 为标签名
+        self._text_content = text_content  # str，或解析映射文件时尚未解码的 TextRef
+        self._lang = lang  # lang 属性，未设置时继承祖先元素
+        self.children: ChildList = ChildList()  # 插入、删除和取相邻兄弟均为 O(1)
+        # 由 ChildList 维护：所在的兄弟序列、前后兄弟和顺序标签
+        self._siblings: Optional[ChildList] = None
+        self._prev_sibling: Optional['HTMLElement'] = None
+        self._next_sibling: Optional['HTMLElement'] = None
+        self._order = 0
         self.has_spelling_error = False
+        self.document: Optional['HTMLDocument'] = None  # 仅根元素持有所属文档
+
+    @property
+    def id(self) -> str:
+        return self._id
+
+    @id.setter
+    def id(self, value: str):
+        old_id = self._id
+        self._id = value
+        self.invalidate_hash()
+        document = self.get_document()
+        if document is not None and old_id != value:
+            document.notify_id_change(self, old_id)
+
+    @property
+    def text_content(self) -> str:
+        text = self._text_content
+        return text if type(text) is str else str(text)
+
+    @text_content.setter
+    def text_content(self, value: str):
+        old_text = self.text_content
+        self._text_content = value
+        self.invalidate_hash()
+        if self.parent is not None or self.document is not None:
+            document = self.get_document()
+            if document is not None and old_text != value:
+                document.notify_text_change(self, old_text)
+
+    @property
+    def lang(self) -> Optional[str]:
+        return self._lang
+
+    @lang.setter
+    def lang(self, value: Optional[str]):
+        self._lang = value
+        self.invalidate_hash()
+
+    def invalidate_hash(self):
+        """
+        自身内容或子元素变化后调用，使自己和所有祖先的子树哈希失效。
+        已失效的节点其祖先必然也已失效，因此遇到即可停止。
+        """
+        node = self
+        while node is not None and node._hash is not None:
+            node._hash = None
+            node = node.parent
+
+    def subtree_hash(self) -> bytes:
+        """
+        以当前元素为根的子树的结构哈希（Merkle 哈希）：由自身的标签、id、lang、文本
+        与各子元素的子树哈希计算。按需计算并缓存，只有变化路径上的节点需要重算。
+        """
+        if self._hash is not None:
+            return self._hash
+        # 非递归的后序遍历，跳过缓存仍有效的子树
+        stack = [(self, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if node._hash is not None:
+                continue
+            if not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child in node.children if child._hash is None)
+                continue
+            node._hash = node_digest(node.tag_name, node._id, node._lang, node.text_content,
+                                     [child._hash for child in node.children])
+            if node._hash_alias is not None and node._hash == node._hash_alias[0]:
+                node._hash = node._hash_alias[1]
+        return self._hash
+
+    def get_document(self) -> Optional['HTMLDocument']:
+        """
+        沿父节点向上找到所属文档；不在任何文档中时返回 None。
+        """
+        node = self
+        while node.parent is not None:
+            node = node.parent
+        return node.document
 
     def add_child(self, child: 'HTMLElement'):
         """
@@ -50,45 +212,181 @@ class HTMLElement(TreeNode):
         """
         self.children.append(child)
         child.parent = self
-        self.check_spelling(child)
+        self.invalidate_hash()
+        self._attached(child)
 
-    def check_spelling(self, element: 'HTMLElement'):
+    def insert_child(self, index: int, child: 'HTMLElement'):
+        """
+        在指定位置插入子元素（需要按下标定位；已知后一个兄弟时使用 insert_before）。
+        """
+        self.children.insert(index, child)
+        child.parent = self
+        self.invalidate_hash()
+        self._attached(child)
+
+    def insert_before(self, child: 'HTMLElement', reference: Optional['HTMLElement']):
         """
-        检查元素及其子元素的拼写错误。
-        """
-        checker = SpellChecker()
-        if element.text_content:
-            words = [word.strip('.,!?()[]{}":;') for word in element.text_content.split()]
-            words = [word for word in words if word]  # 移除空字符串
-            words = [word for word in words if not word.isdigit() and not any(
-                c.isalpha() and c > '\u4e00' and c < '\u9fff' for c in word)]  # 排除数字和中文
-            misspelled_words = checker.unknown(words)
-            for word in words:
-                if word in misspelled_words:
-                    element.has_spelling_error = True
-                    break  # 一旦发现拼写错误，退出循环
-        for child in element.children:
+        把子元素插到 reference 之前，reference 为 None 时追加到末尾。O(1)，与兄弟个数无关。
+        """
+        self.children.insert_before(child, reference)
+        child.parent = self
+        self.invalidate_hash()
+        self._attached(child)
+
+    def move_child(self, child: 'HTMLElement', reference: Optional['HTMLElement'] = None):
+        """
+        把已在文档中的 child（连同子树）移为当前元素的子元素，放在 reference 之前（None 表示末尾）。
+        只改动兄弟与父节点的链接，子树中的 id 和各索引保持不变，O(1)（另加两条祖先链上的哈希失效）。
+        调用方需保证当前元素不在 child 的子树中。
+        """
+        old_parent = child.parent
+        old_language = old_parent.get_language()
+        old_parent.children.remove(child)
+        old_parent.invalidate_hash()
+        self.children.insert_before(child, reference)
+        child.parent = self
+        self.invalidate_hash()
+        document = self.get_document()
+        if document is not None:
+            document.notify_move(child, old_parent)
+        if child.lang is None and self.get_language() != old_language:
+            # 继承的语言变了，子树需要按新语言重新检查拼写
+            for node in child.iter():
+                node.has_spelling_error = False
             self.check_spelling(child)
 
+    def contains(self, element: 'HTMLElement') -> bool:
+        """
+        element 是否是当前元素本身或其后代（沿父节点向上查找，O(深度)）。
+        """
+        node = element
+        while node is not None:
+            if node is self:
+                return True
+            node = node.parent
+        return False
+
+    def clone(self, new_id: Callable[['HTMLElement'], str]) -> 'HTMLElement':
+        """
+        复制以当前元素为根的子树（非递归），副本的 id 由 new_id(原元素) 给出。
+        文本等不可变值与原元素共享，拼写标记一并复制。副本不属于任何文档。
+        """
+        def copy_of(element: 'HTMLElement') -> 'HTMLElement':
+            copy = HTMLElement(element.tag_name, new_id(element), element._text_content, element._lang)
+            copy.has_spelling_error = element.has_spelling_error
+            return copy
+
+        root = copy_of(self)
+        stack = [(self, root)]
+        while stack:
+            source, target = stack.pop()
+            for child in source.children:
+                copy = copy_of(child)
+                target.children.append(copy)
+                copy.parent = target
+                stack.append((child, copy))
+        return root
+
+    @property
+    def next_sibling(self) -> Optional['HTMLElement']:
+        return self._next_sibling
+
+    @property
+    def previous_sibling(self) -> Optional['HTMLElement']:
+        return self._prev_sibling
+
+    def _attached(self, child: 'HTMLElement'):
+        document = self.get_document()
+        if document is not None:
+            with tracer.span("notify_attach", "model"):
+                document.notify_attach(child)
+        with tracer.span("check_spelling", "spell"):
+            self.check_spelling(child)
+
+    def check_spelling(self, element: 'HTMLElement'):
+        """
+        检查元素及其子元素的拼写错误并设置标记，规则与 spell-check 命令相同（见 SpellingContext）。
+        语言只在子树根上沿祖先确定一次，再向下传递。骨架中尚未展开的子树在展开时检查。
+        """
+        context = get_spelling_context()
+        stack = [(element, *context.inherited_language(element))]
+        while stack:
+            node, language, explicit = stack.pop()
+            if node._region is not None:
+                continue
+            text = node.text_content
+            if text and context.misspelled_words(text, language, explicit):
+                node.has_spelling_error = True
+            stack.extend((child, *context.child_language(child, language, explicit)) for child in node.children)
+
+    def get_language(self) -> Optional[str]:
+        """
+        返回元素自身或最近祖先的 lang 属性中的受支持语言。
+        """
+        node = self
+        while node is not None:
+            language = normalize_language(node.lang)
+            if language:
+                return language
+            node = node.parent
+        return None
+
+    def iter(self) -> Iterator['HTMLElement']:
+        """
+        先序遍历当前元素及其所有后代（非递归，避免深层文档栈溢出）。
+        """
+        counting = NodeCounter.enabled  # 每次调用检查一次，计数在遍历结束（或中途停止）时一次加上
+        visited = 0
+        stack = [self]
+        try:
+            while stack:
+                element = stack.pop()
+                visited += 1
+                yield element
+                if element.children.head is not None:  # 跳过叶子，省去一次迭代器创建
+                    stack.extend(reversed(element.children))
+        finally:
+            if counting:
+                NodeCounter.count += visited
+
     def remove_child(self, child: 'HTMLElement'):
         """
         从当前元素移除子元素。
         """
-        if child in self.children:
+        if child.parent is self and child in self.children:
             self.children.remove(child)
+            self.invalidate_hash()
+            document = self.get_document()
             child.parent = None
+            if document is not None:
+                document.notify_detach(child)
 
     def find_by_id(self, search_id: str) -> Optional['HTMLElement']:
         """
-        查找具有指定 id 的元素。
+        查找具有指定 id 的元素（先序，非递归）。骨架中尚未展开的子树只在其 id 登记中有 search_id 时才展开。
         """
-        if self.id == search_id:
-            return self
-        for child in self.children:
-            result = child.find_by_id(search_id)
-            if result:
-                return result
-        return None
+        visited = 0
+        found = None
+        node = self
+        while True:
+            visited += 1
+            if node._id == search_id:
+                found = node
+                break
+            region = node._region
+            child = node.children.head if region is None or search_id in region.ids else None
+            if child is not None:
+                node = child
+                continue
+            # 沿兄弟和父节点链接前进到先序中的下一个元素，不需要栈
+            while node is not self and node._next_sibling is None:
+                node = node.parent
+            if node is self:
+                break
+            node = node._next_sibling
+        if NodeCounter.enabled:
+            NodeCounter.count += visited
+        return found
     
     # for display
     def get_display_name(self, show_id: bool, format: str) -> str:
@@ -108,6 +406,8 @@ class HTMLElement(TreeNode):
                 attrs = f' id="{self.id}"'
             else:
                 attrs = ""
+            if self.lang:
+                attrs += f' lang="{self.lang}"'
             return f"<{self.tag_name}{attrs}>"
         else:
             raise ValueError(f"Display Format: {format} is not valid.")
@@ -116,11 +416,79 @@ class HTMLElement(TreeNode):
     def is_leaf(self) -> bool:
         return len(self.element.children) == 0 and not self.element.text_content
 
+def preorder(root: HTMLElement) -> Iterator[Tuple[int, HTMLElement]]:
+    """
+    按先序无递归地遍历 root 的子树，依次给出 (深度, 元素)。
+    """
+    stack = [(root, 0)]
+    while stack:
+        element, depth = stack.pop()
+        yield depth, element
+        stack.extend((child, depth + 1) for child in reversed(element.children))
+
+
+def flatten_tree(root: HTMLElement) -> List[tuple]:
+    """
+    把树压平成先序的节点记录 (深度, 标签, id, 文本, lang, 拼写错误标记)，文本已解码。
+    避免序列化时沿父子和兄弟链接深度递归。
+    """
+    return [(depth, element.tag_name, element.id, element.text_content, element.lang, element.has_spelling_error)
+            for depth, element in preorder(root)]
+
+
+def build_tree(nodes: List[tuple]) -> List[HTMLElement]:
+    """
+    由 flatten_tree 的记录重建树，按先序返回全部元素（第一个是根）。
+    """
+    elements: List[HTMLElement] = []
+    path: List[HTMLElement] = []  # 当前节点的祖先链
+    for depth, tag_name, id_value, text, lang, has_spelling_error in nodes:
+        element = HTMLElement(tag_name, id_value, text, lang)
+        element.has_spelling_error = has_spelling_error
+        del path[depth:]
+        if path:
+            path[-1].children.append(element)
+            element.parent = path[-1]
+        path.append(element)
+        elements.append(element)
+    return elements
+
+
+class DocumentListener:
+    """
+    文档变更监听接口（观察者）。索引等派生数据实现它以便随文档增量更新。
+    """
+    def on_reset(self, document: 'HTMLDocument'):
+        """整棵树被替换，需要全量重建。"""
+        pass
+
+    def on_attach(self, element: HTMLElement):
+        """element 及其子树加入了文档。"""
+        pass
+
+    def on_detach(self, element: HTMLElement):
+        """element 及其子树离开了文档。"""
+        pass
+
+    def on_id_change(self, element: HTMLElement, old_id: str):
+        pass
+
+    def on_text_change(self, element: HTMLElement, old_text: str):
+        pass
+
+    def on_move(self, element: HTMLElement, old_parent: HTMLElement):
+        """element 及其子树在文档内换了位置，子树本身没有变化。"""
+        pass
+
+
 class HTMLDocument:
     """
     表示整个 HTML 文档，包含根元素 <html>。
     """
     def __init__(self):
+        self.id_allocator = IdAllocator()  # 文档内 id 的唯一性由它维护
+        self.listeners: List['DocumentListener'] = []
+        self._root: Optional[HTMLElement] = None
         self.root = HTMLElement("html", "html")
         self.head = HTMLElement("head", "head")
         self.title = HTMLElement("title", "title")
@@ -130,6 +498,69 @@ class HTMLDocument:
         self.root.add_child(self.body)
 
         self.display_strategy = None # 输出策略
+        self.selector_index = None  # 第一次 select 时创建，之后随文档变更维护
+        self.mapped_file: Optional[str] = None  # 文本引用映射中的源文件（真实路径）
+        self.mapped_source: Optional[MappedSource] = None
+        self.source_rewritten = False  # 源文件曾在映射期间被原地改写，加载时的文本已经丢失
+
+    @property
+    def root(self) -> HTMLElement:
+        return self._root
+
+    @root.setter
+    def root(self, element: HTMLElement):
+        """
+        替换整棵树（如 init 命令及其撤销），随后重建 id 登记和各监听者的状态。
+        """
+        if self._root is not None:
+            self._root.document = None
+        self._root = element
+        element.document = self
+        self.id_allocator.clear()
+        for node in element.iter():
+            self.id_allocator.acquire(node.id)
+        for listener in self.listeners:
+            listener.on_reset(self)
+
+    def add_listener(self, listener: 'DocumentListener'):
+        self.listeners.append(listener)
+        listener.on_reset(self)
+
+    def remove_listener(self, listener: 'DocumentListener'):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def notify_attach(self, element: HTMLElement):
+        """
+        element 及其子树加入了文档。
+        """
+        for node in element.iter():
+            self.id_allocator.acquire(node.id)
+        for listener in self.listeners:
+            listener.on_attach(element)
+
+    def notify_detach(self, element: HTMLElement):
+        """
+        element 及其子树离开了文档。
+        """
+        for node in element.iter():
+            self.id_allocator.release(node.id)
+        for listener in self.listeners:
+            listener.on_detach(element)
+
+    def notify_id_change(self, element: HTMLElement, old_id: str):
+        self.id_allocator.release(old_id)
+        self.id_allocator.acquire(element.id)
+        for listener in self.listeners:
+            listener.on_id_change(element, old_id)
+
+    def notify_text_change(self, element: HTMLElement, old_text: str):
+        for listener in self.listeners:
+            listener.on_text_change(element, old_text)
+
+    def notify_move(self, element: HTMLElement, old_parent: HTMLElement):
+        for listener in self.listeners:
+            listener.on_move(element, old_parent)
 
     def find_by_id(self, search_id: str) -> Optional[HTMLElement]:
         """
@@ -137,6 +568,77 @@ class HTMLDocument:
         """
         return self.root.find_by_id(search_id)
 
+    def __getstate__(self) -> dict:
+        """
+        序列化（pickle）时把树压平成先序的节点记录（见 flatten_tree）；
+        监听者、显示策略等运行时状态不保存。用于在子进程中解析后传回。
+        """
+        return {"nodes": flatten_tree(self.root), "counters": dict(self.id_allocator.counters)}
+
+    def __setstate__(self, state: dict):
+        self.adopt(build_tree(state["nodes"])[0], state["counters"])
+
+    def adopt(self, root: HTMLElement, counters: dict):
+        """
+        以已建好的树初始化未经 __init__ 创建的文档（反序列化），运行时状态均为空。
+        """
+        self.id_allocator = IdAllocator()
+        self.listeners = []
+        self._root = None
+        self.display_strategy = None
+        self.selector_index = None
+        self.mapped_file = None  # 序列化时文本已解码
+        self.mapped_source = None
+        self.source_rewritten = False
+        self.root = root
+        self.id_allocator.counters.update(counters)
+        children = {child.tag_name: child for child in reversed(root.children)}
+        self.head = children.get("head")
+        self.body = children.get("body")
+        self.title = None
+        if self.head is not None:
+            self.title = next((child for child in self.head.children if child.tag_name == "title"), None)
+
+    def release_mapping(self) -> bool:
+        """
+        源文件在映射期间被其他程序修改时调用：把映射的内容复制到内存并关闭映射（见 MappedSource），
+        之后文档不再引用源文件。返回源文件是否被原地改写——此时尚未修改的文本（包括撤销历史中的）
+        已是改写后的字节，不再可靠，记入 source_rewritten。
+        """
+        rewritten = False
+        if self.mapped_source is not None:
+            rewritten = self.mapped_source.rewritten_in_place(self.mapped_file)
+            self.mapped_source.release()
+        self.mapped_source = None
+        self.mapped_file = None
+        self.source_rewritten = self.source_rewritten or rewritten
+        return rewritten
+
+    def content_hash(self) -> str:
+        """
+        文档内容的哈希，覆盖写入文件时会输出的全部信息（结构、标签、id、lang 和文本）。
+        内容相同的两棵树哈希相同，可据此判断是否需要保存。
+        即根元素的子树哈希，编辑后只需重算变化路径上的节点。
+        """
+        return self.root.subtree_hash().hex()
+
+    def select(self, selector: str) -> List[HTMLElement]:
+        """
+        按 CSS 选择器查询元素（标签、#id、后代与子元素组合、:contains()），结果按文档顺序排列。
+        选择器无效时抛出 ValueError。
+        """
+        if self.selector_index is None:
+            from selector import SelectorIndex
+            self.selector_index = SelectorIndex()
+            self.add_listener(self.selector_index)
+        return self.selector_index.select(selector)
+
+    def iter_elements(self) -> Iterator[HTMLElement]:
+        """
+        先序遍历文档中的所有元素。
+        """
+        return self.root.iter()
+
     def delete_element(self, element: HTMLElement) -> bool:
         """
         删除指定元素。
@@ -0,0 +1,204 @@
+# selector.py
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from model import DocumentListener, HTMLDocument, HTMLElement
+
+DESCENDANT = " "
+CHILD = ">"
+
+# 一个复合选择器中的各部分：标签、#id、:contains(...)
+_PART = re.compile(r"""
+    (?P<tag>\*|[A-Za-z][\w-]*)
+  | \#(?P<id>[\w-]+)
+  | :contains\(\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<bare>[^)]*?))\s*\)
+""", re.VERBOSE)
+_COMBINATOR = re.compile(r"\s*(>)\s*|\s+")
+
+
+class Compound(NamedTuple):
+    tag: Optional[str]       # None 表示任意标签
+    id: Optional[str]
+    contains: Tuple[str, ...]
+
+
+class Selector(NamedTuple):
+    compounds: Tuple[Compound, ...]  # 从左到右
+    combinators: Tuple[str, ...]     # combinators[i] 连接 compounds[i] 与 compounds[i + 1]
+
+
+def parse_selector(text: str) -> List[Selector]:
+    """
+    解析选择器，支持：标签、*、#id、:contains(文本)、后代（空格）与子元素（>）组合，以及逗号分隔的多个选择器。
+    无法解析时抛出 ValueError。
+    """
+    selectors = []
+    for part in _split_list(text):
+        selectors.append(_parse_complex(part.strip(), text))
+    return selectors
+
+
+def _split_list(text: str) -> List[str]:
+    # 按不在 :contains(...) 内的逗号切分
+    parts, depth, start = [], 0, 0
+    for index, char in enumerate(text):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth = max(0, depth - 1)
+        elif char == "," and depth == 0:
+            parts.append(text[start:index])
+            start = index + 1
+    parts.append(text[start:])
+    return parts
+
+
+def _parse_complex(text: str, original: str) -> Selector:
+    if not text:
+        raise ValueError(f"Invalid selector '{original}': empty selector.")
+    compounds: List[Compound] = []
+    combinators: List[str] = []
+    position = 0
+    while True:
+        compound, position = _parse_compound(text, position, original)
+        compounds.append(compound)
+        if position == len(text):
+            break
+        match = _COMBINATOR.match(text, position)
+        if not match:
+            raise ValueError(f"Invalid selector '{original}': unexpected '{text[position:]}'.")
+        combinators.append(CHILD if match.group(1) else DESCENDANT)
+        position = match.end()
+        if position == len(text):
+            raise ValueError(f"Invalid selector '{original}': missing selector after combinator.")
+    return Selector(tuple(compounds), tuple(combinators))
+
+
+def _parse_compound(text: str, position: int, original: str) -> Tuple[Compound, int]:
+    tag, element_id, contains = None, None, []
+    start = position
+    while position < len(text):
+        match = _PART.match(text, position)
+        if not match:
+            break
+        if match.group("tag") is not None:
+            if position != start:
+                raise ValueError(f"Invalid selector '{original}': tag must come first in '{text[start:]}'.")
+            tag = None if match.group("tag") == "*" else match.group("tag").lower()
+        elif match.group("id") is not None:
+            element_id = match.group("id")
+        else:
+            contains.append(next(group for group in match.group("dq", "sq", "bare") if group is not None))
+        position = match.end()
+    if position == start:
+        raise ValueError(f"Invalid selector '{original}': unexpected '{text[start:]}'.")
+    return Compound(tag, element_id, tuple(contains)), position
+
+
+def compound_matches(element: HTMLElement, compound: Compound) -> bool:
+    """
+    :contains() 只检查元素自身的文本（不含后代）。
+    """
+    if compound.tag is not None and element.tag_name != compound.tag:
+        return False
+    if compound.id is not None and element.id != compound.id:
+        return False
+    return all(text in element.text_content for text in compound.contains)
+
+
+def _matches_from(element: HTMLElement, selector: Selector, index: int) -> bool:
+    """
+    element 已匹配 compounds[index]，检查其祖先能否匹配左边的部分。
+    """
+    if index == 0:
+        return True
+    compound = selector.compounds[index - 1]
+    if selector.combinators[index - 1] == CHILD:
+        parent = element.parent
+        return parent is not None and compound_matches(parent, compound) and _matches_from(parent, selector, index - 1)
+    ancestor = element.parent
+    while ancestor is not None:
+        if compound_matches(ancestor, compound) and _matches_from(ancestor, selector, index - 1):
+            return True
+        ancestor = ancestor.parent
+    return False
+
+
+class SelectorIndex(DocumentListener):
+    """
+    文档的标签索引与 id 索引，随文档变更增量维护，供选择器查询确定候选元素。
+    """
+    def __init__(self):
+        self.document: Optional[HTMLDocument] = None
+        self.by_tag: Dict[str, Dict[HTMLElement, None]] = {}  # 用字典充当有序集合
+        self.by_id: Dict[str, HTMLElement] = {}
+
+    def on_reset(self, document: HTMLDocument):
+        self.document = document
+        self.by_tag.clear()
+        self.by_id.clear()
+        self.on_attach(document.root)
+
+    def on_attach(self, element: HTMLElement):
+        for node in element.iter():
+            self.by_tag.setdefault(node.tag_name, {})[node] = None
+            self.by_id[node.id] = node
+
+    def on_detach(self, element: HTMLElement):
+        for node in element.iter():
+            elements = self.by_tag.get(node.tag_name)
+            if elements is not None:
+                elements.pop(node, None)
+                if not elements:
+                    del self.by_tag[node.tag_name]
+            if self.by_id.get(node.id) is node:
+                del self.by_id[node.id]
+
+    def on_id_change(self, element: HTMLElement, old_id: str):
+        if self.by_id.get(old_id) is element:
+            del self.by_id[old_id]
+        self.by_id[element.id] = element
+
+    def candidates(self, compound: Compound) -> Optional[Iterable[HTMLElement]]:
+        """
+        最右侧复合选择器的候选元素；既无 id 也无标签时返回 None，表示需要遍历全文档。
+        """
+        if compound.id is not None:
+            element = self.by_id.get(compound.id)
+            return [element] if element is not None else []
+        if compound.tag is not None:
+            return self.by_tag.get(compound.tag, {})
+        return None
+
+    def select(self, selector_text: str) -> List[HTMLElement]:
+        """
+        返回匹配选择器的元素，按文档顺序排列。
+        """
+        selectors = parse_selector(selector_text)
+        matched: Set[HTMLElement] = set()
+        scan = False
+        for selector in selectors:
+            last = selector.compounds[-1]
+            candidates = self.candidates(last)
+            if candidates is None:
+                candidates = self.document.root.iter()
+                scan = True
+            for element in candidates:
+                if compound_matches(element, last) and _matches_from(element, selector, len(selector.compounds) - 1):
+                    matched.add(element)
+        if scan or len(matched) * 8 > len(self.by_id):
+            # 结果很多时，按文档顺序遍历一遍比逐个计算位置更快
+            return [element for element in self.document.root.iter() if element in matched]
+        return sorted(matched, key=document_position)
+
+
+def document_position(element: HTMLElement) -> List[int]:
+    """
+    元素在文档中的位置：从根到该元素的各级兄弟顺序标签，比较结果与按下标比较相同。
+    """
+    path = []
+    node = element
+    while node.parent is not None:
+        path.append(node._order)
+        node = node.parent
+    path.reverse()
+    return path
@@ -1,36 +1,137 @@
 # session_manager.py
-from typing import Dict
+import os
+import pickle
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
 from editor import Editor
 from model import HTMLDocument
-from io_manager import HTMLParser, HTMLWriter
+from commands import ReloadCommand
+from tree_diff import diff_documents
+from io_manager import Directory, HTMLParser, HTMLWriter
+from instrumentation import timed
+from memory_budget import (DocumentSize, OpenEditor, SpilledEditor, editor_size, format_size, restore_editor,
+                           spill_editor)
+from text_index import TextIndex, search_indexes
+from workspace import DEFAULT_PATTERN, parse_files, scan_directory
+
+POLL_INTERVAL = 1.0  # 检查打开的文件是否被外部修改的最短间隔（秒）
+
+
+def file_fingerprint(filename: str) -> Optional[Tuple[int, int, int]]:
+    """
+    文件的 (修改时间, 大小, inode)，用于廉价地判断文件是否被外部修改；文件不存在时返回 None。
+    """
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
 
 class SessionManager:
     """
     管理多个 Editor 会话，处理文件的加载、保存、切换等。
+    设置了内存预算（字节）时，超出预算后把最久未用的非活动编辑器换出到磁盘，再次使用时自动读回。
     """
-    def __init__(self):
-        self.editors: Dict[str, Editor] = {}  # key: filename, value: Editor
-        self.active_filename: str = ""
+    def __init__(self, memory_budget: Optional[int] = None):
+        # key: filename, value: Editor；已换出到磁盘的为 SpilledEditor，通过 get_editor 取用
+        self.editors: Dict[str, OpenEditor] = {}
+        self.directory = Directory([], None)  # 打开文件的目录树，随加载、关闭和切换增量维护
+        self._active_filename: str = ""
+        self.text_indexes: Dict[str, TextIndex] = {}  # 每个打开文件的全文索引
+        # 打开文件在最近一次加载、保存或重新加载时的 (mtime, 大小, inode)，文件不存在时为 None
+        self.file_stats: Dict[str, Optional[Tuple[int, int, int]]] = {}
+        self.reported_stats: Dict[str, Optional[Tuple[int, int, int]]] = {}  # 已提示过的磁盘变化
+        self.last_poll = 0.0
+        self.memory_budget = memory_budget  # None 表示不限制
+        self.sizes: Dict[str, DocumentSize] = {}  # 内存中的编辑器的文档大小估算
+        self.recent: Dict[str, None] = {}  # 按最近使用排序的打开文件，最久未用的在前
+        self.spill_directory: Optional[tempfile.TemporaryDirectory] = None  # 第一次换出时创建
+        self.spill_count = 0
+
+    @property
+    def active_filename(self) -> str:
+        return self._active_filename
 
-    def load(self, filename: str, parser: HTMLParser):
+    @active_filename.setter
+    def active_filename(self, filename: str):
+        self._active_filename = filename
+        self.directory.set_active(filename)
+        if filename in self.recent:
+            self.recent[filename] = self.recent.pop(filename)
+
+    @timed("SessionManager.load")
+    def load(self, filename: str, parser: HTMLParser, mode: str = "full"):
         """
         加载文件，如果文件不存在则初始化一个新文档。新加载的文件成为活动文件。
+        mode 选择解析方式：full 整体解析；stream 分块流式解析（filename 可以是管道，"-" 表示标准输入）；
+        mmap 文本引用文件的只读映射，访问时才解码；skeleton 只建立文档的上层结构，其余按需展开。
         """
         if filename in self.editors:
             print(f"File '{filename}' is already loaded.")
             self.active_filename = filename
             return
-        document = parser.parse(filename)
+        parse = {"stream": parser.parse_stream, "mmap": parser.parse_mapped,
+                 "skeleton": parser.parse_skeleton}.get(mode, parser.parse)
+        document = parse(filename)
         if not document:
             # 文件不存在或解析失败，初始化新文档
             document = HTMLDocument()
             print(f"Initialized new HTML document for '{filename}'.")
-        editor = Editor(document)
-        self.editors[filename] = editor
+        self.register(filename, document)
         self.active_filename = filename
         print(f"Loaded file: {filename}")
+        self.enforce_budget()
         return filename
 
+    def register(self, filename: str, document: HTMLDocument) -> Editor:
+        """
+        为已解析的文档创建编辑器并加入会话（不改变活动文件）。
+        """
+        editor = Editor(document)
+        self.editors[filename] = editor
+        self.recent[filename] = None
+        self.file_stats[filename] = file_fingerprint(filename)
+        self.directory.add_file(filename)
+        self.add_listeners(filename, document)
+        return editor
+
+    def add_listeners(self, filename: str, document: HTMLDocument):
+        self.text_indexes[filename] = TextIndex()
+        document.add_listener(self.text_indexes[filename])
+        self.sizes[filename] = DocumentSize()
+        document.add_listener(self.sizes[filename])
+
+    def remove_listeners(self, filename: str, document: HTMLDocument):
+        document.remove_listener(self.text_indexes.pop(filename))
+        document.remove_listener(self.sizes.pop(filename))
+
+    @timed("SessionManager.load_dir")
+    def load_dir(self, root: str, pattern: str = DEFAULT_PATTERN, workers: Optional[int] = None) -> List[str]:
+        """
+        扫描目录中匹配 pattern 的文件并在进程池中并行解析，全部加入会话。
+        已打开的文件跳过；会话原本没有活动文件时，第一个加载的文件成为活动文件。
+        """
+        if not os.path.isdir(root):
+            print(f"Directory '{root}' does not exist.")
+            return []
+        start = time.perf_counter()
+        paths = [path for path in scan_directory(root, pattern) if path not in self.editors]
+        loaded = []
+        for path, document in parse_files(paths, workers):
+            if document is None:
+                continue
+            self.register(path, document)
+            loaded.append(path)
+            self.enforce_budget()
+        if loaded and not self.active_filename:
+            self.active_filename = loaded[0]
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"Loaded {len(loaded)} file(s) matching '{pattern}' from '{root}' in {elapsed:.0f} ms.")
+        return loaded
+
+    @timed("SessionManager.save")
     def save(self, filename: str, writer: HTMLWriter):
         """
         保存指定文件。
@@ -38,9 +139,21 @@ class SessionManager:
         if filename not in self.editors:
             print(f"File '{filename}' is not loaded.")
             return False
-        editor = self.editors[filename]
+        editor = self.get_editor(filename)
+        content_hash = editor.document.content_hash()
+        if content_hash == editor.saved_hash and os.path.exists(filename):
+            # 内容与磁盘上的一致，无需重新渲染和写入
+            print(f"No changes to save in '{filename}'.")
+            return True
+        if self.changed_on_disk(filename) and os.path.exists(filename):
+            # 被删除的文件没有可覆盖的内容，直接写入
+            choice = input(f"File '{filename}' was changed on disk since it was loaded. Overwrite it? (y/n): ").lower()
+            if choice != 'y':
+                print(f"Save cancelled. Use 'reload {filename}' to merge the changes from disk.")
+                return False
         writer.write(editor.document, filename)
-        editor.is_modified = False
+        editor.mark_saved(content_hash)
+        self.file_stats[filename] = file_fingerprint(filename)
         return True
 
     def close(self, writer: HTMLWriter):
@@ -56,11 +169,113 @@ class SessionManager:
             choice = input(f"File '{target_name}' has unsaved changes. Save before closing? (y/n): ").lower()
             if choice == 'y':
                 self.save(target_name, writer)
-        del self.editors[target_name]
+        editor = self.editors.pop(target_name)  # 保存时可能已从磁盘读回
+        if isinstance(editor, SpilledEditor):
+            editor.discard()
+        else:
+            self.remove_listeners(target_name, editor.document)
+        self.recent.pop(target_name, None)
+        self.file_stats.pop(target_name, None)
+        self.reported_stats.pop(target_name, None)
+        self.directory.remove_file(target_name)
         print(f"Closed file: {target_name}")
         self.active_filename = next(iter(self.editors), "")
         return True
 
+    def changed_on_disk(self, filename: str) -> bool:
+        """
+        文件自最近一次加载、保存或重新加载以来是否被其他程序修改（或删除、创建）。只做一次 stat。
+        """
+        return file_fingerprint(filename) != self.file_stats.get(filename)
+
+    def poll_changes(self, interval: float = POLL_INTERVAL) -> List[str]:
+        """
+        检查打开的文件是否在磁盘上被修改，返回新发现变化的文件（同一次变化只报告一次）。
+        距上次检查不足 interval 秒时直接返回空列表。
+        """
+        now = time.monotonic()
+        if now - self.last_poll < interval:
+            return []
+        self.last_poll = now
+        changed = []
+        for filename in self.editors:
+            fingerprint = file_fingerprint(filename)
+            if fingerprint != self.file_stats.get(filename) and fingerprint != self.reported_stats.get(filename):
+                self.reported_stats[filename] = fingerprint
+                changed.append(filename)
+                editor = self.editors[filename]
+                if isinstance(editor, Editor) and editor.document.release_mapping():
+                    # 文本还引用着被原地改写的文件的映射：复制到的已是新内容，加载时的文本无法找回
+                    print(f"Warning: '{filename}' was rewritten in place while mapped. Its text from before "
+                          f"the change is lost, and undo history from before the change is unreliable.")
+        return changed
+
+    @timed("SessionManager.reload")
+    def reload(self, filename: str, parser: HTMLParser) -> bool:
+        """
+        重新解析磁盘上的文件，并把差异作为一条可撤销的命令应用到正在编辑的文档上。
+        有未保存的修改时先询问，因为重新加载会覆盖它们（可以撤销找回）。
+        映射的源文件被原地改写过时，文档中加载时的文本已经丢失，撤销无法找回：
+        改为整体替换并清空撤销历史（见 replace_rewritten）。
+        """
+        if filename not in self.editors:
+            print(f"File '{filename}' is not loaded.")
+            return False
+        editor = self.get_editor(filename)
+        if self.changed_on_disk(filename):
+            editor.document.release_mapping()
+        new_document = parser.parse(filename)
+        if new_document is None:
+            return False
+        if editor.document.source_rewritten:
+            return self.replace_rewritten(filename, editor, new_document)
+        ops = diff_documents(editor.document, new_document)
+        if ops and editor.is_modified:
+            choice = input(f"File '{filename}' has unsaved changes that reloading will overwrite "
+                           f"(they can be restored with undo). Reload anyway? (y/n): ").lower()
+            if choice != 'y':
+                print("Reload cancelled.")
+                return False
+        if ops:
+            editor.execute_command(ReloadCommand(editor.document, ops, new_document))
+        else:
+            print(f"'{filename}' is already up to date.")
+        editor.mark_saved()
+        self.file_stats[filename] = file_fingerprint(filename)
+        self.reported_stats.pop(filename, None)
+        return True
+
+    def replace_rewritten(self, filename: str, editor: Editor, new_document: HTMLDocument) -> bool:
+        """
+        重新加载映射期间被原地改写的文件：用磁盘上的版本替换整棵树，并清空撤销历史——
+        历史中的命令引用的文本已是改写后的字节，撤销只会恢复出错乱的内容。有历史或修改时先询问。
+        """
+        if editor.undo_stack or editor.redo_stack or editor.is_modified:
+            choice = input(f"File '{filename}' was rewritten in place while mapped, so its earlier text "
+                           f"cannot be recovered. Reloading replaces the document and clears the undo history; "
+                           f"unsaved changes will be lost. Reload anyway? (y/n): ").lower()
+            if choice != 'y':
+                print("Reload cancelled.")
+                return False
+        document = editor.document
+        document.root = new_document.root
+        document.id_allocator.counters.update(new_document.id_allocator.counters)
+        document.head, document.title, document.body = new_document.head, new_document.title, new_document.body
+        document.source_rewritten = False
+        editor.clear_history()
+        editor.mark_saved()
+        self.file_stats[filename] = file_fingerprint(filename)
+        self.reported_stats.pop(filename, None)
+        print(f"Replaced '{filename}' with the version on disk. Undo history was cleared.")
+        return True
+
+    def search(self, query: str, limit: Optional[int] = 20) -> List[Tuple[str, str, str, float]]:
+        """
+        在所有打开的文件中检索同时包含全部检索词的元素，返回按相关度排序的
+        (文件名, 元素 id, 摘要, 得分)。已换出到磁盘的文件不检索（见 spilled_files）。
+        """
+        return search_indexes(self.text_indexes, query, limit)
+
     def list_editors(self):
         """
         显示当前会话中打开的编辑文件的列表。
@@ -68,10 +283,19 @@ class SessionManager:
         if not self.editors:
             print("No open editors.")
             return
+        # 设置了内存预算或有编辑器已换出时，标出每个编辑器是否在内存中及其估算大小
+        show_memory = self.memory_budget is not None or bool(self.spilled_files())
         for filename, editor in self.editors.items():
             indicator = ">" if filename == self.active_filename else " "
             modified = "*" if editor.is_modified else ""
-            print(f"{indicator} {filename}{modified}")
+            if not show_memory:
+                print(f"{indicator} {filename}{modified}")
+            elif isinstance(editor, SpilledEditor):
+                print(f"{indicator} {filename}{modified}  [on disk, {format_size(editor.size)}]")
+            else:
+                print(f"{indicator} {filename}{modified}  [resident, {format_size(self.editor_size(filename))}]")
+        if self.memory_budget is not None:
+            print(f"Resident: {format_size(self.resident_size())} of {format_size(self.memory_budget)} budget.")
 
     def switch_editor(self, filename: str):
         """
@@ -90,7 +314,7 @@ class SessionManager:
         获取当前活动编辑器。
         """
         if self.active_filename:
-            return self.editors[self.active_filename]
+            return self.get_editor(self.active_filename)
         else:
             return None
         
@@ -104,7 +328,7 @@ class SessionManager:
         """
             获取当前打开的文件列表对应的所有showid。
         """
-        editors = list(self.editors.values())
+        editors = list(self.editors.values())  # 换出的编辑器也保留了 show_id
         return [editor.show_id for editor in editors]
 
     def get_active_file(self):
@@ -121,4 +345,79 @@ class SessionManager:
         editor.show_id = False
 
     def set_active_file(self, file_name):
-        self.active_filename = file_name
\ No newline at end of file
+        self.active_filename = file_name
+
+    def get_editor(self, filename: str) -> Editor:
+        """
+        获取指定文件的编辑器；已换出到磁盘的先读回内存（不检查预算，由调用者在命令结束后检查）。
+        """
+        editor = self.editors[filename]
+        if isinstance(editor, SpilledEditor):
+            editor = self.restore(filename)
+        return editor
+
+    def editor_size(self, filename: str) -> int:
+        return editor_size(self.editors[filename], self.sizes[filename])
+
+    def resident_size(self) -> int:
+        """
+        内存中全部编辑器的估算大小之和。
+        """
+        return sum(self.editor_size(filename) for filename in self.sizes)
+
+    def spilled_files(self) -> List[str]:
+        return [filename for filename, editor in self.editors.items() if isinstance(editor, SpilledEditor)]
+
+    def enforce_budget(self) -> List[str]:
+        """
+        内存中的编辑器超出预算时，按最久未用的顺序换出非活动的编辑器，直到回到预算以内。
+        返回被换出的文件。活动编辑器即使单独超出预算也保留在内存中。
+        """
+        if self.memory_budget is None:
+            return []
+        total = self.resident_size()
+        spilled = []
+        for filename in list(self.recent):
+            if total <= self.memory_budget:
+                break
+            if filename == self.active_filename or filename not in self.sizes:
+                continue
+            size = self.editor_size(filename)
+            if self.spill(filename):
+                total -= size
+                spilled.append(filename)
+        return spilled
+
+    def spill(self, filename: str) -> bool:
+        """
+        把编辑器（文档和撤销/重做历史）写入临时目录并释放内存中的文档。无法写入时保留在内存中。
+        """
+        editor = self.editors[filename]
+        size = self.editor_size(filename)
+        is_modified = editor.is_modified
+        if self.spill_directory is None:
+            self.spill_directory = tempfile.TemporaryDirectory(prefix="html-editor-")
+        self.spill_count += 1
+        path = os.path.join(self.spill_directory.name, f"{self.spill_count}.pickle.gz")
+        try:
+            spill_editor(editor, path)
+        except (pickle.PicklingError, TypeError, AttributeError, OSError) as error:
+            print(f"Could not move '{filename}' to disk, keeping it in memory: {error}")
+            return False
+        self.remove_listeners(filename, editor.document)
+        self.editors[filename] = SpilledEditor(path, size, is_modified, editor.show_id)
+        print(f"Moved '{filename}' to disk ({format_size(size)}) to stay within the memory budget.")
+        return True
+
+    def restore(self, filename: str) -> Editor:
+        """
+        读回已换出的编辑器，重新挂上检索索引和大小估算。
+        """
+        spilled = self.editors[filename]
+        editor = restore_editor(spilled.path)
+        spilled.discard()
+        editor.show_id = spilled.show_id
+        self.editors[filename] = editor
+        self.add_listeners(filename, editor.document)
+        print(f"Loaded '{filename}' back from disk.")
+        return editor
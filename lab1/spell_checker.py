@@ -1,48 +1,110 @@
 # spell_checker.py
+import os
 import string
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from model import HTMLDocument, HTMLElement
-from spellchecker import SpellChecker  # 确保安装了pyspellchecker库
+from compact_dict import Dictionary, LayeredDictionary
+from language import DEFAULT_LANGUAGE, DictionaryPool, SpellingContext, get_spelling_context
+from symspell import SymSpellIndex
+from tracing import traced
+
+# 建议索引的默认持久化位置
+SUGGESTION_INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DEFAULT_SUGGESTION_INDEX = os.path.join(SUGGESTION_INDEX_DIR, "symspell_en.pkl")
+
+
+def suggestion_index_path(language: str, dictionary: Dictionary) -> str:
+    """
+    某语言词典的建议索引的持久化位置。叠加了用户词表的词典按内容指纹另存一份，
+    不覆盖默认词典共用的索引文件。
+    """
+    if isinstance(dictionary, LayeredDictionary):
+        return os.path.join(SUGGESTION_INDEX_DIR, f"symspell_{language}.user-{dictionary.fingerprint()[:16]}.pkl")
+    return os.path.join(SUGGESTION_INDEX_DIR, f"symspell_{language}.pkl")
+
 
 class HTMLSpellChecker:
     """
     用于检查 HTML 文档中元素文本的拼写错误。
     """
-    def __init__(self):
-        self.spell_checker = SpellChecker()
+    def __init__(self, suggestion_index_path: Optional[str] = None,
+                 dictionary: Optional[Dictionary] = None, user_word_lists: Optional[List[str]] = None,
+                 pool_capacity: Optional[int] = None):
+        if dictionary is None and not user_word_lists and pool_capacity is None:
+            # 与文档树中的拼写标记共用同一份设置和词典池，两处结果一致
+            self.context = get_spelling_context()
+        else:
+            # 各语言的词典按需加载（编译词典以只读方式内存映射，进程内共享同一份）；默认语言的词典常驻。
+            # 要让文档树的拼写标记也按这些设置判断，用 language.set_spelling_context(checker.context)
+            self.context = SpellingContext(DictionaryPool(pool_capacity or 2, user_word_lists))
+            if dictionary is not None:
+                if user_word_lists:
+                    dictionary = LayeredDictionary(dictionary, user_word_lists)
+                self.context.pool.pin(DEFAULT_LANGUAGE, dictionary)
+        # 默认语言建议索引的位置，缺省时按词典决定（见 suggestion_index_path）；其他语言总是按词典决定
+        self.suggestion_index_path = suggestion_index_path
 
+    @property
+    def dictionary(self) -> Dictionary:
+        """
+        默认语言的词典，第一次使用时加载。
+        """
+        return self.context.pool.get(self.context.default_language)
+
+    @traced("HTMLSpellChecker.check_spelling", "spell")
     def check_spelling(self, document: HTMLDocument) -> List[Tuple[str, str]]:
         """
         检查给定 HTML 文档中的拼写错误。
 
         :param document: HTMLDocument 实例
-        :return: 拼写错误的列表，每个错误为 (元素 id, 错误单词)
+        :return: 拼写错误的列表，每个错误为 (元素 id, 错误单词)，按文档顺序排列
         """
-        errors = []
-        if document and document.root:
-            self._check_element_spelling(document.root, errors)
-            print("the len of errors: ", len(errors))
-        else:
+        errors = [(element_id, word) for element_id, word, _ in self.find_errors(document)]
+        print("the len of errors: ", len(errors))
+        return errors
+
+    def find_errors(self, document: HTMLDocument) -> List[Tuple[str, str, str]]:
+        """
+        同 check_spelling，每个错误另带判断所用的语言：(元素 id, 错误单词, 语言)。
+        """
+        if not (document and document.root):
             raise ValueError("文档或根元素不存在")
+        errors = []
+        context = self.context
+        stack = [(document.root, *context.inherited_language(document.root))]
+        while stack:
+            element, language, explicit = stack.pop()
+            if element.text_content:
+                detected, words = context.misspellings(element.text_content, language, explicit)
+                errors.extend((element.id, word, detected) for word in words)
+            stack.extend((child, *context.child_language(child, language, explicit))
+                         for child in reversed(element.children))
         return errors
 
-    def _check_element_spelling(self, element: HTMLElement, errors: List[Tuple[str, str]]):
-        """
-        #递归检查元素及其子元素的拼写
-        #:param element: 当前检查的 HTMLElement
-        #:param errors: 存储拼写错误的列表
-        """
-        if element.text_content:
-            words = [word.strip('.,!?()[]{}":;') for word in element.text_content.split()]
-            words = [word for word in words if word]  # 移除空字符串
-            words = [word for word in words if not word.isdigit() and not any(
-                c.isalpha() and c > '\u4e00' and c < '\u9fff' for c in word)]  # 排除数字和中文
-            misspelled_words = self.spell_checker.unknown(words)
-            for word in words:
-                if word in misspelled_words:
-                    errors.append((element.id, word))
-        for child in element.children:
-            self._check_element_spelling(child, errors)
-
-    def get_suggestion(self, word:str) -> List[str]:
-        return list(self.spell_checker.candidates(word))
\ No newline at end of file
+    def get_suggestion_index(self, language: Optional[str] = None) -> SymSpellIndex:
+        """
+        获取某语言（缺省为默认语言）的建议索引，首次使用时从磁盘读取，若不存在则构建并持久化。
+        索引与该语言的词典一起存放在词典池中，随之淘汰。
+        """
+        return self.context.pool.suggestion_index(language or self.context.default_language, self._load_index)
+
+    def _load_index(self, language: str, dictionary: Dictionary) -> SymSpellIndex:
+        path = None
+        if language == self.context.default_language:
+            path = self.suggestion_index_path
+        return SymSpellIndex.load_or_build(path or suggestion_index_path(language, dictionary), dictionary)
+
+    def get_suggestion(self, word: str, limit: Optional[int] = 5, language: Optional[str] = None) -> List[str]:
+        """
+        返回按编辑距离和词频排序的建议词，取自 language（缺省为默认语言）的词典。
+        """
+        return self.get_suggestion_index(language).suggest(word, limit)
+
+    def suggest_all(self, document: HTMLDocument, limit: Optional[int] = 5) -> List[Tuple[str, str, List[str]]]:
+        """
+        对文档中的每个拼写错误给出建议，建议取自判断该错误时所用语言的词典。
+
+        :return: (元素 id, 错误单词, 建议列表) 的列表
+        """
+        return [(element_id, word, self.get_suggestion(word, limit, language))
+                for element_id, word, language in self.find_errors(document)]
\ No newline at end of file
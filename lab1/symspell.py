@@ -0,0 +1,238 @@
+# symspell.py
+import hashlib
+import os
+import pickle
+from typing import Dict, List, Optional, Tuple, Union
+
+FORMAT_VERSION = 2
+
+
+def content_fingerprint(word_frequency) -> str:
+    """
+    词典内容（词和词频）的指纹，用于判断持久化的索引是否由同一份词典构建。
+    词典对象自带 fingerprint 方法时使用它（如编译词典直接对文件内容求哈希），否则对排序后的词条求哈希。
+    """
+    fingerprint = getattr(word_frequency, "fingerprint", None)
+    if fingerprint is not None:
+        return fingerprint()
+    digest = hashlib.blake2b(digest_size=16)
+    for word, frequency in sorted(word_frequency.items()):
+        digest.update(f"{word}\0{frequency}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def osa_distance(source: str, target: str, max_distance: int) -> int:
+    """
+    计算两个字符串之间的受限 Damerau-Levenshtein（OSA）距离。
+    超过 max_distance 时提前返回 max_distance + 1。
+    """
+    # 去掉公共前后缀，缩小动态规划的规模
+    start = 0
+    limit = min(len(source), len(target))
+    while start < limit and source[start] == target[start]:
+        start += 1
+    end_s, end_t = len(source), len(target)
+    while end_s > start and end_t > start and source[end_s - 1] == target[end_t - 1]:
+        end_s -= 1
+        end_t -= 1
+    source = source[start:end_s]
+    target = target[start:end_t]
+    if len(source) > len(target):
+        source, target = target, source
+    len_s, len_t = len(source), len(target)
+    if len_t - len_s > max_distance:
+        return max_distance + 1
+    if len_s == 0:
+        return len_t
+
+    previous_previous: List[int] = []
+    previous = list(range(len_t + 1))
+    for i in range(1, len_s + 1):
+        current = [i] + [0] * len_t
+        row_min = i
+        char_s = source[i - 1]
+        for j in range(1, len_t + 1):
+            # 这里的 min 展开为比较，避免内层循环里的函数调用开销
+            char_t = target[j - 1]
+            value = previous[j - 1] if char_s == char_t else previous[j - 1] + 1
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if (i > 1 and j > 1 and char_s == target[j - 2] and source[i - 2] == char_t
+                    and previous_previous[j - 2] + 1 < value):
+                value = previous_previous[j - 2] + 1
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[len_t]
+
+
+class SymSpellIndex:
+    """
+    基于对称删除（SymSpell）算法的拼写建议索引。
+    预先为词典中每个词的前缀生成编辑距离以内的所有删除变体，
+    查询时只需生成输入词的删除变体并查表，再用编辑距离核验候选词。
+    """
+    def __init__(self, max_edit_distance: int = 2, prefix_length: int = 7):
+        self.max_edit_distance = max_edit_distance
+        self.prefix_length = prefix_length
+        self.words: List[str] = []
+        self.frequencies: List[int] = []
+        # 删除变体 -> 词编号；只有一个词时直接存 int，节省内存
+        self.deletes: Dict[str, Union[int, List[int]]] = {}
+        self.longest_word_length = 0
+        self.fingerprint: Optional[str] = None  # 构建时词典内容的指纹（见 content_fingerprint）
+
+    @classmethod
+    def build(cls, word_frequency: Dict[str, int], max_edit_distance: int = 2,
+              prefix_length: int = 7) -> 'SymSpellIndex':
+        """
+        从 词 -> 频率 的映射构建索引。
+        """
+        index = cls(max_edit_distance, prefix_length)
+        index.fingerprint = content_fingerprint(word_frequency)
+        deletes = index.deletes
+        for word_id, (word, frequency) in enumerate(word_frequency.items()):
+            index.words.append(word)
+            index.frequencies.append(frequency)
+            if len(word) > index.longest_word_length:
+                index.longest_word_length = len(word)
+            for variant in index._edits(word[:prefix_length]):
+                ids = deletes.get(variant)
+                if ids is None:
+                    deletes[variant] = word_id
+                elif isinstance(ids, int):
+                    deletes[variant] = [ids, word_id]
+                else:
+                    ids.append(word_id)
+        return index
+
+    def _edits(self, word: str) -> set:
+        """
+        生成 word 在最大编辑距离内的所有删除变体（包含 word 本身）。
+        """
+        result = {word}
+        frontier = {word}
+        for _ in range(self.max_edit_distance):
+            next_frontier = set()
+            for item in frontier:
+                if len(item) > 1:
+                    for i in range(len(item)):
+                        next_frontier.add(item[:i] + item[i + 1:])
+            result |= next_frontier
+            frontier = next_frontier
+        return result
+
+    def lookup(self, word: str, max_edit_distance: Optional[int] = None) -> List[Tuple[str, int, int]]:
+        """
+        查找与 word 距离不超过 max_edit_distance 的所有词。
+
+        :return: (候选词, 编辑距离, 词频) 的列表，按距离升序、词频降序排列
+        """
+        if max_edit_distance is None or max_edit_distance > self.max_edit_distance:
+            max_edit_distance = self.max_edit_distance
+        word = word.lower()
+        input_length = len(word)
+        if input_length - max_edit_distance > self.longest_word_length:
+            return []
+
+        results: List[Tuple[str, int, int]] = []
+        seen_ids = set()
+        prefix = word[:self.prefix_length]
+        prefix_length = len(prefix)
+        queue = [prefix]
+        seen_deletes = {prefix}
+        position = 0
+        while position < len(queue):
+            candidate = queue[position]
+            position += 1
+            length_diff = prefix_length - len(candidate)
+            ids = self.deletes.get(candidate)
+            if ids is not None:
+                for word_id in ((ids,) if isinstance(ids, int) else ids):
+                    if word_id in seen_ids:
+                        continue
+                    seen_ids.add(word_id)
+                    suggestion = self.words[word_id]
+                    if abs(len(suggestion) - input_length) > max_edit_distance:
+                        continue
+                    distance = osa_distance(word, suggestion, max_edit_distance)
+                    if distance <= max_edit_distance:
+                        results.append((suggestion, distance, self.frequencies[word_id]))
+            if length_diff < max_edit_distance and len(candidate) > 1:
+                for i in range(len(candidate)):
+                    variant = candidate[:i] + candidate[i + 1:]
+                    if variant not in seen_deletes:
+                        seen_deletes.add(variant)
+                        queue.append(variant)
+        results.sort(key=lambda item: (item[1], -item[2], item[0]))
+        return results
+
+    def suggest(self, word: str, limit: Optional[int] = 5) -> List[str]:
+        """
+        返回按可能性排序的建议词列表。
+        """
+        suggestions = [item[0] for item in self.lookup(word)]
+        return suggestions if limit is None else suggestions[:limit]
+
+    def save(self, filepath: str) -> None:
+        """
+        将索引持久化到磁盘（先写临时文件再替换，避免留下半个文件）。
+        """
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        state = {
+            "version": FORMAT_VERSION,
+            "max_edit_distance": self.max_edit_distance,
+            "prefix_length": self.prefix_length,
+            "words": self.words,
+            "frequencies": self.frequencies,
+            "deletes": self.deletes,
+            "longest_word_length": self.longest_word_length,
+            "fingerprint": self.fingerprint,
+        }
+        temp_path = filepath + ".tmp"
+        with open(temp_path, 'wb') as file:
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, filepath)
+
+    @classmethod
+    def load(cls, filepath: str) -> Optional['SymSpellIndex']:
+        """
+        从磁盘读取索引；文件不存在或格式不符时返回 None。
+        """
+        if not os.path.exists(filepath):
+            return None
+        try:
+            with open(filepath, 'rb') as file:
+                state = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        if not isinstance(state, dict) or state.get("version") != FORMAT_VERSION:
+            return None
+        index = cls(state["max_edit_distance"], state["prefix_length"])
+        index.words = state["words"]
+        index.frequencies = state["frequencies"]
+        index.deletes = state["deletes"]
+        index.longest_word_length = state["longest_word_length"]
+        index.fingerprint = state["fingerprint"]
+        return index
+
+    @classmethod
+    def load_or_build(cls, filepath: str, word_frequency: Dict[str, int]) -> 'SymSpellIndex':
+        """
+        优先读取已持久化的索引；不存在、或不是由内容相同的词典构建时（按指纹比较，而非词数）重新构建并保存。
+        """
+        index = cls.load(filepath)
+        if index is None or index.fingerprint != content_fingerprint(word_frequency):
+            index = cls.build(word_frequency)
+            try:
+                index.save(filepath)
+            except OSError as e:
+                print(f"Failed to save suggestion index to '{filepath}': {e}")
+        return index
@@ -0,0 +1,45 @@
+# test_benchmarks.py
+import os
+import sys
+import tempfile
+sys.path.append("..")
+
+import unittest
+from benchmarks.run_benchmarks import compare, load_json, main, run
+
+BENCHMARKS = ("parse", "display_tree", "display_indent", "write", "find_by_id_x200",
+              "check_spelling", "undo_redo_x200")
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_run_covers_all_benchmarks(self):
+        """测试每个规模都包含全部基准项。"""
+        results = run([150], repeat=1)
+        for name in BENCHMARKS:
+            metric = results["metrics"][f"{name}[150]"]
+            self.assertGreater(metric["median"], 0)
+            self.assertLessEqual(metric["min"], metric["median"])
+
+    def test_compare_threshold(self):
+        """测试超过阈值的项目被判为退化，缺少基线的项目被忽略。"""
+        baseline = {"metrics": {"parse[10]": {"median": 1.0, "min": 1.0}}}
+        results = {"metrics": {"parse[10]": {"median": 1.3, "min": 1.3},
+                               "write[10]": {"median": 9.0, "min": 9.0}}}
+        self.assertEqual([name for name, *_ in compare(results, baseline, 0.25)], ["parse[10]"])
+        self.assertEqual(compare(results, baseline, 0.5), [])
+
+    def test_main_saves_baseline_and_compares(self):
+        """测试保存基线后再次运行能完成比较并写出结果文件。"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            baseline = os.path.join(tmpdir, "baseline.json")
+            output = os.path.join(tmpdir, "result.json")
+            args = ["--sizes", "120", "--repeat", "1", "--baseline", baseline, "--output", output]
+            self.assertEqual(main(args + ["--save-baseline"]), 0)
+            self.assertIsNotNone(load_json(baseline))
+            # 阈值放宽到 100 倍，避免计时抖动导致误报
+            self.assertEqual(main(args + ["--threshold", "100"]), 0)
+            self.assertIn("parse[120]", load_json(output)["metrics"])
+
+
+if __name__ == '__main__':
+    unittest.main()
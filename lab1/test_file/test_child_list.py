@@ -0,0 +1,101 @@
+# test_child_list.py
+import random
+import sys
+sys.path.append("..")
+
+import unittest
+from io import StringIO
+from unittest.mock import patch
+from child_list import ChildList
+from commands import DeleteCommand, InsertCommand
+from editor import Editor
+from model import HTMLDocument, HTMLElement
+from selector import document_position
+
+
+def check_order(test, children, expected):
+    """检查链表、数组缓存、长度和顺序标签一致。"""
+    test.assertEqual(list(children), expected)
+    test.assertEqual(len(children), len(expected))
+    backward = []
+    node = children.tail
+    while node is not None:
+        backward.append(node)
+        node = node.previous_sibling
+    test.assertEqual(backward[::-1], expected)
+    labels = [node._order for node in expected]
+    test.assertEqual(labels, sorted(set(labels)))
+
+
+class TestChildList(unittest.TestCase):
+    def test_list_interface(self):
+        """测试迭代、下标、切片、包含、index 与列表一致。"""
+        elements = [HTMLElement("p", f"p{number}") for number in range(5)]
+        children = ChildList(elements[:3])
+        children.insert(1, elements[3])
+        children.insert_before(elements[4], elements[0])
+        expected = [elements[4], elements[0], elements[3], elements[1], elements[2]]
+        check_order(self, children, expected)
+        self.assertEqual(children[0], elements[4])
+        self.assertEqual(children[-1], elements[2])
+        self.assertEqual(children[1:3], expected[1:3])
+        self.assertEqual(children.index(elements[3]), 2)
+        self.assertIn(elements[1], children)
+        children.remove(elements[1])
+        self.assertNotIn(elements[1], children)
+        self.assertNotIn(elements[1], ChildList())
+        check_order(self, children, [elements[4], elements[0], elements[3], elements[2]])
+        with self.assertRaises(ValueError):
+            children.remove(elements[1])
+        with self.assertRaises(ValueError):
+            children.append(elements[0])
+
+    def test_repeated_insert_at_same_place_relabels(self):
+        """测试在同一位置反复插入耗尽标签空间后，局部重排仍保持顺序。"""
+        children = ChildList()
+        first, last = HTMLElement("p", "first"), HTMLElement("p", "last")
+        children.append(first)
+        children.append(last)
+        expected = [first, last]
+        rng = random.Random(0)
+        for number in range(3000):
+            element = HTMLElement("p", f"p{number}")
+            if rng.random() < 0.5:
+                children.insert_before(element, last)  # 始终挤在最后两个之间
+                expected.insert(len(expected) - 1, element)
+            else:
+                position = rng.randrange(len(expected))
+                children.insert_before(element, expected[position])
+                expected.insert(position, element)
+        check_order(self, children, expected)
+
+
+class TestWideNode(unittest.TestCase):
+    def test_insert_delete_undo_on_wide_node(self):
+        """测试很宽的节点上插入、删除及撤销恢复原位置，选择器结果按文档顺序。"""
+        document = HTMLDocument()
+        for number in range(2000):
+            document.body.add_child(HTMLElement("li", f"li{number}"))
+        editor = Editor(document)
+        with patch('sys.stdout', new=StringIO()):
+            editor.execute_command(InsertCommand(document, HTMLElement("li", "new"), "li1000"))
+            self.assertIs(document.find_by_id("new").next_sibling, document.find_by_id("li1000"))
+            editor.execute_command(DeleteCommand(document, "li500"))
+            editor.execute_command(DeleteCommand(document, "li1999"))
+            self.assertEqual(len(document.body.children), 1999)
+            editor.undo()
+            editor.undo()
+            self.assertIs(document.find_by_id("li500").previous_sibling, document.find_by_id("li499"))
+            self.assertIs(document.body.children[-1], document.find_by_id("li1999"))
+            editor.undo()
+            self.assertIsNone(document.find_by_id("new"))
+            editor.redo()
+        ids = [element.id for element in document.body.children]
+        self.assertEqual(ids.index("new"), 1000)
+        self.assertEqual([element.id for element in document.select("li")], ids)
+        self.assertLess(document_position(document.find_by_id("li3")),
+                        document_position(document.find_by_id("new")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+# test_compact_dict.py
+import os
+import sys
+import tempfile
+sys.path.append("..")
+
+import unittest
+from compact_dict import CompactDictionary, LayeredDictionary, compile_dictionary, open_dictionary
+from model import HTMLDocument, HTMLElement
+from spell_checker import DEFAULT_SUGGESTION_INDEX, HTMLSpellChecker, suggestion_index_path
+
+
+class TestCompactDictionary(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "test.dict")
+        compile_dictionary({"hello": 10, "World": 5, "café": 2, "this": 30, "is": 40, "a": 50}, self.path)
+        self.dictionary = CompactDictionary(self.path)
+
+    def tearDown(self):
+        self.dictionary.close()
+        self.temp_dir.cleanup()
+
+    def test_lookup(self):
+        """测试大小写无关的查询与词频。"""
+        self.assertIn("hello", self.dictionary)
+        self.assertIn("HELLO", self.dictionary)
+        self.assertIn("world", self.dictionary)
+        self.assertIn("café", self.dictionary)
+        self.assertNotIn("helo", self.dictionary)
+        self.assertEqual(self.dictionary.frequency("World"), 5)
+        self.assertEqual(self.dictionary.frequency("missing"), 0)
+
+    def test_sorted_items(self):
+        """测试词按字节序存放。"""
+        words = [word for word, _ in self.dictionary.items()]
+        self.assertEqual(words, sorted(words, key=lambda w: w.encode('utf-8')))
+        self.assertEqual(len(self.dictionary), 6)
+
+    def test_unknown_skips_numbers(self):
+        """测试 unknown 跳过数字和标点，与 SpellChecker 一致。"""
+        self.assertEqual(self.dictionary.unknown(["This", "is", "helo", "123", "4.5", "!"]), {"helo"})
+        self.assertEqual(self.dictionary.known(["This", "helo"]), {"this"})
+
+    def test_user_word_list(self):
+        """测试叠加项目自定义词表。"""
+        word_list = os.path.join(self.temp_dir.name, "words.txt")
+        with open(word_list, 'w', encoding='utf-8') as file:
+            file.write("# project words\nMyWebpage\nhtmleditor\n")
+        layered = LayeredDictionary(self.dictionary, [word_list])
+        self.assertIn("mywebpage", layered)
+        self.assertIn("hello", layered)
+        self.assertEqual(layered.unknown(["MyWebpage", "helo"]), {"helo"})
+
+    def test_layered_dictionary_has_own_suggestion_index(self):
+        """测试叠加词表的词典按内容区分指纹和建议索引的位置，不与默认词典共用，重叠的词只计一次。"""
+        word_list = os.path.join(self.temp_dir.name, "words.txt")
+        with open(word_list, 'w', encoding='utf-8') as file:
+            file.write("hello\nhtmleditor\n")
+        layered = LayeredDictionary(self.dictionary, [word_list])
+        self.assertEqual(len(layered), 7)
+        self.assertEqual(len(layered), len(list(layered.items())))
+        self.assertNotEqual(layered.fingerprint(), self.dictionary.fingerprint())
+        self.assertEqual(layered.fingerprint(), LayeredDictionary(self.dictionary, [word_list]).fingerprint())
+        self.assertEqual(suggestion_index_path("en", self.dictionary), DEFAULT_SUGGESTION_INDEX)
+        self.assertNotEqual(suggestion_index_path("en", layered), DEFAULT_SUGGESTION_INDEX)
+
+    def test_shared_instance(self):
+        """测试同一路径在进程内只映射一次。"""
+        self.assertIs(open_dictionary(self.path), open_dictionary(self.path))
+
+    def test_invalid_file(self):
+        """测试读取非词典文件。"""
+        bad_path = os.path.join(self.temp_dir.name, "bad.dict")
+        with open(bad_path, 'wb') as file:
+            file.write(b"not a dictionary file")
+        with self.assertRaises(ValueError):
+            CompactDictionary(bad_path)
+
+    def test_spell_checker_with_dictionary(self):
+        """测试 HTMLSpellChecker 使用指定词典。"""
+        document = HTMLDocument()
+        document.body.add_child(HTMLElement("p", "para1", "hello wrld"))
+        checker = HTMLSpellChecker(dictionary=self.dictionary)
+        self.assertEqual(checker.check_spelling(document), [("para1", "wrld")])
+
+
+if __name__ == "__main__":
+    unittest.main()
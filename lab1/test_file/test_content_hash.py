@@ -0,0 +1,107 @@
+# test_content_hash.py
+import os
+import sys
+import tempfile
+sys.path.append("..")
+
+import unittest
+from io import StringIO
+from unittest.mock import patch
+from commands import AppendCommand, EditTextCommand
+from editor import Editor
+from io_manager import HTMLParser, HTMLWriter
+from model import HTMLDocument, HTMLElement
+from session_manager import SessionManager
+
+
+class TestContentHash(unittest.TestCase):
+    def test_hash_reflects_content(self):
+        """测试内容相同的文档哈希相同，结构或文本不同时哈希不同。"""
+        first, second = HTMLDocument(), HTMLDocument()
+        self.assertEqual(first.content_hash(), second.content_hash())
+        first.body.add_child(HTMLElement("p", "p1", "hello"))
+        self.assertNotEqual(first.content_hash(), second.content_hash())
+        second.body.add_child(HTMLElement("p", "p1", "hello"))
+        self.assertEqual(first.content_hash(), second.content_hash())
+        second.body.children[0].text_content = "hullo"
+        self.assertNotEqual(first.content_hash(), second.content_hash())
+
+    def test_hash_distinguishes_nesting(self):
+        """测试同样的元素序列嵌套方式不同时哈希不同。"""
+        nested, flat = HTMLDocument(), HTMLDocument()
+        outer = HTMLElement("div", "a")
+        nested.body.add_child(outer)
+        outer.add_child(HTMLElement("div", "b"))
+        flat.body.add_child(HTMLElement("div", "a"))
+        flat.body.add_child(HTMLElement("div", "b"))
+        self.assertNotEqual(nested.content_hash(), flat.content_hash())
+
+    def test_undo_clears_modified(self):
+        """测试编辑后撤销回原样时不再视为已修改。"""
+        editor = Editor(HTMLDocument())
+        self.assertFalse(editor.is_modified)
+        with patch('sys.stdout', new=StringIO()):
+            editor.execute_command(AppendCommand(editor.document, HTMLElement("p", "p1"), "body"))
+            self.assertTrue(editor.is_modified)
+            editor.undo()
+            self.assertFalse(editor.is_modified)
+            editor.redo()
+            self.assertTrue(editor.is_modified)
+
+
+class TestSkipUnchangedSave(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "page.html")
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.write("<html><head><title>t</title></head><body><p id='p1'>hello</p></body></html>")
+        self.session_manager = SessionManager()
+        with patch('sys.stdout', new=StringIO()):
+            self.session_manager.load(self.path, HTMLParser())
+        self.editor = self.session_manager.editors[self.path]
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def save(self) -> str:
+        with patch('sys.stdout', new=StringIO()) as fake_out, \
+                patch.object(HTMLWriter, 'write', wraps=HTMLWriter().write) as write:
+            self.assertTrue(self.session_manager.save(self.path, HTMLWriter()))
+            self.write_calls = write.call_count
+        return fake_out.getvalue()
+
+    def test_noop_save_skips_write(self):
+        """测试加载后未修改时保存不写文件。"""
+        self.assertFalse(self.editor.is_modified)
+        self.assertIn("No changes to save", self.save())
+        self.assertEqual(self.write_calls, 0)
+
+    def test_edit_then_undo_skips_write(self):
+        """测试编辑后撤销再保存不写文件。"""
+        with patch('sys.stdout', new=StringIO()):
+            self.editor.execute_command(EditTextCommand(self.editor.document, "p1", "changed"))
+            self.editor.undo()
+        self.save()
+        self.assertEqual(self.write_calls, 0)
+
+    def test_changed_save_writes_once(self):
+        """测试有修改时写文件，之后再次保存跳过。"""
+        with patch('sys.stdout', new=StringIO()):
+            self.editor.execute_command(EditTextCommand(self.editor.document, "p1", "changed"))
+        self.assertTrue(self.editor.is_modified)
+        self.save()
+        self.assertEqual(self.write_calls, 1)
+        self.assertFalse(self.editor.is_modified)
+        self.save()
+        self.assertEqual(self.write_calls, 0)
+
+    def test_missing_file_is_written(self):
+        """测试磁盘上的文件被删除后，即使内容未变也重新写入。"""
+        os.remove(self.path)
+        self.save()
+        self.assertEqual(self.write_calls, 1)
+        self.assertTrue(os.path.exists(self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+# test_corpus.py
+import io
+import os
+import sys
+import tempfile
+sys.path.append("..")
+
+import unittest
+from corpus import CLOSE, OPEN, CorpusSpec, build_document, generate_html, iter_nodes, write_html
+from display import TreeDisplayStrategy
+from io_manager import HTMLParser
+
+
+class TestCorpus(unittest.TestCase):
+    def test_deterministic(self):
+        """测试相同参数和种子生成相同的文档，不同种子生成不同的文档。"""
+        spec = CorpusSpec(node_count=200, seed=7)
+        self.assertEqual(generate_html(spec), generate_html(spec))
+        self.assertNotEqual(generate_html(spec), generate_html(spec._replace(seed=8)))
+
+    def test_shape_limits(self):
+        """测试元素个数、深度和扇出受参数控制，事件成对出现。"""
+        spec = CorpusSpec(node_count=3000, max_depth=4, fan_out=3)
+        children = [0]
+        max_fan_out = 0
+        opened = 0
+        for event in iter_nodes(spec):
+            if event[0] == OPEN:
+                opened += 1
+                self.assertLessEqual(event[1], 4)
+                children[-1] += 1
+                if len(children) > 1:
+                    max_fan_out = max(max_fan_out, children[-1])
+                children.append(0)
+            else:
+                self.assertEqual(event[0], CLOSE)
+                children.pop()
+        self.assertEqual(opened, 3000)
+        self.assertEqual(children, [children[0]])
+        self.assertLessEqual(max_fan_out, 3)
+
+    def test_text_and_misspelling_rate(self):
+        """测试文本长度为 0 时不带文本，拼写错误率为 0 时只使用词表中的单词。"""
+        no_text = CorpusSpec(node_count=50, text_length=0)
+        self.assertTrue(all(event[4] == "" for event in iter_nodes(no_text) if event[0] == OPEN))
+        clean = build_document(CorpusSpec(node_count=200, misspelling_rate=0.0))
+        self.assertFalse(any(element.has_spelling_error for element in clean.iter_elements()))
+        noisy = build_document(CorpusSpec(node_count=200, misspelling_rate=0.5))
+        self.assertTrue(any(element.has_spelling_error for element in noisy.iter_elements()))
+
+    def test_duplicate_ids(self):
+        """测试重复 id 的比例，以及构建文档时重复 id 被重新分配。"""
+        spec = CorpusSpec(node_count=1000, duplicate_id_rate=0.2)
+        ids = [event[3] for event in iter_nodes(spec) if event[0] == OPEN]
+        duplicates = len(ids) - len(set(ids))
+        self.assertTrue(100 < duplicates < 300)
+        document = build_document(spec)
+        built_ids = [element.id for element in document.iter_elements()]
+        self.assertEqual(len(built_ids), len(set(built_ids)))
+
+    def test_build_document_matches_parse(self):
+        """测试直接构建的文档与解析生成的 HTML 得到的文档一致。"""
+        spec = CorpusSpec(node_count=300, duplicate_id_rate=0.1, seed=3)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "corpus.html")
+            size = write_html(spec, path)
+            self.assertEqual(os.path.getsize(path), size)
+            parsed = HTMLParser().parse(path)
+        built = build_document(spec)
+        parsed.set_display_strategy(TreeDisplayStrategy())
+        built.set_display_strategy(TreeDisplayStrategy())
+        self.assertEqual(parsed.display(), built.display())
+
+    def test_streams_in_chunks(self):
+        """测试输出分块写入，而不是一次性生成整个字符串。"""
+        class CountingWriter(io.StringIO):
+            writes = 0
+
+            def write(self, text):
+                CountingWriter.writes += 1
+                return super().write(text)
+        import corpus
+        original = corpus.WRITE_CHUNK
+        corpus.WRITE_CHUNK = 1024
+        try:
+            write_html(CorpusSpec(node_count=500), CountingWriter())
+        finally:
+            corpus.WRITE_CHUNK = original
+        self.assertGreater(CountingWriter.writes, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
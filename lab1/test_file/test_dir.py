@@ -2,7 +2,8 @@ import unittest
 from io import StringIO
 from unittest.mock import patch
 from display import TreeDisplayStrategy, IndentDisplayStrategy
-from io_manager import Directory
+from io_manager import Directory, HTMLParser, HTMLWriter
+from session_manager import SessionManager
 
 
 class TestDisplayStrategies(unittest.TestCase):
@@ -103,6 +104,52 @@ class TestDisplayStrategies(unittest.TestCase):
             print(self.directory.display())
             self.assertEqual(fake_out.getvalue().strip(), expected_output_tree.strip())
 
+    def test_incremental_updates(self):
+        """测试增删文件和切换活动文件后，目录树与重新构建的结果一致。"""
+        directory = Directory(file_list=[], active_file=None)
+        directory.set_display_strategy(self.tree_display)
+        for file in self.file_list + ["docs/a/b/c.html", "html/aaa"]:
+            directory.add_file(file)
+        directory.set_active("docs/a/b/c.html")
+        directory.set_active("html/test1.html")
+        directory.remove_file("docs/a/b/c.html")
+        directory.remove_file("html/aaa")  # 同名目录仍有文件，保留
+        directory.remove_file("missing/file.html")
+        expected = Directory(file_list=self.file_list, active_file="html/test1.html")
+        expected.set_display_strategy(self.tree_display)
+        self.assertEqual(directory.display(), expected.display())
+        self.assertEqual([node.file_name for node in directory.root.children], ["html"])
+        directory.remove_file("html/test1.html")
+        self.assertIsNone(directory.active)
+
+    def test_remove_keeps_sibling_order(self):
+        """测试删除中间的子节点后其余子节点保持加入顺序，重新加入的排在最后。"""
+        names = [f"page{i}.html" for i in range(5)]
+        directory = Directory(file_list=[f"site/{name}" for name in names], active_file=None)
+        directory.remove_file("site/page2.html")
+        site = directory.find("site")
+        self.assertEqual([node.file_name for node in site.children], names[:2] + names[3:])
+        directory.add_file("site/page2.html")
+        self.assertEqual([node.file_name for node in site.children], names[:2] + names[3:] + names[2:3])
+
+
+class TestSessionDirectory(unittest.TestCase):
+    def test_session_keeps_directory_in_sync(self):
+        """测试会话在加载、切换、关闭文件时维护目录树与活动标记。"""
+        session_manager = SessionManager()
+        with patch('sys.stdout', new=StringIO()):
+            for name in ("site/index.html", "site/blog/post.html", "notes.html"):
+                session_manager.load(name, HTMLParser())
+            session_manager.switch_editor("site/index.html")
+            self.assertTrue(session_manager.directory.find("site/index.html").is_active)
+            self.assertFalse(session_manager.directory.find("notes.html").is_active)
+            with patch('builtins.input', return_value='n'):
+                session_manager.close(HTMLWriter())
+        self.assertIsNone(session_manager.directory.find("site/index.html"))
+        self.assertEqual([node.file_name for node in session_manager.directory.root.children], ["site", "notes.html"])
+        active = session_manager.get_active_file()
+        self.assertTrue(session_manager.directory.find(active).is_active)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,97 @@
+# test_fragment.py
+import os
+import sys
+import tempfile
+sys.path.append("..")
+
+import unittest
+from io import StringIO
+from unittest.mock import patch
+from commands import InsertFragmentCommand
+from editor import Editor
+from io_manager import HTMLParser
+from model import HTMLDocument, HTMLElement
+
+FRAGMENT = """
+Intro text
+<ul id="list">
+  <li id="item">one</li>
+  <li id="item">two</li>
+  <li>three <em>bold</em></li>
+</ul>
+<!-- comment -->
+<p id="intro" lang="en">Helo wrold</p>
+"""
+
+
+class TestParseFragment(unittest.TestCase):
+    def setUp(self):
+        self.document = HTMLDocument()
+        self.document.body.add_child(HTMLElement("p", "intro"))
+        self.parser = HTMLParser()
+
+    def test_structure_and_ids(self):
+        """测试片段解析为脱离文档的子树，id 与文档及片段内部都不重复。"""
+        roots = self.parser.parse_fragment(FRAGMENT, self.document)
+        self.assertEqual([root.tag_name for root in roots], ["text", "ul", "p"])
+        self.assertEqual(roots[0].text_content, "Intro text")
+        self.assertTrue(all(root.parent is None for root in roots))
+        items = list(roots[1].children)
+        self.assertEqual([item.text_content for item in items], ["one", "two", "three"])
+        self.assertEqual(items[0].id, "item")
+        self.assertNotEqual(items[1].id, "item")
+        self.assertEqual(items[2].children[0].tag_name, "em")
+        self.assertNotEqual(roots[2].id, "intro")  # 文档中已有 intro
+        self.assertEqual(roots[2].lang, "en")
+        ids = [element.id for root in roots for element in root.iter()]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertFalse(any(self.document.id_allocator.is_taken(element_id) for element_id in ids))
+
+    def test_missing_file(self):
+        with patch('sys.stdout', new=StringIO()) as output:
+            self.assertIsNone(self.parser.load_fragment("no-such-fragment.html", self.document))
+        self.assertIn("does not exist", output.getvalue())
+
+
+class TestInsertFragmentCommand(unittest.TestCase):
+    def setUp(self):
+        self.document = HTMLDocument()
+        self.document.body.add_child(HTMLElement("p", "intro"))
+        self.editor = Editor(self.document)
+        self.parser = HTMLParser()
+
+    def test_append_and_insert_with_single_undo(self):
+        """测试整个片段作为一条撤销记录挂入文档，索引与拼写检查随之更新。"""
+        before = self.document.content_hash()
+        roots = self.parser.parse_fragment(FRAGMENT, self.document)
+        with patch('sys.stdout', new=StringIO()):
+            self.editor.execute_command(InsertFragmentCommand(self.document, roots, "intro", before=True))
+        self.assertEqual([child.tag_name for child in self.document.body.children], ["text", "ul", "p", "p"])
+        self.assertEqual(len(self.editor.undo_stack), 1)
+        self.assertTrue(self.document.id_allocator.is_taken("item"))
+        self.assertEqual(len(self.document.select("ul > li")), 3)
+        self.assertTrue(roots[2].has_spelling_error)
+        with patch('sys.stdout', new=StringIO()):
+            self.editor.undo()
+            self.assertEqual(self.document.content_hash(), before)
+            self.assertFalse(self.document.id_allocator.is_taken("item"))
+            self.assertEqual(self.document.select("li"), [])
+            self.editor.redo()
+        self.assertEqual(len(self.document.select("li")), 3)
+
+    def test_from_file(self):
+        """测试从文件读取片段并追加到指定元素。"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "rows.html")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write("".join(f"<p>row {number}</p>" for number in range(500)))
+            roots = self.parser.load_fragment(path, self.document)
+        with patch('sys.stdout', new=StringIO()):
+            self.editor.execute_command(InsertFragmentCommand(self.document, roots, "body"))
+        self.assertEqual(len(self.document.body.children), 501)
+        self.assertEqual(len(self.editor.undo_stack), 1)
+        self.assertEqual(self.document.body.children[-1].text_content, "row 499")
+
+
+if __name__ == '__main__':
+    unittest.main()
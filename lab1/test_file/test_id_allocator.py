@@ -0,0 +1,102 @@
+# test_id_allocator.py
+import os
+import sys
+import tempfile
+sys.path.append("..")
+
+import unittest
+from commands import AppendCommand, DeleteCommand, EditIdCommand, InitCommand, InsertCommand
+from editor import Editor
+from id_allocator import IdAllocator
+from io_manager import HTMLParser
+from model import HTMLDocument, HTMLElement
+
+
+class TestIdAllocator(unittest.TestCase):
+    def test_allocate_skips_taken(self):
+        """测试按前缀分配时跳过已占用的 id。"""
+        allocator = IdAllocator()
+        allocator.acquire("p-1")
+        self.assertEqual(allocator.allocate("p"), "p-2")
+        self.assertEqual(allocator.allocate("p"), "p-3")
+        self.assertEqual(allocator.allocate("text"), "text-1")
+
+    def test_reference_counting(self):
+        """测试重复 id 的引用计数。"""
+        allocator = IdAllocator()
+        allocator.acquire("a")
+        allocator.acquire("a")
+        allocator.release("a")
+        self.assertTrue(allocator.is_taken("a"))
+        allocator.release("a")
+        self.assertFalse(allocator.is_taken("a"))
+
+    def test_claim(self):
+        allocator = IdAllocator()
+        self.assertEqual(allocator.claim("item"), "item")
+        allocator.acquire("item")
+        self.assertEqual(allocator.claim("item"), "item-1")
+
+
+class TestDocumentIds(unittest.TestCase):
+    def setUp(self):
+        self.document = HTMLDocument()
+        self.editor = Editor(self.document)
+
+    def test_parser_assigns_unique_ids(self):
+        """测试解析器为文本节点、无 id 元素和重复 id 分配唯一 id。"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "page.html")
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write("<html><head><title>T</title></head><body>first<p>a</p>second"
+                           "<p>b</p><div id='x'></div><div id='x'></div></body></html>")
+            document = HTMLParser().parse(path)
+        ids = [element.id for element in document.iter_elements()]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual([child.id for child in document.body.children],
+                         ["text-1", "p-1", "text-2", "p-2", "x", "x-1"])
+
+    def test_append_auto_id_and_undo(self):
+        """测试自动分配 id，撤销后释放，重做沿用同一 id。"""
+        element = HTMLElement("p")
+        self.editor.execute_command(AppendCommand(self.document, element, "body", auto_id=True))
+        self.assertEqual(element.id, "p-1")
+        self.assertTrue(self.document.id_allocator.is_taken("p-1"))
+        self.editor.undo()
+        self.assertFalse(self.document.id_allocator.is_taken("p-1"))
+        self.editor.redo()
+        self.assertEqual(element.id, "p-1")
+        self.assertIs(self.document.find_by_id("p-1"), element)
+
+    def test_duplicate_id_rejected(self):
+        """测试插入重复 id 与修改为已有 id 均被拒绝。"""
+        self.editor.execute_command(AppendCommand(self.document, HTMLElement("div", "div1"), "body"))
+        duplicate = HTMLElement("div", "div1")
+        self.editor.execute_command(InsertCommand(self.document, duplicate, "div1"))
+        self.assertIsNone(duplicate.parent)
+        self.editor.execute_command(AppendCommand(self.document, HTMLElement("p", "p1"), "div1"))
+        self.editor.execute_command(EditIdCommand(self.document, "p1", "div1"))
+        self.assertIsNotNone(self.document.find_by_id("p1"))
+
+    def test_delete_releases_subtree_ids(self):
+        """测试删除子树后其中的 id 可以复用。"""
+        self.editor.execute_command(AppendCommand(self.document, HTMLElement("div", "div1"), "body"))
+        self.editor.execute_command(AppendCommand(self.document, HTMLElement("p", "p1"), "div1"))
+        self.editor.execute_command(DeleteCommand(self.document, "div1"))
+        self.assertFalse(self.document.id_allocator.is_taken("p1"))
+        self.editor.undo()
+        self.assertTrue(self.document.id_allocator.is_taken("p1"))
+
+    def test_init_and_undo_restore_ids(self):
+        """测试 init 及其撤销后 id 登记与当前树一致。"""
+        self.editor.execute_command(AppendCommand(self.document, HTMLElement("div", "div1"), "body"))
+        self.editor.execute_command(InitCommand(self.document))
+        self.assertFalse(self.document.id_allocator.is_taken("div1"))
+        self.editor.undo()
+        self.assertTrue(self.document.id_allocator.is_taken("div1"))
+        self.editor.undo()
+        self.assertIsNone(self.document.find_by_id("div1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
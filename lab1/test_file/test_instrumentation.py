@@ -0,0 +1,102 @@
+# test_instrumentation.py
+import os
+import sys
+import tempfile
+sys.path.append("..")
+
+import unittest
+import instrumentation
+from instrumentation import CommandStats, NodeCounter, Profiler, measure, percentile, timed
+from model import HTMLDocument
+
+
+class TestCommandStats(unittest.TestCase):
+    def test_percentile(self):
+        """测试最近秩法百分位数。"""
+        values = [float(i) for i in range(1, 101)]
+        self.assertEqual(percentile(values, 0.50), 50.0)
+        self.assertEqual(percentile(values, 0.95), 95.0)
+        self.assertEqual(percentile([3.0], 0.95), 3.0)
+
+    def test_summary_and_table(self):
+        """测试汇总与表格输出。"""
+        command_stats = CommandStats()
+        for i in range(1, 11):
+            command_stats.record("print-tree", i / 1000, i / 2000, 10)
+        summary = command_stats.summary("print-tree")
+        self.assertEqual(summary["count"], 10)
+        self.assertAlmostEqual(summary["p50"], 0.005)
+        self.assertAlmostEqual(summary["max"], 0.010)
+        self.assertEqual(summary["nodes_avg"], 10)
+        self.assertIn("print-tree", command_stats.format_table())
+        command_stats.reset()
+        self.assertEqual(command_stats.format_table(), "No statistics recorded.")
+
+    def test_sample_window(self):
+        """测试每个名称只保留最近的样本，但计数不丢失。"""
+        command_stats = CommandStats(max_samples=3)
+        for i in range(5):
+            command_stats.record("append", float(i), 0.0)
+        self.assertEqual(len(command_stats.samples["append"]), 3)
+        self.assertEqual(command_stats.summary("append")["count"], 5)
+
+
+class TestMeasure(unittest.TestCase):
+    def test_measure_counts_nodes(self):
+        """测试 measure 记录命令触及的节点数。"""
+        command_stats = CommandStats()
+        document = HTMLDocument()
+        measure("walk", lambda: list(document.iter_elements()), command_stats)
+        self.assertEqual(command_stats.summary("walk")["nodes_avg"], 4)
+        measure("find", lambda: document.find_by_id("missing"), command_stats)
+        self.assertEqual(command_stats.summary("find")["nodes_avg"], 4)
+
+    def test_no_counting_outside_measure(self):
+        """测试不在 measure / timed 中执行时遍历和查找不计数。"""
+        document = HTMLDocument()
+        before = NodeCounter.count
+        list(document.iter_elements())
+        self.assertIs(document.find_by_id("title"), document.title)
+        self.assertEqual(NodeCounter.count, before)
+
+    def test_measure_records_on_exception(self):
+        """测试命令抛出异常（如 exit 的 SystemExit）时仍然记录。"""
+        command_stats = CommandStats()
+
+        def fail():
+            raise SystemExit(0)
+        with self.assertRaises(SystemExit):
+            measure("exit", fail, command_stats)
+        self.assertEqual(command_stats.summary("exit")["count"], 1)
+
+    def test_timed_decorator(self):
+        """测试 timed 装饰器记录到全局统计。"""
+        instrumentation.stats.reset()
+
+        @timed("helper")
+        def helper(value):
+            NodeCounter.count += value
+            return value
+
+        self.assertEqual(helper(3), 3)
+        self.assertEqual(instrumentation.stats.summary("helper")["nodes_avg"], 3)
+        instrumentation.stats.reset()
+
+
+class TestProfiler(unittest.TestCase):
+    def test_dump_pstats(self):
+        """测试开启分析后按命令名写出 pstats 文件。"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            profiler = Profiler()
+            profiler.enable(tmpdir)
+            profiler.run("print-tree", lambda: sum(range(1000)))
+            profiler.run("print-tree", lambda: sum(range(1000)))
+            path = profiler.dump_path("print-tree")
+            self.assertTrue(os.path.exists(path))
+            self.assertEqual(profiler.dump_path("a/b"), os.path.join(tmpdir, "a_b.pstats"))
+            profiler.disable()
+            self.assertFalse(profiler.enabled)
+
+
+if __name__ == '__main__':
+    unittest.main()
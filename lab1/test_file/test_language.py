@@ -0,0 +1,160 @@
+# test_language.py
+import os
+import sys
+import tempfile
+sys.path.append("..")
+
+import unittest
+from io import StringIO
+from unittest.mock import patch
+from compact_dict import compile_dictionary, open_dictionary
+from language import (DictionaryPool, SpellingContext, detect_language, get_spelling_context, normalize_language,
+                      set_spelling_context)
+from model import HTMLDocument, HTMLElement
+from spell_checker import HTMLSpellChecker
+
+
+class TestLanguageDetection(unittest.TestCase):
+    def test_normalize_language(self):
+        """测试 lang 属性规范化。"""
+        self.assertEqual(normalize_language("en-US"), "en")
+        self.assertEqual(normalize_language("DE"), "de")
+        self.assertEqual(normalize_language("es_MX"), "es")
+        self.assertIsNone(normalize_language("xx"))
+        self.assertIsNone(normalize_language(None))
+
+    def test_detect_language(self):
+        """测试基于功能词和特有字母的语言判断。"""
+        self.assertEqual(detect_language("This is the paragraph of the page."), "en")
+        self.assertEqual(detect_language("El perro come la comida en la casa."), "es")
+        self.assertEqual(detect_language("Der Hund ist nicht im Haus und die Katze auch."), "de")
+        self.assertEqual(detect_language("Größe"), "de")
+        # 证据不足时返回默认值
+        self.assertEqual(detect_language("Item 1"), "en")
+        self.assertIsNone(detect_language("Item 1", default=None))
+
+
+class TestDictionaryPool(unittest.TestCase):
+    def test_lazy_loading_and_eviction(self):
+        """测试词典按需加载并淘汰最久未使用的语言。"""
+        loaded = []
+
+        def loader(language):
+            loaded.append(language)
+            return object()
+
+        pool = DictionaryPool(capacity=2, loader=loader)
+        self.assertEqual(loaded, [])
+        english = pool.get("en")
+        pool.get("es")
+        self.assertIs(pool.get("en"), english)
+        pool.get("de")  # es 最久未使用，被淘汰
+        self.assertEqual(pool.loaded_languages(), ["en", "de"])
+        pool.get("es")
+        self.assertEqual(loaded, ["en", "es", "de", "es"])
+
+    def test_pinned_dictionary(self):
+        """测试固定的词典不参与淘汰。"""
+        pinned = object()
+        pool = DictionaryPool(capacity=1, loader=lambda language: object())
+        pool.pin("en", pinned)
+        pool.get("es")
+        pool.get("de")
+        self.assertIs(pool.get("en"), pinned)
+        self.assertEqual(pool.loaded_languages(), ["en", "de"])
+
+    def test_pinned_language_loads_on_first_use(self):
+        """测试只固定语言时在第一次使用才加载，之后不参与淘汰。"""
+        loaded = []
+        pool = DictionaryPool(capacity=1, loader=lambda language: loaded.append(language) or object())
+        pool.pin("en")
+        self.assertEqual((loaded, pool.loaded_languages()), ([], []))
+        english = pool.get("en")
+        pool.get("es")
+        pool.get("de")
+        self.assertIs(pool.get("en"), english)
+        self.assertEqual(loaded, ["en", "es", "de"])
+
+
+class TestMultilingualSpellCheck(unittest.TestCase):
+    def setUp(self):
+        self.document = HTMLDocument()
+        self.spell_checker = HTMLSpellChecker()
+
+    def test_lang_attribute(self):
+        """测试按 lang 属性选择词典。"""
+        section = HTMLElement("div", "section", "", lang="es")
+        section.add_child(HTMLElement("p", "para1", "Hola mundo"))
+        self.document.body.add_child(section)
+        self.document.body.add_child(HTMLElement("p", "para2", "Hello wrld"))
+        errors = self.spell_checker.check_spelling(self.document)
+        self.assertEqual(errors, [("para2", "wrld")])
+        self.assertFalse(section.children[0].has_spelling_error)
+
+    def test_detected_language(self):
+        """测试没有 lang 属性时根据文本判断语言。"""
+        self.document.body.add_child(HTMLElement("p", "para1", "Das ist nicht gut und wir haben heute keine Zeit."))
+        self.document.body.add_child(HTMLElement("p", "para2", "La casa de mi familia es muy bonita y grande."))
+        self.document.body.add_child(HTMLElement("p", "para3", "This is an incorect sentence."))
+        errors = self.spell_checker.check_spelling(self.document)
+        self.assertEqual(errors, [("para3", "incorect")])
+
+    def flagged_by_checker(self):
+        with patch('sys.stdout', new=StringIO()):
+            return {element_id for element_id, _ in self.spell_checker.check_spelling(self.document)}
+
+    def flagged_in_tree(self):
+        return {element.id for element in self.document.root.iter() if element.has_spelling_error}
+
+    def test_tree_marks_match_checker(self):
+        """测试文档树的拼写标记与 spell-check 按同一套设置判断；换用带用户词表的设置后两者仍一致。"""
+        self.assertIs(self.spell_checker.context, get_spelling_context())
+        self.document.root.lang = "es"
+        self.document.body.add_child(HTMLElement("p", "para1", "Hola mundo"))
+        self.document.body.add_child(HTMLElement("p", "para2", "This is the wrld of the page."))
+        self.document.body.add_child(HTMLElement("p", "para3", "Das ist nicht gut und wir haben kein Zeitt."))
+        self.assertEqual(self.flagged_in_tree(), {"para2", "para3"})
+        self.assertEqual(self.flagged_by_checker(), self.flagged_in_tree())
+        with tempfile.TemporaryDirectory() as tmpdir:
+            word_list = os.path.join(tmpdir, "words.txt")
+            with open(word_list, "w", encoding="utf-8") as file:
+                file.write("wrld\n")
+            self.spell_checker = HTMLSpellChecker(user_word_lists=[word_list])
+            previous = get_spelling_context()
+            set_spelling_context(self.spell_checker.context)
+            try:
+                self.document = HTMLDocument()
+                self.document.body.add_child(HTMLElement("p", "para2", "This is the wrld of the page."))
+                self.document.body.add_child(HTMLElement("p", "para4", "This is an incorect sentence."))
+                self.assertEqual(self.flagged_in_tree(), {"para4"})
+                self.assertEqual(self.flagged_by_checker(), self.flagged_in_tree())
+            finally:
+                set_spelling_context(previous)
+
+    def test_suggestions_use_element_language(self):
+        """测试建议取自判断错误时所用语言的词典，各语言的建议索引随词典在池中淘汰。"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            words = {"en": {"house": 10, "the": 50, "is": 40, "this": 30},
+                     "es": {"casa": 10, "la": 50, "es": 40, "de": 30},
+                     "de": {"haus": 10, "das": 50, "ist": 40, "und": 30}}
+            for language, frequencies in words.items():
+                compile_dictionary(frequencies, os.path.join(tmpdir, f"{language}.dict"))
+            pool = DictionaryPool(capacity=1, loader=lambda language: open_dictionary(
+                os.path.join(tmpdir, f"{language}.dict")))
+            self.spell_checker.context = SpellingContext(pool)
+            section = HTMLElement("div", "section", "", lang="es")
+            section.add_child(HTMLElement("p", "para1", "la casx"))
+            self.document.body.add_child(section)
+            self.document.body.add_child(HTMLElement("p", "para2", "this is the housx"))
+            self.document.body.add_child(HTMLElement("p", "para3", "das ist haux"))
+            with patch('spell_checker.SUGGESTION_INDEX_DIR', tmpdir):
+                results = self.spell_checker.suggest_all(self.document)
+            self.assertEqual(results, [("para1", "casx", ["casa"]), ("para2", "housx", ["house"]),
+                                       ("para3", "haux", ["haus"])])
+            self.assertEqual(pool.loaded_languages(), ["en", "de"])
+            self.assertEqual(list(pool.suggestion_indexes), ["en", "de"])
+            self.assertTrue(os.path.exists(os.path.join(tmpdir, "symspell_es.pkl")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+# test_mapped_text.py
+import os
+import pickle
+import sys
+import tempfile
+sys.path.append("..")
+
+import unittest
+from io import StringIO
+from unittest.mock import patch
+from commands import EditTextCommand
+from corpus import CorpusSpec, write_html
+from editor import Editor
+from io_manager import HTMLParser, HTMLWriter
+from model import TextRef
+from session_manager import SessionManager
+from text_index import TextIndex
+
+QUIRKS = ("<html><head><title>T &amp; x — ünïcödé title that is certainly longer than sixty-four bytes</title></head>\r\n"
+          "<body>hello <!-- nöte --> world<div id=\"ä\">x<br>y<span>z</span> w</div>\r\n"
+          "<script>if (a < b && c) x(); // a script body that is long enough to become a reference</script>\n"
+          "<p>  　 Ünïcödé paragraph with plenty of text, so that it is stored as a reference    </p>\n"
+          "<p>entity &eacute; &#8364; in a long paragraph that would otherwise be stored as a reference</p>"
+          "</body></html>")
+
+
+def references(document):
+    return [element for element in document.root.iter() if type(element._text_content) is TextRef]
+
+
+class TestMappedText(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.parser = HTMLParser()
+        self.path = os.path.join(self.tmpdir.name, "page.html")
+        write_html(CorpusSpec(node_count=1000, text_length=20, duplicate_id_rate=0.05), self.path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_matches_parse(self):
+        """测试映射解析与 parse 结果相同；含字符引用和回车、或过短的文本保存为字符串。"""
+        quirks = os.path.join(self.tmpdir.name, "quirks.html")
+        with open(quirks, "w", encoding="utf-8", newline="") as file:
+            file.write(QUIRKS)
+        for path in (self.path, quirks):
+            document = self.parser.parse_mapped(path, chunk_size=101)
+            self.assertEqual(document.content_hash(), self.parser.parse(path).content_hash())
+            self.assertTrue(references(document))
+        paragraphs = document.select("p")
+        self.assertIs(type(paragraphs[0]._text_content), TextRef)
+        self.assertTrue(paragraphs[0].text_content.startswith("Ünïcödé"))
+        self.assertIs(type(paragraphs[1]._text_content), str)
+        self.assertIn("é €", paragraphs[1].text_content)
+
+    def test_edit_switches_to_owned_string(self):
+        """测试修改后文本换成字符串，撤销恢复原文本，索引按解码后的文本更新。"""
+        document = self.parser.parse_mapped(self.path)
+        index = TextIndex()
+        document.add_listener(index)
+        element = references(document)[0]
+        old_text = element.text_content
+        editor = Editor(document)
+        with patch('sys.stdout', new=StringIO()):
+            editor.execute_command(EditTextCommand(document, element.id, "rewritten"))
+        self.assertEqual(element._text_content, "rewritten")
+        self.assertIn(element, index.postings["rewritten"])
+        with patch('sys.stdout', new=StringIO()):
+            editor.undo()
+        self.assertIs(type(element._text_content), str)
+        self.assertEqual(element.text_content, old_text)
+        self.assertNotIn("rewritten", index.postings)
+
+    def test_save_over_mapped_source(self):
+        """测试保存回源文件时替换文件而非原地改写，未修改的引用仍读到原来的文本。"""
+        document = self.parser.parse_mapped(self.path)
+        document.select("p")[0].text_content = "changed"
+        texts = [element.text_content for element in references(document)]
+        with patch('sys.stdout', new=StringIO()):
+            HTMLWriter().write(document, self.path)
+        self.assertEqual([element.text_content for element in references(document)], texts)
+        self.assertEqual(self.parser.parse_mapped(self.path).content_hash(), document.content_hash())
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
+
+    def test_external_rewrite_releases_mapping(self):
+        """测试源文件被其他程序原地改写（并截短）后，发现修改时复制映射内容，之后读取文本和重新加载都不受影响。"""
+        for mode in ("mmap", "skeleton"):
+            session_manager = SessionManager()
+            with patch('sys.stdout', new=StringIO()):
+                session_manager.load(self.path, self.parser, mode)
+            editor = session_manager.get_active_editor()
+            document = editor.document
+            source = document.mapped_source
+            with patch('sys.stdout', new=StringIO()):
+                editor.execute_command(EditTextCommand(document, "title", "local edit"))
+            with open(self.path, "r+b") as file:
+                file.write(b"<html><body><p id=\"short\">rewritten in place</p></body></html>")
+                file.truncate()
+            stat = os.stat(self.path)
+            os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+            with patch('sys.stdout', new=StringIO()) as output:
+                self.assertEqual(session_manager.poll_changes(interval=0), [self.path])
+            self.assertIn("undo history from before the change is unreliable", output.getvalue())
+            self.assertIsNone(document.mapped_source)
+            self.assertIs(type(source.buffer), bytes)
+            self.assertTrue(document.source_rewritten)
+            for element in document.root.iter():  # 访问已超出文件末尾的引用不再出错
+                str(element.text_content)
+            # 不再承诺能撤销找回：改为询问是否整体替换并清空历史
+            with patch('sys.stdout', new=StringIO()) as output, \
+                    patch('builtins.input', return_value='y') as prompt:
+                session_manager.reload(self.path, self.parser)
+            self.assertIn("cannot be recovered", prompt.call_args[0][0])
+            self.assertNotIn("restored with undo", prompt.call_args[0][0])
+            self.assertEqual(document.content_hash(), self.parser.parse(self.path).content_hash())
+            self.assertIs(document.body, document.find_by_id("body"))
+            self.assertEqual((editor.undo_stack, editor.redo_stack), ([], []))
+            self.assertFalse(editor.is_modified)
+            self.assertFalse(document.source_rewritten)
+            write_html(CorpusSpec(node_count=1000, text_length=20, duplicate_id_rate=0.05), self.path)
+
+    def test_external_replace_keeps_loaded_text(self):
+        """测试源文件被替换（新文件改名覆盖）时，复制的是原文件的内容，未修改的文本保持加载时的值。"""
+        session_manager = SessionManager()
+        with patch('sys.stdout', new=StringIO()):
+            session_manager.load(self.path, self.parser, "mmap")
+        document = session_manager.get_active_editor().document
+        texts = [element.text_content for element in references(document)]
+        replacement = os.path.join(self.tmpdir.name, "replacement.html")
+        write_html(CorpusSpec(node_count=10, seed=7), replacement)
+        os.replace(replacement, self.path)
+        self.assertEqual(session_manager.poll_changes(interval=0), [self.path])
+        self.assertEqual([element.text_content for element in references(document)], texts)
+        self.assertFalse(document.source_rewritten)  # 内容完好，重新加载仍按差异合并、可撤销
+
+    def test_pickle_decodes_text(self):
+        document = self.parser.parse_mapped(self.path)
+        copy = pickle.loads(pickle.dumps(document))
+        self.assertEqual(copy.content_hash(), document.content_hash())
+        self.assertEqual(references(copy), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
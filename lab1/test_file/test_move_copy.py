@@ -0,0 +1,120 @@
+# test_move_copy.py
+import sys
+sys.path.append("..")
+
+import unittest
+from io import StringIO
+from unittest.mock import patch
+from cli import parse_destination
+from commands import CopyCommand, MoveCommand
+from corpus import CorpusSpec, build_document
+from editor import Editor
+from instrumentation import NodeCounter
+from model import HTMLDocument, HTMLElement
+
+
+def build():
+    document = HTMLDocument()
+    for section_id in ("s1", "s2"):
+        section = HTMLElement("div", section_id)
+        document.body.add_child(section)
+        for number in range(3):
+            section.add_child(HTMLElement("p", f"{section_id}p{number}", f"text {section_id} {number}"))
+    return document
+
+
+def ids(element):
+    return [child.id for child in element.children]
+
+
+class TestMoveCommand(unittest.TestCase):
+    def setUp(self):
+        self.document = build()
+        self.editor = Editor(self.document)
+
+    def run_command(self, command):
+        with patch('sys.stdout', new=StringIO()) as output:
+            self.editor.execute_command(command)
+        return output.getvalue()
+
+    def test_move_into_and_before_with_single_undo(self):
+        """测试移为子元素、移到兄弟之前，各自一步撤销和重做。"""
+        before = self.document.content_hash()
+        self.run_command(MoveCommand(self.document, "s1", "s2"))
+        self.assertEqual(ids(self.document.body), ["s2"])
+        self.assertEqual(ids(self.document.find_by_id("s2"))[-1], "s1")
+        self.run_command(MoveCommand(self.document, "s2p2", "s2p0", before=True))
+        self.assertEqual(ids(self.document.find_by_id("s2")), ["s2p2", "s2p0", "s2p1", "s1"])
+        with patch('sys.stdout', new=StringIO()):
+            self.editor.undo()
+            self.editor.undo()
+            self.assertEqual(self.document.content_hash(), before)
+            self.editor.redo()
+        self.assertIs(self.document.find_by_id("s1").parent, self.document.find_by_id("s2"))
+
+    def test_invalid_moves(self):
+        """测试移入自身或后代、找不到元素时不做修改。"""
+        before = self.document.content_hash()
+        self.assertIn("Cannot move", self.run_command(MoveCommand(self.document, "s1", "s1p0")))
+        self.assertIn("Cannot move", self.run_command(MoveCommand(self.document, "s1", "s1")))
+        self.assertIn("not found", self.run_command(MoveCommand(self.document, "nope", "s1")))
+        self.assertIn("not found", self.run_command(MoveCommand(self.document, "s1", "html", before=True)))
+        self.assertEqual(self.document.content_hash(), before)
+        self.assertFalse(self.editor.is_modified)
+
+    def test_move_keeps_indexes_and_does_not_walk_subtree(self):
+        """测试移动大子树只重新链接，不遍历子树，索引仍然有效。"""
+        document = build_document(CorpusSpec(node_count=3000))
+        self.assertEqual(document.select("#title")[0].id, "title")
+        section = max(document.body.children[0].children, key=lambda child: len(child.children))
+        target = document.body
+        self.assertGreater(sum(1 for _ in section.iter()), 100)
+        NodeCounter.count = 0
+        target.move_child(section)
+        self.assertEqual(NodeCounter.count, 0)
+        self.assertIs(section.parent, target)
+        self.assertEqual(document.select(f"#{section.children[0].id}"), [section.children[0]])
+        self.assertEqual(document.content_hash(), document.root.subtree_hash().hex())
+
+
+class TestCopyCommand(unittest.TestCase):
+    def setUp(self):
+        self.document = build()
+        self.editor = Editor(self.document)
+
+    def test_copy_gets_fresh_ids_and_single_undo(self):
+        """测试复制的子树获得新 id、与原子树互不影响，撤销后 id 释放，重做沿用同一副本。"""
+        with patch('sys.stdout', new=StringIO()):
+            self.editor.execute_command(CopyCommand(self.document, "s1", "s2", before=True))
+        self.assertEqual(ids(self.document.body), ["s1", "s1-1", "s2"])
+        copy = self.document.find_by_id("s1-1")
+        self.assertEqual(ids(copy), ["s1p0-1", "s1p1-1", "s1p2-1"])
+        self.assertEqual(copy.children[0].text_content, "text s1 0")
+        copy.children[0].text_content = "changed"
+        self.assertEqual(self.document.find_by_id("s1p0").text_content, "text s1 0")
+        self.assertEqual([element.id for element in self.document.select("div#s1-1 > p")], ids(copy))
+        with patch('sys.stdout', new=StringIO()):
+            self.editor.undo()
+            self.assertIsNone(self.document.find_by_id("s1-1"))
+            self.assertFalse(self.document.id_allocator.is_taken("s1p0-1"))
+            self.editor.redo()
+        self.assertIs(self.document.find_by_id("s1-1"), copy)
+
+    def test_copy_into_own_subtree(self):
+        """测试可以把元素复制到它自己的子树中。"""
+        with patch('sys.stdout', new=StringIO()):
+            self.editor.execute_command(CopyCommand(self.document, "s1", "s1p1"))
+        self.assertEqual(ids(self.document.find_by_id("s1p1")), ["s1-1"])
+        self.assertEqual(len(self.document.find_by_id("s1-1").children), 3)
+
+
+class TestParseDestination(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(parse_destination(["a", "b"]), ("a", "b", False))
+        self.assertEqual(parse_destination(["a", "--before", "b"]), ("a", "b", True))
+        self.assertIsNone(parse_destination(["a"]))
+        self.assertIsNone(parse_destination(["a", "--after", "b"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
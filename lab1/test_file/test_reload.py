@@ -0,0 +1,133 @@
+# test_reload.py
+import os
+import sys
+import tempfile
+sys.path.append("..")
+
+import unittest
+from io import StringIO
+from unittest.mock import patch
+from commands import EditIdCommand
+from corpus import CorpusSpec, write_html
+from io_manager import HTMLParser, HTMLWriter
+from model import HTMLElement
+from session_manager import SessionManager
+
+
+def rewrite(path, edit):
+    """模拟其他程序修改文件：解析、修改后写回，并确保修改时间变化。"""
+    with patch('sys.stdout', new=StringIO()):
+        document = HTMLParser().parse(path)
+        edit(document)
+        HTMLWriter().write(document, path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+class TestReload(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "page.html")
+        write_html(CorpusSpec(node_count=500, fan_out=4), self.path)
+        self.session_manager = SessionManager()
+        self.parser = HTMLParser()
+        with patch('sys.stdout', new=StringIO()):
+            self.session_manager.load(self.path, self.parser)
+        self.editor = self.session_manager.get_active_editor()
+        self.document = self.editor.document
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def reload(self, answer='y'):
+        with patch('sys.stdout', new=StringIO()) as output, patch('builtins.input', return_value=answer):
+            self.session_manager.reload(self.path, self.parser)
+        return output.getvalue()
+
+    def test_detects_external_change_once(self):
+        """测试通过 stat 发现外部修改，同一次修改只报告一次，重新加载后不再报告。"""
+        self.assertEqual(self.session_manager.poll_changes(interval=0), [])
+        rewrite(self.path, lambda document: document.body.add_child(HTMLElement("p", "external", "new")))
+        self.assertTrue(self.session_manager.changed_on_disk(self.path))
+        self.assertEqual(self.session_manager.poll_changes(interval=0), [self.path])
+        self.assertEqual(self.session_manager.poll_changes(interval=0), [])
+        self.reload()
+        self.assertFalse(self.session_manager.changed_on_disk(self.path))
+
+    def test_reload_applies_diff_in_place(self):
+        """测试重新加载只修改变化的部分，未变的子树保持原对象，整体作为一条撤销记录。"""
+        first, last = self.document.body.children[0], self.document.body.children[-1]
+        untouched = last.subtree_hash()
+        leaf = next(element for element in first.iter() if not element.children and element.text_content)
+        rewrite(self.path, lambda document: setattr(document.find_by_id(leaf.id), "text_content", "edited elsewhere"))
+        before = self.document.content_hash()
+        history = len(self.editor.undo_stack)
+        self.assertIn("Applied 1 change(s)", self.reload())
+        self.assertEqual(leaf.text_content, "edited elsewhere")
+        self.assertIs(self.document.find_by_id(last.id), last)
+        self.assertEqual(last._hash, untouched)
+        self.assertFalse(self.editor.is_modified)
+        self.assertEqual(len(self.editor.undo_stack), history + 1)
+        self.assertIsNone(self.editor.undo_stack[-1].new_root)  # 执行后不再引用磁盘上的版本
+        with patch('sys.stdout', new=StringIO()):
+            self.editor.undo()
+        self.assertEqual(self.document.content_hash(), before)
+        with patch('sys.stdout', new=StringIO()):
+            self.editor.redo()
+        self.assertEqual(leaf.text_content, "edited elsewhere")
+
+    def test_structural_changes_match_disk(self):
+        """测试增删元素和修改 id 后，合并结果与磁盘上的文件一致。"""
+        def edit(document):
+            target = document.body.children[0].children[0]
+            document.delete_element(target.children[0])
+            target.add_child(HTMLElement("section", "added", "added text"))
+            document.find_by_id("title").text_content = "New title"
+        rewrite(self.path, edit)
+        self.reload()
+        expected = self.parser.parse(self.path)
+        self.assertEqual(self.document.content_hash(), expected.content_hash())
+        self.assertEqual(self.document.select("#added")[0].text_content, "added text")
+
+    def test_conflict_with_unsaved_edits(self):
+        """测试有未保存的修改时询问，拒绝则不修改；保存时询问是否覆盖外部修改。"""
+        element_id = self.document.body.children[0].id
+        with patch('sys.stdout', new=StringIO()):
+            self.editor.execute_command(EditIdCommand(self.document, element_id, "local"))
+        rewrite(self.path, lambda document: setattr(document.find_by_id("title"), "text_content", "external"))
+        self.assertIn("Reload cancelled", self.reload(answer='n'))
+        self.assertIsNotNone(self.document.find_by_id("local"))
+        with patch('sys.stdout', new=StringIO()) as output, patch('builtins.input', return_value='n'):
+            self.assertFalse(self.session_manager.save(self.path, HTMLWriter()))
+        self.assertIn("Save cancelled", output.getvalue())
+        self.reload(answer='y')
+        self.assertIsNone(self.document.find_by_id("local"))
+        self.assertEqual(self.document.find_by_id("title").text_content, "external")
+        with patch('sys.stdout', new=StringIO()):
+            self.editor.undo()  # 撤销重新加载，找回本地修改
+        self.assertIsNotNone(self.document.find_by_id("local"))
+
+    def test_id_swap_falls_back_to_replacing_tree(self):
+        """测试编辑脚本无法回放（两个 id 互换）时整体替换，结果仍与磁盘一致且可撤销。"""
+        a, b = self.document.body.children[:2]
+        a_id, b_id = a.id, b.id
+        def swap(document):
+            document.find_by_id(a_id).id = "swap-tmp"
+            document.find_by_id(b_id).id = a_id
+            document.find_by_id("swap-tmp").id = b_id
+        rewrite(self.path, swap)
+        before = self.document.content_hash()
+        self.reload()
+        self.assertEqual(self.document.content_hash(), self.parser.parse(self.path).content_hash())
+        self.assertIs(self.document.root.get_document(), self.document)
+        self.assertIsNone(self.editor.undo_stack[-1].new_root)
+        with patch('sys.stdout', new=StringIO()):
+            self.editor.undo()
+        self.assertEqual(self.document.content_hash(), before)
+        with patch('sys.stdout', new=StringIO()):
+            self.editor.redo()
+        self.assertIs(self.document.root.get_document(), self.document)
+
+
+if __name__ == '__main__':
+    unittest.main()
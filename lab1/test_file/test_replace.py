@@ -0,0 +1,85 @@
+# test_replace.py
+import sys
+sys.path.append("..")
+
+import unittest
+from io import StringIO
+from unittest.mock import patch
+from cli import parse_replace
+from commands import ReplaceCommand
+from editor import Editor
+from model import HTMLDocument, HTMLElement
+from text_index import TextIndex
+
+
+class TestReplaceCommand(unittest.TestCase):
+    def setUp(self):
+        self.document = HTMLDocument()
+        self.document.title.text_content = "Acme Widget"
+        section = HTMLElement("div", "section")
+        self.document.body.add_child(section)
+        section.add_child(HTMLElement("p", "p1", "Buy the Widget, the best widget"))
+        section.add_child(HTMLElement("p", "p2", "Nothing here"))
+        self.document.body.add_child(HTMLElement("p", "p3", "Widget v2 and Widget v3"))
+        self.editor = Editor(self.document)
+
+    def run_command(self, *args, **kwargs):
+        with patch('sys.stdout', new=StringIO()) as output:
+            self.editor.execute_command(ReplaceCommand(self.document, *args, **kwargs))
+        return output.getvalue()
+
+    def text(self, element_id):
+        return self.document.find_by_id(element_id).text_content
+
+    def test_literal_replace_with_single_undo(self):
+        """测试普通文本替换一次完成，只记录改动的元素，一步撤销与重做。"""
+        before = self.document.content_hash()
+        output = self.run_command("Widget", "Gadget")
+        self.assertIn("Replaced 4 match(es) in 3 element(s)", output)
+        self.assertEqual(self.text("p1"), "Buy the Gadget, the best widget")
+        self.assertEqual(self.text("p3"), "Gadget v2 and Gadget v3")
+        self.assertEqual(self.text("title"), "Acme Gadget")
+        command = self.editor.undo_stack[-1]
+        self.assertEqual(sorted(element.id for element, _ in command.changes), ["p1", "p3", "title"])
+        with patch('sys.stdout', new=StringIO()):
+            self.editor.undo()
+            self.assertEqual(self.document.content_hash(), before)
+            self.editor.redo()
+        self.assertEqual(self.text("p3"), "Gadget v2 and Gadget v3")
+
+    def test_regex_and_scope(self):
+        """测试正则替换（含分组引用）与限定范围。"""
+        self.run_command(r"(?i)widget", "gizmo", regex=True, scope_id="section")
+        self.assertEqual(self.text("p1"), "Buy the gizmo, the best gizmo")
+        self.assertEqual(self.text("p3"), "Widget v2 and Widget v3")
+        self.run_command(r"v(\d)", r"version \1", regex=True)
+        self.assertEqual(self.text("p3"), "Widget version 2 and Widget version 3")
+
+    def test_errors_leave_document_unchanged(self):
+        """测试无效的正则、无效的替换串、空模式和不存在的范围不修改文档。"""
+        before = self.document.content_hash()
+        self.assertIn("Invalid regular expression", self.run_command("(", "x", regex=True))
+        self.assertIn("Invalid replacement", self.run_command("Widget", r"\2", regex=True))
+        self.assertIn("must not be empty", self.run_command("", "x"))
+        self.assertIn("not found", self.run_command("Widget", "x", scope_id="missing"))
+        self.assertEqual(self.document.content_hash(), before)
+
+    def test_text_index_follows(self):
+        """测试替换后全文索引随之更新。"""
+        index = TextIndex()
+        self.document.add_listener(index)
+        self.run_command("Widget", "Gadget")
+        self.assertIn("gadget", index.postings)
+        self.assertEqual(set(index.postings["widget"]), {self.document.find_by_id("p1")})
+
+
+class TestParseReplace(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(parse_replace(["a", "b"]), ("a", "b", False, None))
+        self.assertEqual(parse_replace(["--regex", "a", "b", "--scope", "s"]), ("a", "b", True, "s"))
+        self.assertIsNone(parse_replace(["a"]))
+        self.assertIsNone(parse_replace(["a", "b", "--scope"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
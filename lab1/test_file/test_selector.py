@@ -0,0 +1,96 @@
+# test_selector.py
+import sys
+sys.path.append("..")
+
+import unittest
+from io import StringIO
+from unittest.mock import patch
+from commands import InitCommand
+from corpus import CorpusSpec, build_document
+from instrumentation import NodeCounter
+from model import HTMLDocument, HTMLElement
+from selector import parse_selector
+
+
+def build():
+    document = HTMLDocument()
+    section = HTMLElement("section", "main")
+    document.body.add_child(section)
+    items = HTMLElement("ul", "items")
+    section.add_child(items)
+    for number in range(1, 4):
+        items.add_child(HTMLElement("li", f"item{number}", f"Item {number}"))
+    note = HTMLElement("div", "note")
+    section.add_child(note)
+    note.add_child(HTMLElement("p", "first", "hello world"))
+    document.body.add_child(HTMLElement("p", "outside", "hello again"))
+    return document
+
+
+def ids(elements):
+    return [element.id for element in elements]
+
+
+class TestParseSelector(unittest.TestCase):
+    def test_parse(self):
+        """测试选择器解析为复合选择器与组合符。"""
+        selector, = parse_selector('section > div p#first:contains("hello world")')
+        self.assertEqual([compound.tag for compound in selector.compounds], ["section", "div", "p"])
+        self.assertEqual(selector.combinators, (">", " "))
+        self.assertEqual(selector.compounds[-1].id, "first")
+        self.assertEqual(selector.compounds[-1].contains, ("hello world",))
+        self.assertEqual(len(parse_selector("li, p")), 2)
+
+    def test_invalid(self):
+        """测试无效的选择器抛出 ValueError。"""
+        for text in ("", "p >", "#", "p:hover", "#a p q,"):
+            with self.assertRaises(ValueError):
+                parse_selector(text)
+
+
+class TestSelect(unittest.TestCase):
+    def test_tag_id_and_combinators(self):
+        """测试标签、id、后代和子元素组合。"""
+        document = build()
+        self.assertEqual(ids(document.select("li")), ["item1", "item2", "item3"])
+        self.assertEqual(ids(document.select("#item2")), ["item2"])
+        self.assertEqual(ids(document.select("section p")), ["first"])
+        self.assertEqual(ids(document.select("section > p")), [])
+        self.assertEqual(ids(document.select("body > p")), ["outside"])
+        self.assertEqual(ids(document.select("section ul > li#item3")), ["item3"])
+
+    def test_contains_and_lists(self):
+        """测试 :contains() 与逗号分隔的选择器，结果按文档顺序排列。"""
+        document = build()
+        self.assertEqual(ids(document.select("*:contains(hello)")), ["first", "outside"])
+        self.assertEqual(ids(document.select("p:contains(again), li:contains(1)")), ["item1", "outside"])
+
+    def test_index_follows_mutations(self):
+        """测试增删元素、修改 id 和整体替换根元素后索引保持正确。"""
+        document = build()
+        self.assertEqual(len(document.select("li")), 3)
+        document.find_by_id("items").add_child(HTMLElement("li", "item4"))
+        self.assertEqual(ids(document.select("ul > li"))[-1], "item4")
+        document.find_by_id("item4").id = "last"
+        self.assertEqual(ids(document.select("#last")), ["last"])
+        self.assertEqual(document.select("#item4"), [])
+        document.delete_element(document.find_by_id("items"))
+        self.assertEqual(document.select("li"), [])
+        with patch('sys.stdout', new=StringIO()):
+            InitCommand(document).execute()
+        self.assertEqual(document.select("p"), [])
+        self.assertEqual(ids(document.select("head > title")), ["title"])
+
+    def test_selective_query_does_not_scan(self):
+        """测试建立索引后，按 id 或少见标签查询不遍历整个文档。"""
+        document = build_document(CorpusSpec(node_count=2000))
+        document.body.children[0].add_child(HTMLElement("article", "rare"))
+        document.select("article")  # 第一次查询建立索引
+        before = NodeCounter.count
+        self.assertEqual(ids(document.select("article")), ["rare"])
+        self.assertEqual(ids(document.select("#rare")), ["rare"])
+        self.assertEqual(NodeCounter.count, before)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+# test_skeleton.py
+import os
+import sys
+import tempfile
+sys.path.append("..")
+
+import unittest
+from io import StringIO
+from unittest.mock import patch
+from commands import EditIdCommand, EditTextCommand
+from corpus import CorpusSpec, write_html
+from display import TreeDisplayStrategy
+from io_manager import HTMLParser, SkeletonElement
+from session_manager import SessionManager
+
+QUIRKS = """<html lang="en"><head><title>T &amp; x</title></head>
+<body>hello <!-- note --> world<div id="a">x<br>y<span>z <b>deep<i>er</i></b></span> w</div>
+<p id="a">one<p>two</b> three</div><ul><li>a<li>b</ul><div/>tail
+<section><div/><div>x<script>if (a < b && "</div>") x();</script></div></section>
+<section><article id="a">dup</article><article><p>unclosed<p>again</article><p>after</section>
+<div><div><div>never closed"""
+
+
+def signature(document):
+    return [(element.tag_name, element.id, element.text_content, element.lang, element.has_spelling_error)
+            for element in document.root.iter()]
+
+
+def lazy_elements(document):
+    """未展开的元素（遍历时不进入它们，以免触发展开）。"""
+    found, stack = [], [document.root]
+    while stack:
+        element = stack.pop()
+        if element._region is not None:
+            found.append(element)
+        else:
+            stack.extend(element.children)
+    return found
+
+
+def section_ids(parser, path):
+    """磁盘上文件第一段内部元素的 id。"""
+    return [element.id for element in parser.parse(path).find_by_id("s0").children]
+
+
+class TestSkeletonParse(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.parser = HTMLParser()
+        self.path = os.path.join(self.tmpdir.name, "big.html")
+        write_html(CorpusSpec(node_count=2000, fan_out=8, duplicate_id_rate=0.05, misspelling_rate=0.1), self.path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_expands_to_same_tree(self):
+        """测试各种骨架层数下，完全展开后的结构、文本、id 和拼写标记都与 parse 相同。"""
+        quirks = os.path.join(self.tmpdir.name, "quirks.html")
+        with open(quirks, "w", encoding="utf-8") as file:
+            file.write(QUIRKS)
+        for path in (self.path, quirks):
+            expected = self.parser.parse(path)
+            for depth in (1, 2, 3):
+                document = self.parser.parse_skeleton(path, outline_depth=depth)
+                self.assertEqual(document.id_allocator.taken, expected.id_allocator.taken)
+                self.assertEqual(signature(document), signature(expected))
+
+    def test_outline_only_until_reached(self):
+        """测试加载只建立上层结构；查找上层 id 不展开，查找深处的 id 只展开所在的子树。"""
+        document = self.parser.parse_skeleton(self.path)
+        sections = [child for top in document.body.children for child in top.children]
+        self.assertTrue(sections and all(isinstance(section, SkeletonElement) for section in sections))
+        self.assertIs(document.find_by_id(sections[-1].id), sections[-1])
+        self.assertTrue(all(section._region is not None for section in sections))
+        target = sections[0]
+        deep_id = target._region.ids[-1]
+        element = document.find_by_id(deep_id)
+        self.assertEqual(element.id, deep_id)
+        self.assertIsNone(target._region)
+        self.assertTrue(all(section._region is not None for section in sections[1:]))
+        self.assertIsNone(document.find_by_id("no-such-id"))
+
+    def test_session_load_keeps_skeleton(self):
+        """测试以骨架方式加载后未修改；展开不算修改，展开后编辑再撤销也恢复为未修改。"""
+        session_manager = SessionManager()
+        with patch('sys.stdout', new=StringIO()):
+            session_manager.load(self.path, self.parser, "skeleton")
+        editor = session_manager.get_active_editor()
+        document = editor.document
+        pending = len(lazy_elements(document))
+        self.assertGreater(pending, 0)
+        self.assertFalse(editor.is_modified)
+        section = lazy_elements(document)[0]
+        leaf_id = section._region.ids[0]
+        with patch('sys.stdout', new=StringIO()):
+            editor.execute_command(EditTextCommand(document, leaf_id, "changed"))
+            self.assertTrue(editor.is_modified)
+            editor.undo()
+            self.assertFalse(editor.is_modified)
+            editor.execute_command(EditIdCommand(document, section.id, "renamed"))
+            self.assertTrue(editor.is_modified)
+            editor.undo()
+        self.assertFalse(editor.is_modified)
+        self.assertEqual(len(lazy_elements(document)), pending - 1)
+        self.assertTrue(session_manager.search("the"))  # 建立检索索引时展开其余的子树
+        self.assertEqual(lazy_elements(document), [])
+        self.assertFalse(editor.is_modified)
+
+    def test_rewritten_in_place(self):
+        """测试源文件被原地改写（每段多了标签）后，展开不解析改写后的字节、不崩溃；重新加载得到磁盘上的版本。"""
+        def write(extra):
+            with open(self.path, "w", encoding="utf-8") as file:
+                file.write("<html><body><div id=\"top\">" + "".join(
+                    f"<section id=\"s{number}\"><p>text {number}{extra}</p></section>" for number in range(5))
+                           + "</div></body></html>")
+            stat = os.stat(self.path)
+            os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        for poll_first in (True, False):
+            write("")
+            session_manager = SessionManager()
+            with patch('sys.stdout', new=StringIO()):
+                session_manager.load(self.path, self.parser, "skeleton")
+            editor = session_manager.get_active_editor()
+            document = editor.document
+            self.assertEqual(len(lazy_elements(document)), 5)
+            write("<b>bold</b>")
+            with patch('sys.stdout', new=StringIO()) as output:
+                if poll_first:
+                    self.assertEqual(session_manager.poll_changes(interval=0), [self.path])
+                document.set_display_strategy(TreeDisplayStrategy())
+                document.display()  # 展开全部子树（print-tree）
+            self.assertIn("could not be read", output.getvalue())
+            section = document.find_by_id("s0")
+            self.assertTrue(section.source_lost)
+            self.assertEqual(section.children, [])
+            self.assertFalse(document.id_allocator.is_taken(section_ids(self.parser, self.path)[0]))
+            with patch('sys.stdout', new=StringIO()), patch('builtins.input', return_value='y'):
+                self.assertTrue(session_manager.reload(self.path, self.parser))
+            self.assertEqual(signature(document), signature(self.parser.parse(self.path)))
+            self.assertEqual(editor.undo_stack, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+# test_stream_parse.py
+import os
+import sys
+import tempfile
+sys.path.append("..")
+
+import unittest
+from io import StringIO
+from unittest.mock import patch
+from corpus import CorpusSpec, write_html
+from io_manager import HTMLParser, StreamTreeBuilder
+from model import DocumentListener, HTMLDocument
+from session_manager import SessionManager
+
+QUIRKS = """<html lang="en"><head><title>T &amp; x</title><meta charset="utf-8"></head>
+<body lang="fr">hello <!-- note --> world<div id="a">x<br>y<span>z</span> w<img src=q> v</div>
+<p id="a">one<p>two</b> three</div><ul><li>a<li>b</ul><div/>tail<script>if (a<b) x();</script></body></html>"""
+
+
+class AttachRecorder(DocumentListener):
+    def __init__(self):
+        self.attached = []
+
+    def on_attach(self, element):
+        self.attached.append(element.id)
+
+
+class TestParseStream(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.parser = HTMLParser()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        return path
+
+    def assert_same_as_parse(self, path, chunk_size):
+        expected = self.parser.parse(path)
+        document = self.parser.parse_stream(path, chunk_size=chunk_size)
+        self.assertEqual(document.content_hash(), expected.content_hash())
+        self.assertEqual(document.id_allocator.taken, expected.id_allocator.taken)
+        return document
+
+    def test_matches_parse(self):
+        """测试任意分块大小下流式解析与整体解析结果相同（含重复 id、注释、空元素和未闭合的标签）。"""
+        path = os.path.join(self.tmpdir.name, "big.html")
+        write_html(CorpusSpec(node_count=3000, duplicate_id_rate=0.05, misspelling_rate=0.1), path)
+        document = self.assert_same_as_parse(path, chunk_size=97)
+        self.assertTrue(any(element.has_spelling_error for element in document.root.iter()))
+        quirks = self.assert_same_as_parse(self.write("quirks.html", QUIRKS), chunk_size=5)
+        self.assertEqual(quirks.find_by_id("a").text_content, "xywv")
+        self.assertEqual(quirks.find_by_id("title").text_content, "T & x")
+        self.assertEqual([child.tag_name for child in quirks.body.children][:3], ["text", "text", "text"])
+
+    def test_elements_attach_as_they_close(self):
+        """测试顶层元素在其结束标签处就加入文档，不必等到输入结束。"""
+        document = HTMLDocument()
+        recorder = AttachRecorder()
+        document.add_listener(recorder)
+        builder = StreamTreeBuilder(document)
+        builder.feed("<body><div id='one'><p>x</p>")
+        self.assertEqual(recorder.attached, [])
+        builder.feed("</div><div id='two'>")
+        self.assertEqual(recorder.attached, ["one"])
+        self.assertEqual(document.find_by_id("one").children[0].text_content, "x")
+        builder.close()  # 输入结束时关闭未闭合的元素
+        self.assertEqual(recorder.attached, ["one", "two"])
+
+    def test_stdin_and_missing_file(self):
+        """测试 "-" 从标准输入读取，文件不存在时返回 None。"""
+        with patch('sys.stdin', new=StringIO("<html><body><p id='piped'>from a pipe</p></body></html>")):
+            document = self.parser.parse_stream("-")
+        self.assertEqual(document.find_by_id("piped").text_content, "from a pipe")
+        with patch('sys.stdout', new=StringIO()) as output:
+            self.assertIsNone(self.parser.parse_stream(os.path.join(self.tmpdir.name, "missing.html")))
+        self.assertIn("does not exist", output.getvalue())
+
+    def test_session_load_stream(self):
+        session_manager = SessionManager()
+        path = self.write("page.html", "<html><body><p id='p'>text</p></body></html>")
+        with patch('sys.stdout', new=StringIO()):
+            session_manager.load(path, self.parser, "stream")
+        self.assertEqual(session_manager.get_active_editor().document.find_by_id("p").text_content, "text")
+
+
+if __name__ == '__main__':
+    unittest.main()
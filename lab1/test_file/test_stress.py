@@ -0,0 +1,47 @@
+# test_stress.py
+import sys
+sys.path.append("..")
+
+import unittest
+from benchmarks.stress_commands import InvariantError, StressRunner, check_structure, snapshot
+from model import HTMLDocument, HTMLElement
+
+
+class TestStress(unittest.TestCase):
+    def test_random_commands_keep_invariants(self):
+        """测试随机命令序列在频繁检查下保持所有不变量。"""
+        lines = []
+        runner = StressRunner(seed=1, nodes=200, check_every=10, report_every=1000, report=lines.append)
+        windows = runner.run(3000)
+        self.assertEqual(len(windows), 3)
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(sum(runner.counts.values()), 3000)
+        check_structure(runner.document)
+
+    def test_same_seed_same_session(self):
+        """测试相同种子产生相同的操作序列和最终文档。"""
+        first = StressRunner(seed=5, nodes=50, check_every=0, report=lambda line: None)
+        second = StressRunner(seed=5, nodes=50, check_every=0, report=lambda line: None)
+        first.run(500)
+        second.run(500)
+        self.assertEqual(snapshot(first.document), snapshot(second.document))
+
+    def test_detects_broken_parent_pointer(self):
+        """测试检查能发现错误的父指针。"""
+        document = HTMLDocument()
+        document.body.add_child(HTMLElement("p", "p1"))
+        check_structure(document)
+        document.body.children[0].parent = document.head
+        with self.assertRaises(InvariantError):
+            check_structure(document)
+
+    def test_detects_allocator_drift(self):
+        """测试检查能发现 id 分配器与树不一致。"""
+        document = HTMLDocument()
+        document.id_allocator.acquire("ghost")
+        with self.assertRaises(InvariantError):
+            check_structure(document)
+
+
+if __name__ == '__main__':
+    unittest.main()
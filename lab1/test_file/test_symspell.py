@@ -0,0 +1,74 @@
+# test_symspell.py
+import os
+import sys
+import tempfile
+sys.path.append("..")
+
+import unittest
+from symspell import SymSpellIndex, osa_distance
+
+
+class TestSymSpellIndex(unittest.TestCase):
+    def setUp(self):
+        self.word_frequency = {
+            "paragraph": 500,
+            "paragraphs": 120,
+            "sentence": 800,
+            "misspelled": 90,
+            "dispelled": 40,
+            "hello": 1000,
+            "help": 900,
+            "world": 700,
+        }
+        self.index = SymSpellIndex.build(self.word_frequency)
+
+    def test_osa_distance(self):
+        """测试编辑距离（含相邻换位）。"""
+        self.assertEqual(osa_distance("hello", "hello", 2), 0)
+        self.assertEqual(osa_distance("helo", "hello", 2), 1)
+        self.assertEqual(osa_distance("hlelo", "hello", 2), 1)
+        self.assertEqual(osa_distance("wrld", "world", 2), 1)
+        self.assertEqual(osa_distance("abc", "xyzabc", 2), 3)
+
+    def test_lookup_ranked(self):
+        """测试候选词按距离、词频排序。"""
+        self.assertEqual(self.index.suggest("paragrap")[0], "paragraph")
+        self.assertEqual(self.index.suggest("mispeled")[0], "misspelled")
+        self.assertEqual(self.index.suggest("sentense"), ["sentence"])
+        # 距离相同时词频高者优先
+        self.assertEqual(self.index.suggest("helo")[:2], ["hello", "help"])
+
+    def test_known_word_first(self):
+        """测试正确单词自身排在首位。"""
+        self.assertEqual(self.index.suggest("World")[0], "world")
+
+    def test_no_candidates(self):
+        """测试没有候选词的情况。"""
+        self.assertEqual(self.index.suggest("xyzzyq"), [])
+
+    def test_save_and_load(self):
+        """测试索引的持久化。"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "index.pkl")
+            self.index.save(path)
+            loaded = SymSpellIndex.load(path)
+            self.assertIsNotNone(loaded)
+            self.assertEqual(loaded.suggest("paragrap"), self.index.suggest("paragrap"))
+            # 词典内容一致时直接复用，不重新构建
+            reused = SymSpellIndex.load_or_build(path, self.word_frequency)
+            self.assertEqual(reused.words, self.index.words)
+            # 词数相同但内容不同的词典不能复用旧索引
+            changed = dict(self.word_frequency, world=1)
+            del changed["help"]
+            changed["hellp"] = 5
+            rebuilt = SymSpellIndex.load_or_build(path, changed)
+            self.assertIn("hellp", rebuilt.words)
+            self.assertEqual(SymSpellIndex.load(path).words, rebuilt.words)
+
+    def test_load_missing_file(self):
+        """测试读取不存在的索引文件。"""
+        self.assertIsNone(SymSpellIndex.load("does/not/exist.pkl"))
+
+
+if __name__ == "__main__":
+    unittest.main()
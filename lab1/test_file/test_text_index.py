@@ -0,0 +1,90 @@
+# test_text_index.py
+import os
+import sys
+import tempfile
+sys.path.append("..")
+
+import unittest
+from io import StringIO
+from unittest.mock import patch
+from commands import AppendCommand, DeleteCommand, EditTextCommand, InitCommand
+from corpus import CorpusSpec, write_html
+from editor import Editor
+from io_manager import HTMLParser, HTMLWriter
+from model import HTMLDocument, HTMLElement
+from session_manager import SessionManager
+from text_index import TextIndex, make_snippet, search_indexes
+
+
+class TestTextIndex(unittest.TestCase):
+    def setUp(self):
+        self.document = HTMLDocument()
+        self.document.body.add_child(HTMLElement("p", "p1", "The quick brown fox"))
+        self.document.body.add_child(HTMLElement("p", "p2", "A lazy brown dog, brown as mud"))
+        self.index = TextIndex()
+        self.document.add_listener(self.index)
+        self.editor = Editor(self.document)
+
+    def search(self, query):
+        return [(element_id, round(score, 6)) for _, element_id, _, score in
+                search_indexes({"doc": self.index}, query)]
+
+    def test_all_terms_required_and_ranked(self):
+        """测试多个检索词需同时出现，词频高的排在前面。"""
+        self.assertEqual([hit[0] for hit in self.search("brown")], ["p2", "p1"])
+        self.assertEqual([hit[0] for hit in self.search("BROWN fox")], ["p1"])
+        self.assertEqual(self.search("brown cat"), [])
+
+    def test_updates_with_commands_and_undo(self):
+        """测试编辑文本、插入、删除及其撤销都会更新索引。"""
+        with patch('sys.stdout', new=StringIO()):
+            self.editor.execute_command(EditTextCommand(self.document, "p1", "The slow red fox"))
+            self.assertEqual(self.search("quick"), [])
+            self.assertEqual([hit[0] for hit in self.search("red")], ["p1"])
+            self.editor.undo()
+            self.assertEqual([hit[0] for hit in self.search("quick")], ["p1"])
+
+            self.editor.execute_command(AppendCommand(self.document, HTMLElement("span", "s1", "quick note"), "p2"))
+            self.assertEqual(sorted(hit[0] for hit in self.search("quick")), ["p1", "s1"])
+            self.editor.execute_command(DeleteCommand(self.document, "p2"))
+            self.assertEqual([hit[0] for hit in self.search("quick")], ["p1"])
+            self.assertEqual(self.search("dog"), [])
+            self.editor.undo()
+            self.assertEqual([hit[0] for hit in self.search("dog")], ["p2"])
+
+            self.editor.execute_command(InitCommand(self.document))
+            self.assertEqual(self.search("brown"), [])
+            self.assertEqual(self.index.element_count, 0)
+
+    def test_snippet(self):
+        """测试长文本的摘要截取检索词附近的内容。"""
+        text = "lorem " * 30 + "needle" + " ipsum" * 30
+        snippet = make_snippet(text, ["needle"], width=40)
+        self.assertIn("needle", snippet)
+        self.assertTrue(snippet.startswith("...") and snippet.endswith("..."))
+
+
+class TestSessionSearch(unittest.TestCase):
+    def test_search_across_open_files(self):
+        """测试在多个打开的文件中检索，关闭文件后不再出现在结果中。"""
+        session_manager = SessionManager()
+        with tempfile.TemporaryDirectory() as tmpdir, patch('sys.stdout', new=StringIO()):
+            for number in range(30):
+                path = os.path.join(tmpdir, f"doc{number}.html")
+                write_html(CorpusSpec(node_count=50, seed=number), path)
+                session_manager.load(path, HTMLParser())
+            marked = os.path.join(tmpdir, "doc7.html")
+            session_manager.switch_editor(marked)
+            document = session_manager.get_active_editor().document
+            document.body.add_child(HTMLElement("p", "needle", "a unique zyzzyva here"))
+            hits = session_manager.search("zyzzyva")
+            self.assertEqual([(hit[0], hit[1]) for hit in hits], [(marked, "needle")])
+            self.assertLessEqual(len(session_manager.search("the", limit=5)), 5)
+            with patch('builtins.input', return_value='n'):
+                session_manager.close(HTMLWriter())
+            self.assertEqual(session_manager.search("zyzzyva"), [])
+            self.assertNotIn(marked, session_manager.text_indexes)
+
+
+if __name__ == '__main__':
+    unittest.main()
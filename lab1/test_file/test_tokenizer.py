@@ -0,0 +1,45 @@
+# test_tokenizer.py
+import sys
+sys.path.append("..")
+
+import unittest
+from tokenizer import CJK, NUMBER, URL, WORD, tokenize, words
+
+
+class TestTokenizer(unittest.TestCase):
+    def test_words_and_offsets(self):
+        """测试单词切分与位置。"""
+        text = "Hello, (Wrld)!"
+        tokens = tokenize(text)
+        self.assertEqual([t.text for t in tokens], ["Hello", "Wrld"])
+        for token in tokens:
+            self.assertEqual(text[token.start:token.end], token.text)
+
+    def test_numbers_and_urls(self):
+        """测试数字、日期、网址与邮箱不作为单词。"""
+        tokens = tokenize("Updated 2024-01-01 at https://example.org/a?b=1, mail me@example.com or MyWebpage.com")
+        kinds = {t.text: t.kind for t in tokens}
+        self.assertEqual(kinds["2024-01-01"], NUMBER)
+        self.assertEqual(kinds["https://example.org/a?b=1"], URL)
+        self.assertEqual(kinds["me@example.com"], URL)
+        self.assertEqual(kinds["MyWebpage.com"], URL)
+        self.assertEqual(words("Updated 2024-01-01 at MyWebpage.com"), ["Updated", "at"])
+
+    def test_cjk_and_mixed_scripts(self):
+        """测试中日韩文字与混合文字。"""
+        tokens = tokenize("中文abc混合 Größe")
+        self.assertEqual([(t.text, t.kind) for t in tokens],
+                         [("中文", CJK), ("abc", WORD), ("混合", CJK), ("Größe", WORD)])
+
+    def test_hyphenation_and_apostrophes(self):
+        """测试连字符复合词、撇号和软连字符。"""
+        self.assertEqual(words("well-known don't hyphen\u00adation"), ["well", "known", "don't", "hyphenation"])
+
+    def test_tokens_are_interned(self):
+        """测试相同的词返回同一个字符串对象。"""
+        first, second = words("paragraph " + "para" + "graph")
+        self.assertIs(first, second)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+# test_tracing.py
+import json
+import os
+import sys
+import tempfile
+sys.path.append("..")
+
+import unittest
+from io_manager import HTMLParser, HTMLWriter
+from tracing import Tracer, traced, tracer
+
+
+class TestTracer(unittest.TestCase):
+    def test_disabled_span_is_shared(self):
+        """测试关闭时 span 返回共享的空上下文且不记录事件。"""
+        local_tracer = Tracer()
+        self.assertIs(local_tracer.span("a"), local_tracer.span("b"))
+        with local_tracer.span("a"):
+            pass
+        self.assertEqual(local_tracer.events, [])
+
+    def test_nested_spans_written_as_trace_events(self):
+        """测试嵌套 span 导出为 trace-event JSON。"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "trace.json")
+            local_tracer = Tracer()
+            local_tracer.enable(path)
+            with local_tracer.span("outer", file="x.html"):
+                with local_tracer.span("inner"):
+                    pass
+            self.assertEqual(local_tracer.disable(), path)
+            with open(path, encoding='utf-8') as file:
+                events = json.load(file)["traceEvents"]
+            inner, outer = events
+            self.assertEqual((inner["name"], outer["name"]), ("inner", "outer"))
+            self.assertEqual(outer["ph"], "X")
+            self.assertEqual(outer["args"], {"file": "x.html"})
+            self.assertLessEqual(outer["ts"], inner["ts"])
+            self.assertGreaterEqual(outer["ts"] + outer["dur"], inner["ts"] + inner["dur"])
+
+    def test_max_events(self):
+        """测试超出上限的事件被丢弃并计数。"""
+        local_tracer = Tracer(max_events=2)
+        local_tracer.enable(os.devnull)
+        for _ in range(5):
+            with local_tracer.span("a"):
+                pass
+        self.assertEqual(len(local_tracer.events), 2)
+        self.assertEqual(local_tracer.dropped, 3)
+        local_tracer.enabled = False
+
+    def test_parse_and_write_spans(self):
+        """测试解析和写文件的内部阶段都留下 span。"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            source = os.path.join(tmpdir, "in.html")
+            with open(source, 'w', encoding='utf-8') as file:
+                file.write("<html><body><div id='d'><p>hello world</p></div></body></html>")
+            tracer.enable(os.path.join(tmpdir, "trace.json"))
+            try:
+                document = HTMLParser().parse(source)
+                HTMLWriter().write(document, os.path.join(tmpdir, "out.html"))
+                names = {event["name"] for event in tracer.events}
+            finally:
+                tracer.disable()
+            for name in ("HTMLParser.parse", "read_file", "BeautifulSoup", "parse_element",
+                         "check_spelling", "HTMLWriter.write", "render.indent", "write_file"):
+                self.assertIn(name, names)
+
+    def test_traced_decorator_disabled(self):
+        """测试关闭时装饰器直接调用原函数。"""
+        @traced("double")
+        def double(value):
+            return value * 2
+        self.assertEqual(double(4), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
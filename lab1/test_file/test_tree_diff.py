@@ -0,0 +1,127 @@
+# test_tree_diff.py
+import sys
+sys.path.append("..")
+
+import unittest
+from io import StringIO
+from unittest.mock import patch
+from benchmarks.stress_commands import StressRunner
+from commands import AppendCommand, DeleteCommand, EditIdCommand, EditTextCommand, InsertCommand
+from corpus import CorpusSpec, build_document
+from model import HTMLDocument, HTMLElement
+from tree_diff import diff_documents, format_edit_script
+
+
+def apply_ops(document: HTMLDocument, ops):
+    """
+    用编辑命令回放编辑脚本。
+    """
+    with patch('sys.stdout', new=StringIO()):
+        for name, *args in ops:
+            if name == "delete":
+                DeleteCommand(document, args[0]).execute()
+            elif name == "edit-id":
+                EditIdCommand(document, args[0], args[1]).execute()
+            elif name == "edit-text":
+                EditTextCommand(document, args[0], args[1]).execute()
+            elif name == "edit-lang":
+                document.find_by_id(args[0]).lang = args[1] or None
+            elif name == "insert":
+                tag, element_id, before_id, text = args
+                InsertCommand(document, HTMLElement(tag, element_id, text), before_id).execute()
+            else:
+                tag, element_id, parent_id, text = args
+                AppendCommand(document, HTMLElement(tag, element_id, text), parent_id).execute()
+
+
+class TestSubtreeHash(unittest.TestCase):
+    def test_invalidated_along_ancestors(self):
+        """测试修改只使自身和祖先的缓存失效，兄弟子树的缓存保留。"""
+        document = HTMLDocument()
+        left, right = HTMLElement("div", "left"), HTMLElement("div", "right")
+        document.body.add_child(left)
+        document.body.add_child(right)
+        leaf = HTMLElement("p", "leaf", "text")
+        left.add_child(leaf)
+        before = document.root.subtree_hash()
+        right_hash = right.subtree_hash()
+        leaf.text_content = "changed"
+        self.assertIsNone(leaf._hash)
+        self.assertIsNone(left._hash)
+        self.assertIsNone(document.root._hash)
+        self.assertEqual(right._hash, right_hash)
+        self.assertNotEqual(document.root.subtree_hash(), before)
+        leaf.text_content = "text"
+        self.assertEqual(document.root.subtree_hash(), before)
+
+    def test_id_lang_and_children_change_hash(self):
+        """测试 id、lang 和子元素的变化都会改变哈希。"""
+        element = HTMLElement("div", "a")
+        hashes = {element.subtree_hash()}
+        element.id = "b"
+        hashes.add(element.subtree_hash())
+        element.lang = "de"
+        hashes.add(element.subtree_hash())
+        child = HTMLElement("p", "c")
+        element.add_child(child)
+        hashes.add(element.subtree_hash())
+        element.remove_child(child)
+        self.assertEqual(len(hashes), 4)
+        self.assertIn(element.subtree_hash(), hashes)
+
+
+class TestTreeDiff(unittest.TestCase):
+    def test_identical_documents(self):
+        """测试相同的文档没有差异。"""
+        spec = CorpusSpec(node_count=300)
+        self.assertEqual(diff_documents(build_document(spec), build_document(spec)), [])
+
+    def test_single_leaf_change(self):
+        """测试只改一个叶子时脚本只有一步，且不访问无关子树。"""
+        spec = CorpusSpec(node_count=2000)
+        old, new = build_document(spec), build_document(spec)
+        old.content_hash()
+        new.content_hash()
+        leaf = [element for element in new.iter_elements() if not element.children][100]
+        leaf.text_content = "changed"
+        self.assertEqual(diff_documents(old, new), [("edit-text", leaf.id, "changed")])
+
+    def test_insert_delete_and_rename(self):
+        """测试插入、删除和改 id 的脚本及其命令行格式。"""
+        old = HTMLDocument()
+        for element_id in ("a", "b", "c"):
+            old.body.add_child(HTMLElement("p", element_id, element_id))
+        new = HTMLDocument()
+        new.body.add_child(HTMLElement("p", "a", "a"))
+        new.body.add_child(HTMLElement("p", "x", "b"))
+        new.body.add_child(HTMLElement("div", "d", "hello world"))
+        ops = diff_documents(old, new)
+        self.assertEqual(ops, [("delete", "c"), ("edit-id", "b", "x"), ("append", "div", "d", "body", "hello world")])
+        self.assertEqual(format_edit_script(ops), "delete c\nedit-id b x\nappend div d body 'hello world'")
+
+    def test_reorder(self):
+        """测试调换顺序的兄弟通过删除加插入表示。"""
+        old, new = HTMLDocument(), HTMLDocument()
+        for element_id in ("a", "b", "c"):
+            old.body.add_child(HTMLElement("p", element_id))
+        for element_id in ("c", "a", "b"):
+            new.body.add_child(HTMLElement("p", element_id))
+        ops = diff_documents(old, new)
+        self.assertEqual(ops, [("delete", "c"), ("insert", "p", "c", "a", "")])
+
+    def test_script_replays_random_edits(self):
+        """测试随机编辑后，回放脚本能把旧文档变为新文档。"""
+        for seed in range(5):
+            spec = CorpusSpec(node_count=300, seed=seed)
+            old = build_document(spec)
+            runner = StressRunner(seed=seed, nodes=300, check_every=0, report=lambda line: None)
+            runner.editor.document = build_document(spec)
+            runner.refresh_candidates()
+            runner.run(200)
+            new = runner.document
+            apply_ops(old, diff_documents(old, new))
+            self.assertEqual(old.content_hash(), new.content_hash(), f"seed {seed}")
+
+
+if __name__ == '__main__':
+    unittest.main()
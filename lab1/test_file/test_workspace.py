@@ -0,0 +1,123 @@
+# test_workspace.py
+import os
+import pickle
+import sys
+import tempfile
+sys.path.append("..")
+
+import unittest
+from io import StringIO
+from unittest.mock import patch
+from corpus import CorpusSpec, build_document, write_html
+from display import TreeDisplayStrategy
+from io_manager import HTMLParser
+from model import HTMLElement
+from session_manager import SessionManager
+from workspace import Workspace, scan_directory
+
+
+def make_site(root):
+    """site/a/p{0..5}.html、site/a/b/deep.html，以及应被忽略或不匹配的文件。"""
+    for relative in ("a/b", "node_modules/pkg", ".git", "c"):
+        os.makedirs(os.path.join(root, relative))
+    for number in range(6):
+        write_html(CorpusSpec(node_count=50, seed=number), os.path.join(root, "a", f"p{number}.html"))
+    write_html(CorpusSpec(node_count=50, seed=9), os.path.join(root, "a", "b", "deep.html"))
+    for relative in ("node_modules/pkg/x.html", ".git/y.html", "c/readme.txt"):
+        with open(os.path.join(root, relative), "w", encoding="utf-8") as file:
+            file.write("<p>ignored</p>")
+
+
+class TestPickleDocument(unittest.TestCase):
+    def test_round_trip(self):
+        """测试文档压平序列化后内容、id 登记、拼写标记和 head/title/body 引用都能恢复。"""
+        document = build_document(CorpusSpec(node_count=3000, fan_out=3000, misspelling_rate=0.2))
+        document.body.add_child(HTMLElement("p", "bad", "Helo wrold"))
+        document.select("p")  # 监听者不随文档序列化
+        copy = pickle.loads(pickle.dumps(document))
+        self.assertEqual(copy.content_hash(), document.content_hash())
+        self.assertEqual(copy.listeners, [])
+        self.assertIs(copy.body, copy.find_by_id("body"))
+        self.assertEqual(copy.title.text_content, document.title.text_content)
+        self.assertTrue(copy.find_by_id("bad").has_spelling_error)
+        self.assertEqual(copy.id_allocator.taken, document.id_allocator.taken)
+        self.assertEqual(copy.id_allocator.allocate("p"), document.id_allocator.allocate("p"))
+
+
+class TestLoadDir(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmpdir.name, "site")
+        make_site(self.root)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_scan_skips_ignored(self):
+        """测试扫描按 glob 匹配并跳过忽略的目录。"""
+        names = [os.path.relpath(path, self.root) for path in scan_directory(self.root)]
+        self.assertEqual(len(names), 7)
+        self.assertIn(os.path.join("a", "b", "deep.html"), names)
+        self.assertEqual(scan_directory(self.root, "*.txt"), [os.path.join(self.root, "c", "readme.txt")])
+
+    def test_load_dir_in_process_pool(self):
+        """测试在进程池中解析并登记为编辑器，结果与逐个加载相同。"""
+        session_manager = SessionManager()
+        with patch('sys.stdout', new=StringIO()):
+            loaded = session_manager.load_dir(self.root, workers=2)
+            self.assertEqual(len(loaded), 7)
+            self.assertEqual(session_manager.get_active_file(), loaded[0])
+            self.assertEqual(session_manager.load_dir(self.root, workers=2), [])  # 已打开的不重复加载
+            reference = SessionManager()
+            reference.load(loaded[3], HTMLParser())
+        document = session_manager.editors[loaded[3]].document
+        self.assertEqual(document.content_hash(), reference.get_active_editor().document.content_hash())
+        self.assertFalse(session_manager.editors[loaded[3]].is_modified)
+        self.assertTrue(session_manager.search("the"))
+        self.assertIsNotNone(session_manager.directory.find(loaded[-1]))
+
+    def test_load_dir_skips_unparsable_files(self):
+        """测试嵌套过深或解析出错的文件只报告并跳过，其余文件照常加载。"""
+        nested = os.path.join(self.root, "a", "nested.html")
+        with open(nested, "w", encoding="utf-8") as file:
+            file.write("<html><body>" + "<div>" * 5000 + "x" + "</div>" * 5000 + "</body></html>")
+        for workers in (2, 1):
+            session_manager = SessionManager()
+            with patch('sys.stdout', new=StringIO()) as output:
+                loaded = session_manager.load_dir(self.root, workers=workers)
+            self.assertEqual(len(loaded), 7)
+            self.assertNotIn(nested, session_manager.editors)
+        # 进程池中的报告由子进程打印，这里只检查在当前进程解析时的输出
+        self.assertIn(f"Failed to parse '{nested}': RecursionError", output.getvalue())
+        broken = os.path.join(self.root, "a", "p2.html")
+        session_manager = SessionManager()
+        original = HTMLParser.parse
+
+        def parse(parser, path):
+            if path == broken:
+                raise ValueError("bad markup")
+            return original(parser, path)
+
+        with patch('sys.stdout', new=StringIO()) as output, patch.object(HTMLParser, 'parse', parse):
+            loaded = session_manager.load_dir(self.root, workers=1)
+        self.assertEqual(len(loaded), 6)
+        self.assertNotIn(broken, loaded)
+        self.assertIn(f"Failed to parse '{broken}': ValueError: bad markup", output.getvalue())
+
+    def test_disk_view_expands_lazily(self):
+        """测试磁盘工作区视图只在显示时读取目录，并受深度限制。"""
+        workspace = Workspace(self.root, max_depth=2, active_file=os.path.join(self.root, "a", "p1.html"))
+        self.assertFalse(workspace.root.expanded)
+        workspace.set_display_strategy(TreeDisplayStrategy())
+        output = workspace.display()
+        self.assertIn("p1.html*", output)
+        self.assertIn("b/ ...", output)
+        self.assertNotIn("deep.html", output)
+        self.assertNotIn("node_modules", output)
+        self.assertNotIn("readme.txt", output)
+        b = next(child for child in workspace.root.children[0].children if child.file_name == "b")
+        self.assertEqual(b.children, [])  # 达到深度限制，不再读取
+
+
+if __name__ == '__main__':
+    unittest.main()
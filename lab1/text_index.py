@@ -0,0 +1,138 @@
+# text_index.py
+import heapq
+import math
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from model import DocumentListener, HTMLDocument, HTMLElement
+from tokenizer import tokenize
+
+SNIPPET_WIDTH = 60
+
+
+def index_terms(text: str) -> Counter:
+    """
+    文本中的检索词（小写）及其出现次数，包括单词、数字、网址和中日韩文字。
+    """
+    return Counter(token.text.lower() for token in tokenize(text))
+
+
+class TextIndex(DocumentListener):
+    """
+    单个文档的倒排索引：检索词 -> {元素: 词频}，随文档变更增量维护。
+    索引在第一次使用时才建立，加载文档（尤其是骨架解析的文档）时不必遍历整棵树。
+    """
+    def __init__(self):
+        self.document: Optional[HTMLDocument] = None
+        self._postings: Optional[Dict[str, Dict[HTMLElement, int]]] = None  # None 表示尚未建立
+        self._element_count = 0  # 有文本的元素个数
+
+    @property
+    def postings(self) -> Dict[str, Dict[HTMLElement, int]]:
+        if self._postings is None:
+            self._postings = {}
+            self._element_count = 0
+            if self.document is not None:
+                for node in self.document.root.iter():
+                    self._add(node, node.text_content)
+        return self._postings
+
+    @property
+    def element_count(self) -> int:
+        self.postings  # 确保已建立
+        return self._element_count
+
+    def on_reset(self, document: HTMLDocument):
+        self.document = document
+        self._postings = None
+
+    def on_attach(self, element: HTMLElement):
+        if self._postings is None:
+            return
+        for node in element.iter():
+            self._add(node, node.text_content)
+
+    def on_detach(self, element: HTMLElement):
+        if self._postings is None:
+            return
+        for node in element.iter():
+            self._remove(node, node.text_content)
+
+    def on_text_change(self, element: HTMLElement, old_text: str):
+        if self._postings is None:
+            return
+        self._remove(element, old_text)
+        self._add(element, element.text_content)
+
+    def _add(self, element: HTMLElement, text: str):
+        if not text:
+            return
+        for term, count in index_terms(text).items():
+            self._postings.setdefault(term, {})[element] = count
+        self._element_count += 1
+
+    def _remove(self, element: HTMLElement, text: str):
+        if not text:
+            return
+        for term in index_terms(text):
+            elements = self._postings.get(term)
+            if elements is not None:
+                elements.pop(element, None)
+                if not elements:
+                    del self._postings[term]
+        self._element_count -= 1
+
+    def document_frequency(self, term: str) -> int:
+        return len(self.postings.get(term, ()))
+
+    def match(self, terms: List[str]) -> Dict[HTMLElement, Tuple[int, ...]]:
+        """
+        返回包含全部检索词的元素及各词的词频。
+        """
+        if not terms:
+            return {}
+        if len(terms) == 1:
+            return {element: (count,) for element, count in self.postings.get(terms[0], {}).items()}
+        postings = [self.postings.get(term) for term in terms]
+        if any(not elements for elements in postings):
+            return {}
+        # 从最短的倒排表开始求交集
+        smallest = min(postings, key=len)
+        return {element: tuple(elements[element] for elements in postings)
+                for element in smallest if all(element in elements for elements in postings)}
+
+
+def make_snippet(text: str, terms: List[str], width: int = SNIPPET_WIDTH) -> str:
+    """
+    截取第一个检索词附近的文本。
+    """
+    if len(text) <= width:
+        return text
+    lowered = text.lower()
+    positions = [lowered.find(term) for term in terms]
+    position = min((p for p in positions if p >= 0), default=0)
+    start = max(0, min(position - width // 3, len(text) - width))
+    snippet = text[start:start + width]
+    return ("..." if start > 0 else "") + snippet + ("..." if start + width < len(text) else "")
+
+
+def search_indexes(indexes: Dict[str, TextIndex], query: str,
+                   limit: Optional[int] = 20) -> List[Tuple[str, str, str, float]]:
+    """
+    在多个文档的索引中检索同时包含全部检索词的元素，按 TF-IDF 得分排序，
+    返回 (文件名, 元素 id, 摘要, 得分)。
+    """
+    terms = list(dict.fromkeys(index_terms(query)))
+    if not terms:
+        return []
+    total = sum(index.element_count for index in indexes.values())
+    idf = [math.log(1 + total / max(1, sum(index.document_frequency(term) for index in indexes.values())))
+           for term in terms]
+    hits = []
+    for filename, index in indexes.items():
+        for element, frequencies in index.match(terms).items():
+            score = sum((1 + math.log(frequency)) * weight for frequency, weight in zip(frequencies, idf))
+            # 得分取负，元组的自然顺序即为结果顺序（同一文件内 id 唯一）
+            hits.append((-score, filename, element.id, element))
+    hits = heapq.nsmallest(limit, hits) if limit is not None else sorted(hits)
+    return [(filename, element_id, make_snippet(element.text_content, terms), -score)
+            for score, filename, element_id, element in hits]
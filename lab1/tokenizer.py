@@ -0,0 +1,98 @@
+# tokenizer.py
+import re
+import sys
+from typing import Iterator, List, NamedTuple
+
+# 词的分类
+WORD = "word"      # 需要拼写检查的字母词（含词内撇号）
+CJK = "cjk"        # 中日韩文字，不做拼写检查
+NUMBER = "number"  # 数字、日期、版本号等
+URL = "url"        # 网址、邮箱、域名
+
+SOFT_HYPHEN = "\u00ad"
+
+_CJK_RANGES = r"\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_LETTER = rf"[^\W\d_{_CJK_RANGES}]"
+_TLDS = "com|org|net|edu|gov|io|cn|co|uk|de|es|fr|info|dev"
+
+_WORD_BODY = rf"{_LETTER}+(?:[\u00ad'\u2019]{_LETTER}+)*"
+# 词必须取到不能再延长为止：第一个分支后面紧跟 . @ : 时不能回溯成更短的词，而要整体回退到网址分支。
+# （不用占有量词，以兼容 Python 3.11 以前的 re。）
+_WORD_END = rf"(?![\u00ad'\u2019]?{_LETTER})"
+_URL_BODY = rf"""
+        (?:https?|ftp)://[^\s<>"]+[^\s<>".,;:!?)\]}}'"]
+      | www\.[^\s<>"]+[^\s<>".,;:!?)\]}}'"]
+      | [\w.+-]+@[\w-]+(?:\.[\w-]+)+
+      | (?:[\w-]+\.)+(?:{_TLDS})\b
+"""
+
+# 各分支按优先级排列，finditer 一次扫描即可完成切分与分类。
+# 普通单词最常见，放在最前面；后面紧跟 . @ : 的才回退到网址分支。
+_TOKEN_PATTERN = re.compile(rf"""
+    (?P<{WORD}>{_WORD_BODY}){_WORD_END}(?![.@:][\w/])
+  | (?P<{URL}>{_URL_BODY})
+  | (?P<{CJK}>[{_CJK_RANGES}]+)
+  | (?P<{WORD}_tail>{_WORD_BODY})
+  | (?P<{NUMBER}>\d+(?:[.,:/-]\d+)*)
+""", re.VERBOSE)
+_KINDS = {WORD: WORD, WORD + "_tail": WORD, URL: URL, CJK: CJK, NUMBER: NUMBER}
+
+# 同样的切分规则，但只捕获需要拼写检查的词，供 findall 快速路径使用
+_WORD_PATTERN = re.compile(rf"""
+    ({_WORD_BODY}){_WORD_END}(?![.@:][\w/])
+  | (?:{_URL_BODY})
+  | [{_CJK_RANGES}]+
+  | ({_WORD_BODY})
+  | \d+(?:[.,:/-]\d+)*
+""", re.VERBOSE)
+
+
+class Token(NamedTuple):
+    text: str   # 词本身（已驻留）
+    start: int  # 在原文中的起始位置
+    end: int    # 在原文中的结束位置（不含）
+    kind: str
+
+
+def tokenize(text: str) -> List[Token]:
+    """
+    将文本切分为带位置和类别的 Token。连字符连接的复合词拆成各部分，
+    软连字符 (U+00AD) 视为词的一部分并从词中去掉。
+    """
+    tokens = []
+    intern = sys.intern
+    for match in _TOKEN_PATTERN.finditer(text):
+        kind = _KINDS[match.lastgroup]
+        value = match.group()
+        if kind == WORD and SOFT_HYPHEN in value:
+            value = value.replace(SOFT_HYPHEN, "")
+        tokens.append(Token(intern(value), match.start(), match.end(), kind))
+    return tokens
+
+
+def iter_words(text: str) -> Iterator[Token]:
+    """
+    只返回需要做拼写检查的词。
+    """
+    intern = sys.intern
+    for match in _TOKEN_PATTERN.finditer(text):
+        if _KINDS[match.lastgroup] == WORD:
+            value = match.group()
+            if SOFT_HYPHEN in value:
+                value = value.replace(SOFT_HYPHEN, "")
+            yield Token(intern(value), match.start(), match.end(), WORD)
+
+
+def words(text: str) -> List[str]:
+    """
+    返回需要做拼写检查的词的字符串列表（不构造 Token，速度更快）。
+    """
+    intern = sys.intern
+    result = []
+    for head, tail in _WORD_PATTERN.findall(text):
+        word = head or tail
+        if word:
+            if SOFT_HYPHEN in word:
+                word = word.replace(SOFT_HYPHEN, "")
+            result.append(intern(word))
+    return result
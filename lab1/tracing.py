@@ -0,0 +1,132 @@
+# tracing.py
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional
+
+# 关闭时所有 span 共用的空上下文，不产生任何分配
+_NULL_SPAN = nullcontext()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "category", "args", "start")
+
+    def __init__(self, tracer: 'Tracer', name: str, category: str, args: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.tracer.complete(self.name, self.category, self.start, self.args)
+        return False
+
+
+class Tracer:
+    """
+    记录内部耗时区间（span），导出为 Chrome trace-event 格式的 JSON，
+    可直接在 Perfetto（ui.perfetto.dev）或 chrome://tracing 中打开。
+    未开启时 span() 返回共享的空上下文，开销只有一次属性判断。
+    """
+    def __init__(self, max_events: int = 1_000_000):
+        self.enabled = False
+        self.output_path: Optional[str] = None
+        self.max_events = max_events
+        self.events: List[Dict[str, Any]] = []
+        self.dropped = 0
+        self.origin = 0
+        self._exit_hook_registered = False
+
+    def enable(self, output_path: str = "trace.json"):
+        self.output_path = output_path
+        self.events = []
+        self.dropped = 0
+        self.origin = time.perf_counter_ns()
+        self.enabled = True
+        if not self._exit_hook_registered:
+            # 未关闭就退出程序时也写出已记录的内容
+            atexit.register(self.flush)
+            self._exit_hook_registered = True
+
+    def disable(self) -> Optional[str]:
+        """
+        停止记录并写出 trace 文件，返回文件路径。
+        """
+        path = self.flush()
+        self.enabled = False
+        self.events = []
+        return path
+
+    def flush(self) -> Optional[str]:
+        if not self.enabled or not self.output_path:
+            return None
+        directory = os.path.dirname(self.output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        trace = {
+            "traceEvents": self.events,
+            "displayTimeUnit": "ms",
+            "otherData": {"dropped_events": self.dropped},
+        }
+        with open(self.output_path, 'w', encoding='utf-8') as file:
+            json.dump(trace, file)
+        return self.output_path
+
+    def span(self, name: str, category: str = "editor", **args):
+        """
+        用法：with tracer.span("parse", file=path): ...
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, category, args)
+
+    def complete(self, name: str, category: str, start_ns: int, args: Optional[Dict[str, Any]] = None):
+        """
+        记录一个从 start_ns 持续到当前时刻的完整事件（ph = "X"）。
+        """
+        end_ns = time.perf_counter_ns()
+        if len(self.events) >= self.max_events:
+            self.dropped += 1
+            return
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (start_ns - self.origin) / 1000,  # 微秒
+            "dur": (end_ns - start_ns) / 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+
+# 进程内共享的 tracer
+tracer = Tracer()
+
+
+def traced(name: str, category: str = "editor"):
+    """
+    装饰器：tracer 开启时为每次调用记录一个 span。
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                tracer.complete(name, category, start)
+        return wrapper
+    return decorator
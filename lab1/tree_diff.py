@@ -0,0 +1,197 @@
+# tree_diff.py
+import shlex
+from bisect import bisect_left
+from collections import defaultdict, deque
+from typing import Dict, List, Optional, Tuple
+from model import HTMLDocument, HTMLElement
+
+# 编辑脚本中的一步，第一项为操作名，格式与对应的命令行命令一致：
+#   ("delete", id)
+#   ("edit-id", old_id, new_id)
+#   ("edit-text", id, text)
+#   ("edit-lang", id, lang)
+#   ("insert", tag, id, before_id, text)
+#   ("append", tag, id, parent_id, text)
+EditOp = Tuple
+
+
+class _Script:
+    """
+    按阶段收集操作：先删除，再修改，最后插入，保证回放时引用的 id 都已就绪。
+    """
+    def __init__(self):
+        self.deletes: List[EditOp] = []
+        self.updates: List[EditOp] = []
+        self.inserts: List[EditOp] = []
+
+    def ops(self) -> List[EditOp]:
+        return self.deletes + self.updates + self.inserts
+
+
+def diff_documents(old: HTMLDocument, new: HTMLDocument) -> List[EditOp]:
+    """
+    计算把 old 变为 new 的编辑脚本。子树哈希相同的部分直接跳过，
+    因此只有一处不同时，代价与树深和沿途的兄弟个数成正比，而不是与文档大小成正比。
+    """
+    return diff_elements(old.root, new.root)
+
+
+def diff_elements(old: HTMLElement, new: HTMLElement) -> List[EditOp]:
+    script = _Script()
+    if old.tag_name != new.tag_name:
+        # 根元素标签不同，只能整体替换其子元素
+        for child in old.children:
+            script.deletes.append(("delete", child.id))
+        _diff_fields(old, new, script)
+        for child in new.children:
+            _emit_subtree(child, ("append", new.id), script)
+    else:
+        _diff_matched(old, new, script)
+    return script.ops()
+
+
+def _diff_fields(old: HTMLElement, new: HTMLElement, script: _Script):
+    if old.id != new.id:
+        script.updates.append(("edit-id", old.id, new.id))
+    if old.text_content != new.text_content:
+        script.updates.append(("edit-text", new.id, new.text_content))
+    if old.lang != new.lang:
+        script.updates.append(("edit-lang", new.id, new.lang or ""))
+
+
+def _diff_matched(old: HTMLElement, new: HTMLElement, script: _Script):
+    # 非递归处理成对的元素，深层文档不会栈溢出
+    stack = [(old, new)]
+    while stack:
+        old_element, new_element = stack.pop()
+        if old_element.subtree_hash() == new_element.subtree_hash():
+            continue
+        _diff_fields(old_element, new_element, script)
+        pairs = _diff_children(old_element, new_element, script)
+        stack.extend(reversed(pairs))
+
+
+def _diff_children(old: HTMLElement, new: HTMLElement,
+                   script: _Script) -> List[Tuple[HTMLElement, HTMLElement]]:
+    """
+    对齐两组子元素，记录删除和插入，返回需要继续比较的元素对。
+    """
+    old_children, new_children = list(old.children), list(new.children)
+    # 去掉哈希相同的公共前缀和后缀
+    start = 0
+    limit = min(len(old_children), len(new_children))
+    while start < limit and old_children[start].subtree_hash() == new_children[start].subtree_hash():
+        start += 1
+    old_end, new_end = len(old_children), len(new_children)
+    while (old_end > start and new_end > start
+           and old_children[old_end - 1].subtree_hash() == new_children[new_end - 1].subtree_hash()):
+        old_end -= 1
+        new_end -= 1
+
+    middle_old = old_children[start:old_end]
+    middle_new = new_children[start:new_end]
+    matches = _match(middle_old, middle_new)
+    kept = _longest_increasing(matches)  # 相对顺序不变的匹配保留，其余按删除加插入处理
+    kept_old = {old_index for old_index, _ in kept}
+    kept_new = {new_index: old_index for old_index, new_index in kept}
+
+    for old_index, child in enumerate(middle_old):
+        if old_index not in kept_old:
+            script.deletes.append(("delete", child.id))
+
+    # 倒序插入：每个新元素的后一个兄弟此时已经存在，可作为插入位置
+    inserts: List[EditOp] = []
+    for new_index in range(len(middle_new) - 1, -1, -1):
+        if new_index in kept_new:
+            continue
+        absolute = start + new_index
+        child = middle_new[new_index]
+        if absolute + 1 < len(new_children):
+            first = ("insert", new_children[absolute + 1].id)
+        else:
+            first = ("append", new.id)
+        subtree = _Script()
+        _emit_subtree(child, first, subtree)
+        inserts.extend(subtree.inserts)
+    script.inserts.extend(inserts)
+
+    return [(middle_old[old_index], middle_new[new_index]) for old_index, new_index in kept]
+
+
+def _match(old_children: List[HTMLElement], new_children: List[HTMLElement]) -> List[Tuple[int, int]]:
+    """
+    先按 id 配对，剩下的按标签依次配对（对应 id 被修改的元素），返回按新位置排序的 (旧位置, 新位置)。
+    """
+    old_by_id: Dict[str, int] = {child.id: index for index, child in enumerate(old_children)}
+    matched_old = set()
+    matches: Dict[int, int] = {}
+    for new_index, child in enumerate(new_children):
+        old_index = old_by_id.get(child.id)
+        if old_index is not None and old_index not in matched_old and \
+                old_children[old_index].tag_name == child.tag_name:
+            matches[new_index] = old_index
+            matched_old.add(old_index)
+    unmatched_by_tag: Dict[str, deque] = defaultdict(deque)
+    for old_index, child in enumerate(old_children):
+        if old_index not in matched_old:
+            unmatched_by_tag[child.tag_name].append(old_index)
+    for new_index, child in enumerate(new_children):
+        if new_index not in matches and unmatched_by_tag[child.tag_name]:
+            matches[new_index] = unmatched_by_tag[child.tag_name].popleft()
+    return [(old_index, new_index) for new_index, old_index in sorted(matches.items())]
+
+
+def _longest_increasing(matches: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """
+    在按新位置排序的匹配中，取旧位置严格递增的最长子序列（O(k log k)）。
+    """
+    tails: List[int] = []       # tails[i]：长度为 i+1 的递增子序列的最小结尾（旧位置）
+    tail_index: List[int] = []  # 对应的 matches 下标
+    previous: List[Optional[int]] = [None] * len(matches)
+    for index, (old_index, _) in enumerate(matches):
+        position = bisect_left(tails, old_index)
+        if position == len(tails):
+            tails.append(old_index)
+            tail_index.append(index)
+        else:
+            tails[position] = old_index
+            tail_index[position] = index
+        previous[index] = tail_index[position - 1] if position > 0 else None
+    result = []
+    index = tail_index[-1] if tail_index else None
+    while index is not None:
+        result.append(matches[index])
+        index = previous[index]
+    result.reverse()
+    return result
+
+
+def _emit_subtree(element: HTMLElement, first: Tuple[str, str], script: _Script):
+    """
+    新增整棵子树：根元素按 first 指定的方式插入，后代依次追加到各自的父元素。
+    """
+    operation, anchor = first
+    script.inserts.append((operation, element.tag_name, element.id, anchor, element.text_content))
+    if element.lang:
+        script.inserts.append(("edit-lang", element.id, element.lang))
+    stack = [element]
+    while stack:
+        parent = stack.pop()
+        for child in parent.children:
+            script.inserts.append(("append", child.tag_name, child.id, parent.id, child.text_content))
+            if child.lang:
+                script.inserts.append(("edit-lang", child.id, child.lang))
+        stack.extend(reversed(parent.children))
+
+
+def format_edit_script(ops: List[EditOp]) -> str:
+    """
+    以命令行命令的形式输出编辑脚本。
+    """
+    lines = []
+    for name, *args in ops:
+        # 末尾的空文本省略；edit-text 的空文本保留为 ''
+        while args and args[-1] == "" and name != "edit-text":
+            args.pop()
+        lines.append(" ".join([name] + [shlex.quote(arg) for arg in args]))
+    return "\n".join(lines)
@@ -0,0 +1,149 @@
+# workspace.py
+import fnmatch
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple
+from io_manager import FNode, HTMLParser
+from model import HTMLDocument
+
+DEFAULT_PATTERN = "*.html"
+# 扫描时跳过的目录与文件（fnmatch 模式，按名字匹配）
+DEFAULT_IGNORE = (".git", ".hg", ".svn", "node_modules", "__pycache__", ".venv", "venv", ".*.swp")
+SERIAL_THRESHOLD = 4  # 文件少于这个数时直接在当前进程解析，省去启动进程池的开销
+
+
+def is_ignored(name: str, ignore: Iterable[str]) -> bool:
+    return any(fnmatch.fnmatch(name, pattern) for pattern in ignore)
+
+
+def scan_directory(root: str, pattern: str = DEFAULT_PATTERN,
+                   ignore: Iterable[str] = DEFAULT_IGNORE) -> List[str]:
+    """
+    用 os.scandir 遍历 root（非递归，不跟随目录的符号链接），返回名字匹配 pattern 的文件路径，
+    按路径排序。名字匹配 ignore 中任一模式的文件和目录被跳过。
+    """
+    ignore = tuple(ignore)
+    matches = []
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if is_ignored(entry.name, ignore):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif fnmatch.fnmatch(entry.name, pattern) and entry.is_file():
+                        matches.append(entry.path)
+        except OSError as error:
+            print(f"Skipping '{directory}': {error.strerror}.")
+    matches.sort()
+    return matches
+
+
+def parse_file(path: str) -> Optional[HTMLDocument]:
+    """
+    在子进程中执行：解析一个文件。文档通过 HTMLDocument.__getstate__ 压平后传回。
+    任何解析错误（包括嵌套过深时的 RecursionError）都只报告并返回 None，不影响其余文件的加载。
+    """
+    try:
+        return HTMLParser().parse(path)
+    except Exception as error:
+        print(f"Failed to parse '{path}': {type(error).__name__}: {error}")
+        return None
+
+
+def parse_files(paths: List[str], workers: Optional[int] = None) -> Iterator[Tuple[str, Optional[HTMLDocument]]]:
+    """
+    并行解析多个文件，按 paths 的顺序产出 (路径, 文档)。workers 缺省为 CPU 个数；
+    只有一个 worker 或文件很少时在当前进程中解析。
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) < SERIAL_THRESHOLD:
+        for path in paths:
+            yield path, parse_file(path)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunksize = max(1, len(paths) // (workers * 4))
+        yield from zip(paths, pool.map(parse_file, paths, chunksize=chunksize))
+
+
+class DiskNode(FNode):
+    """
+    磁盘上的文件或目录。目录的子节点在第一次访问 children 时才读取（懒展开），
+    超过 max_depth 的目录不展开，名字后显示 "/ ..."。
+    """
+    def __init__(self, path: str, name: str, is_dir: bool, depth: int, workspace: 'Workspace'):
+        self._children: Optional[List[FNode]] = None
+        super(DiskNode, self).__init__(name)
+        self.path = path
+        self.is_dir = is_dir
+        self.depth = depth
+        self.workspace = workspace
+
+    @property
+    def children(self) -> List[FNode]:
+        if self._children is None:
+            self._children = self.workspace.list_children(self)
+        return self._children
+
+    @children.setter
+    def children(self, value: List[FNode]):
+        # TreeNode.__init__ 会赋值空列表，此时保持未展开
+        self._children = value or None
+
+    @property
+    def expanded(self) -> bool:
+        return self._children is not None
+
+    def get_display_name(self) -> str:
+        name = super(DiskNode, self).get_display_name()
+        if not self.is_dir or self.parent is None:
+            return name
+        return name + ("/ ..." if self.depth >= self.workspace.max_depth else "/")
+
+
+class Workspace:
+    """
+    磁盘上的工作区目录视图，可用 dir-tree/dir-indent 的显示策略输出。
+    列出未被忽略的目录和匹配 pattern 的文件；活动文件标记 "*"。
+    """
+    def __init__(self, root: str, pattern: str = DEFAULT_PATTERN, ignore: Iterable[str] = DEFAULT_IGNORE,
+                 max_depth: int = 3, active_file: Optional[str] = None):
+        self.pattern = pattern
+        self.ignore = tuple(ignore)
+        self.max_depth = max_depth
+        self.active_path = os.path.abspath(active_file) if active_file else None
+        self.root = DiskNode(root, root, True, 0, self)
+        self.display_strategy = None
+
+    def list_children(self, node: DiskNode) -> List[FNode]:
+        if not node.is_dir or node.depth >= self.max_depth:
+            return []
+        children = []
+        try:
+            with os.scandir(node.path) as iterator:
+                entries = sorted(iterator, key=lambda entry: (not entry.is_dir(follow_symlinks=False), entry.name))
+        except OSError:
+            return []
+        for entry in entries:
+            if is_ignored(entry.name, self.ignore):
+                continue
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if not is_dir and not fnmatch.fnmatch(entry.name, self.pattern):
+                continue
+            child = DiskNode(entry.path, entry.name, is_dir, node.depth + 1, self)
+            child.parent = node
+            if not is_dir and self.active_path == os.path.abspath(entry.path):
+                child.set_active()
+            children.append(child)
+        return children
+
+    def set_display_strategy(self, strategy) -> None:
+        self.display_strategy = strategy
+
+    def display(self) -> str:
+        if self.display_strategy is None:
+            raise ValueError("Display strategy is not set.")
+        return self.display_strategy.display(self)